@@ -1,4 +1,7 @@
-from src.main import main
+from multiprocessing import freeze_support
+
+from src.client import main
 
 if __name__ == "__main__":
+    freeze_support()  # --batch --processes in the frozen build
     main()
@@ -12,7 +12,7 @@ if not exist "%~dp0.venv\Scripts\python.exe" (
 )
 
 rem --- Run Python (application controls UX) ---
-"%~dp0.venv\Scripts\python.exe" -m src.main
+"%~dp0.venv\Scripts\python.exe" -m src.client
 
 rem --- Exit immediately (pure launcher) ---
 exit /b %ERRORLEVEL%
@@ -42,6 +42,9 @@ if exist requirements.txt (
 rem ลง PyInstaller แยกต่างหาก (เผื่อใน req ไม่มี)
 pip install pyinstaller
 
+rem เครื่องมือสำหรับ dev: ชุดทดสอบใน tests/
+pip install pytest
+
 echo.
 echo =======================================================
 echo  [SUCCESS] Environment Ready!
@@ -50,5 +53,6 @@ echo.
 echo Now you can run:
 echo  1. 'python -m src.main' to test your code.
 echo  2. 'build.bat' to create the .exe for users.
+echo  3. 'python -m pytest tests' to run the test suite.
 echo.
 pause
\ No newline at end of file
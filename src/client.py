@@ -0,0 +1,127 @@
+# src/client.py
+"""
+Thin client for the resident report service.
+
+Start the service once per session (e.g. from a startup shortcut):
+    python -m src.main --serve
+Then every launch of
+    python -m src.client [--report flood --year 2026 --month 1 --dev]
+only imports the standard library (+ rich for the menu) and hands the job to
+the warm service over a local named pipe / Unix socket.
+
+If no service is running, this simply runs the normal application
+(src.main) in-process with the same arguments, so run.bat and the
+PyInstaller entry point can always go through here. The same happens for
+any option the service protocol does not carry (--batch, --pages,
+--offline, --config, ...): src.main parses and runs those itself.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from .core import service_link
+from .ui import RICH_AVAILABLE, interactive_mode, open_output_folder
+
+# Ping must answer fast; anything slower is treated as "no service"
+PING_TIMEOUT = 2.0
+
+
+def run_in_process() -> str:
+    """Fallback: the full application, same argv."""
+    from .main import main as full_main
+    return full_main()
+
+
+def ping(message: dict | None = None):
+    """A quick request; a service too slow to answer counts as no service (None)."""
+    try:
+        return service_link.request(message or {"op": "ping"}, timeout=PING_TIMEOUT)
+    except service_link.ServiceTimeout:
+        return None
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Only what a service job carries; everything else goes to src.main."""
+    parser = argparse.ArgumentParser(description="HII Report Generator (service client)")
+    parser.add_argument("--report", choices=["drought", "flood", "all"])
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--month", type=int)
+    parser.add_argument("--dev", action="store_true")
+    parser.add_argument("--quiet", action="store_true")
+    parser.add_argument("--stop", action="store_true", help="Stop the running report service.")
+    return parser
+
+
+def in_process_argv(args: argparse.Namespace, report_type: str, year: int, month: int) -> list[str]:
+    """argv for finishing one service job in-process (keeps --dev / --quiet)."""
+    argv = [sys.argv[0], "--report", report_type, "--year", str(year), "--month", str(month)]
+    if args.dev:
+        argv.append("--dev")
+    if args.quiet:
+        argv.append("--quiet")
+    return argv
+
+
+def main():
+    args, other = build_parser().parse_known_args()
+    if other:
+        # Not expressible as a service job (--batch, --pages, --config, ...):
+        # the full application validates (parse_args) and runs the whole command line
+        return run_in_process()
+
+    if args.stop:
+        reply = ping({"op": "shutdown"})
+        print("Report service stopped." if reply else "No report service is running.")
+        return "STOP"
+
+    if ping() is None:
+        return run_in_process()
+
+    is_cli_automation = (args.report and args.year and args.month)
+    while True:
+        if is_cli_automation:
+            report_type, year, month = args.report, args.year, args.month
+        elif RICH_AVAILABLE:
+            report_type, year, month = interactive_mode()
+            if report_type is None:
+                return "USER_EXIT"
+        else:
+            return run_in_process()
+
+        try:
+            reply = service_link.request(
+                {"op": "generate", "report": report_type, "year": year, "month": month, "dev": args.dev}
+            )
+        except service_link.ServiceTimeout:
+            # The job is still running there: starting it here too would only duplicate it
+            print(
+                f"The report service is still working on {report_type} {year}-{month:02d}; "
+                "the report will appear in the output folder when it finishes.",
+                file=sys.stderr,
+            )
+            if is_cli_automation:
+                exit(1)  # no report yet: a script must not go on as if it had one
+            continue
+        if reply is None:
+            # Service went away mid-session: finish this job in-process
+            sys.argv = in_process_argv(args, report_type, year, month)
+            run_in_process()
+        elif reply.get("ok"):
+            output_path = Path(reply["output_path"])
+            print(f"Report saved to: {output_path}")
+            open_output_folder(output_path)
+        else:
+            print(f"Report generation failed: {reply.get('error')}", file=sys.stderr)
+            if is_cli_automation:
+                exit(1)
+            if not args.quiet:
+                input("\nAn error occurred. Press Enter to return to menu...")
+
+        if is_cli_automation:
+            return "NORMAL"
+
+
+if __name__ == "__main__":
+    main()
+    raise SystemExit(0)
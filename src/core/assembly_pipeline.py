@@ -0,0 +1,165 @@
+# src/core/assembly_pipeline.py
+"""
+Pipelined deck assembly: images are fetched while the deck is being edited.
+
+    slots = build_image_slots(engine, config, year, month)   # per report tasks.py
+    with ImagePipeline(engine, img_handler, slots) as pipeline:
+        ...text edits (footer, cover, titles, labels)...      # network busy meanwhile
+        pipeline.apply()                                      # replace_image per arrival
+    engine.save(...)
+
+Downloads run on worker threads (ImageHandler.download_image: prefetched
+bytes or single-flight download); every edit of the Presentation, including
+placeholders for missing images, stays on the calling thread because
+python-pptx objects are not thread-safe.
+
+Several decks built from the same images (report variants) share one
+ImageSet: each URL is fetched once and every deck embeds the same bytes.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Iterable, Optional
+
+from pptx.slide import Slide
+
+from .image_handler import ImageHandler
+from .metrics import carry_scope, metrics
+from .ppt_engine import PptEngine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_WORKERS = 8
+
+
+@dataclass(frozen=True)
+class ImageSlot:
+    """One picture to replace: where it goes and where its image comes from."""
+    slide: Slide
+    shape_name: str
+    url: str
+    placeholder_text: str
+    aspect_ratio: Optional[float] = None
+
+
+class ImageSet:
+    """
+    Background fetch of a set of image URLs, each downloaded once.
+    future(url) resolves to the raw bytes (None = unavailable); every deck
+    reading the set wraps the same bytes object, so N decks cost one fetch
+    and no per-deck copy of the images.
+    """
+
+    def __init__(
+        self,
+        img_handler: ImageHandler,
+        urls: Iterable[str],
+        max_workers: int = DEFAULT_FETCH_WORKERS,
+    ):
+        self.img_handler = img_handler
+        self.urls = list(dict.fromkeys(urls))
+        self.max_workers = max_workers
+        self._pool: ThreadPoolExecutor | None = None
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> "ImageSet":
+        with self._lock:
+            if self._pool is not None or not self.urls:
+                return self
+            self._pool = ThreadPoolExecutor(
+                max_workers=max(1, min(self.max_workers, len(self.urls))),
+                thread_name_prefix="image-fetch",
+            )
+            fetch = carry_scope(self._fetch)
+            self._futures = {url: self._pool.submit(fetch, url) for url in self.urls}
+        logger.debug(f"Fetching {len(self.urls)} images in the background.")
+        return self
+
+    def future(self, url: str) -> Future:
+        """The pending download of `url` (which must be part of the set)."""
+        self.start()
+        with self._lock:
+            return self._futures[url]
+
+    def _fetch(self, url: str) -> bytes | None:
+        stream = self.img_handler.download_image(url)
+        return stream.getvalue() if stream is not None else None
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            # After a failed edit nobody will wait for the remaining images
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "ImageSet":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ImagePipeline:
+    """
+    Starts fetching every slot's image on enter; apply() replaces each picture
+    as soon as its image lands (arrival order, not deck order).
+
+    Pass `image_set` to read images another owner fetches (shared by several
+    decks); otherwise the pipeline fetches its slots' images itself.
+    """
+
+    def __init__(
+        self,
+        engine: PptEngine,
+        img_handler: ImageHandler,
+        slots: list[ImageSlot],
+        max_workers: int = DEFAULT_FETCH_WORKERS,
+        image_set: ImageSet | None = None,
+    ):
+        self.engine = engine
+        self.img_handler = img_handler
+        self.slots = list(slots)
+        self._owns_images = image_set is None
+        self.images = image_set or ImageSet(img_handler, [slot.url for slot in self.slots], max_workers)
+        # One download may feed several slots (same URL twice in a deck)
+        self._futures: dict[Future, list[ImageSlot]] = {}
+
+    def start(self) -> "ImagePipeline":
+        if self._futures or not self.slots:
+            return self
+        self.images.start()
+        for slot in self.slots:
+            self._futures.setdefault(self.images.future(slot.url), []).append(slot)
+        return self
+
+    def apply(self) -> int:
+        """Blocks until every image is placed. Returns the number replaced."""
+        self.start()
+        placed = 0
+        for future in as_completed(self._futures):
+            data = future.result()
+            for slot in self._futures[future]:
+                if data is not None:
+                    image = BytesIO(data)
+                else:
+                    image = self.img_handler.placeholder_image(slot.placeholder_text, slot.aspect_ratio)
+                self.engine.replace_image(slot.slide, slot.shape_name, image)
+                placed += 1
+        metrics.inc("images_placed_total", placed)
+        return placed
+
+    def close(self) -> None:
+        if self._owns_images:
+            self.images.close()
+
+    def __enter__(self) -> "ImagePipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
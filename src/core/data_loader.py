@@ -1,6 +1,13 @@
+import copy
+import threading
 import yaml
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+# (resolved path) -> ((mtime_ns, size), parsed config)
+# Parsed once per process and re-read only when the file changes on disk.
+_CONFIG_CACHE: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+_CONFIG_CACHE_LOCK = threading.Lock()
 
 class DataLoader:
     def __init__(self, config_path: str = "config.yaml"):
@@ -8,18 +15,62 @@ class DataLoader:
         self.config = self._load_config()
 
     def _load_config(self) -> Dict[str, Any]:
-        """Loads the YAML configuration file."""
+        """Loads the YAML configuration file (cached per process until it changes)."""
         if not self.config_path.exists():
             raise FileNotFoundError(f"Config file not found at: {self.config_path}")
-        
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+
+        key = self.config_path.resolve()
+        st = key.stat()
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with _CONFIG_CACHE_LOCK:
+            cached = _CONFIG_CACHE.get(key)
+        if cached is None or cached[0] != stamp:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                cached = (stamp, yaml.safe_load(f))
+            with _CONFIG_CACHE_LOCK:
+                _CONFIG_CACHE[key] = cached
+
+        # Callers get their own copy, so nobody can mutate the cached one
+        return copy.deepcopy(cached[1])
 
     def get_config(self) -> Dict[str, Any]:
         """Returns the entire configuration dictionary."""
         return self.config
 
-    def get_url(self, source_config: Dict[str, Any], pattern_key: str, **kwargs) -> str:
+    @staticmethod
+    def with_variant(config: Dict[str, Any], report: str, variant: Optional[str]) -> Dict[str, Any]:
+        """
+        Returns `config` with config[report] (e.g. "flood_report") replaced by
+        one of its `variants`: the variant's template_path, and its `pages`
+        entries laid over the report's pages (keys of a page are overridden,
+        a page set to null is left out). data_sources always stay the report's,
+        so every variant shows the same images. `variant=None` -> unchanged.
+        """
+        if variant is None:
+            return config
+
+        report_cfg = config[report]
+        variants = report_cfg.get("variants") or {}
+        if variant not in variants:
+            configured = ", ".join(variants) or "none"
+            raise KeyError(f"Unknown {report} variant '{variant}' (configured: {configured})")
+        variant_cfg = variants[variant] or {}
+
+        pages = dict(report_cfg.get("pages") or {})
+        for page_name, page_cfg in (variant_cfg.get("pages") or {}).items():
+            if page_cfg is None:
+                pages.pop(page_name, None)
+            else:
+                pages[page_name] = {**pages.get(page_name, {}), **page_cfg}
+
+        merged = {key: value for key, value in report_cfg.items() if key != "variants"}
+        merged["template_path"] = variant_cfg.get("template_path", report_cfg["template_path"])
+        merged["pages"] = pages
+        return {**config, report: merged}
+
+    @staticmethod
+    def get_url(source_config: Dict[str, Any], pattern_key: str, **kwargs) -> str:
         """
         Generates a URL by formatting the pattern found in source_config.
         
@@ -0,0 +1,346 @@
+# src/core/fetch_control.py
+"""
+Fetch-layer guards used by ImageHandler.
+
+  - CircuitBreaker: per-host, shared by every ImageHandler in the process.
+    After N consecutive connection failures the host is skipped (placeholders
+    are used instead) until a cool-down has passed; then a single probe
+    request decides whether to close the circuit again.
+  - Deadline: an overall time budget for one report's fetches.
+  - LatencyHistory: recent download latencies per URL pattern, used to
+    derive the hedging threshold (e.g. p95); optionally persisted as JSON.
+  - AdaptiveLimiter: AIMD concurrency limit per host. Grows while latency
+    is stable, halves on 5xx/timeouts and pauses for Retry-After.
+  - SingleFlight: concurrent calls for the same key share one execution
+    and one result object.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _HostState:
+    failures: int = 0
+    opened_at: Optional[float] = None
+    probing: bool = False
+    prober: Optional[int] = None  # thread id of the half-open probe
+
+
+class CircuitBreaker:
+    """
+    Closed -> (N consecutive failures) -> Open -> (cool-down) -> Half-open.
+    In half-open state exactly one caller is allowed through as a probe.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._hosts: dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold: int, cooldown: float) -> None:
+        with self._lock:
+            self.failure_threshold = failure_threshold
+            self.cooldown = cooldown
+
+    def allow(self, host: str) -> bool:
+        """Returns True if a request to `host` may be sent now."""
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None or state.opened_at is None:
+                return True
+
+            if time.monotonic() - state.opened_at < self.cooldown or state.probing:
+                return False
+
+            state.probing = True  # half-open: let one probe through
+            state.prober = threading.get_ident()
+            return True
+
+    def record_success(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                return
+            if state.opened_at is not None:
+                logger.info(f"Circuit closed for {host} (probe succeeded).")
+            self._hosts[host] = _HostState()
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            state = self._hosts.setdefault(host, _HostState())
+            state.failures += 1
+
+            if state.probing or (state.opened_at is None and state.failures >= self.failure_threshold):
+                state.opened_at = time.monotonic()
+                state.probing = False
+                logger.warning(
+                    f"Circuit open for {host} after {state.failures} consecutive failures; "
+                    f"skipping it for {self.cooldown:.0f}s (placeholders will be used)."
+                )
+
+    def end_probe(self, host: str) -> None:
+        """
+        Called (in a finally) after every allowed request. If it was the probe
+        and neither record_success nor record_failure settled the circuit
+        (e.g. an unexpected exception), the next caller may probe instead.
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is not None and state.probing and state.prober == threading.get_ident():
+                state.probing = False
+                state.prober = None
+
+    def is_open(self, host: str) -> bool:
+        with self._lock:
+            state = self._hosts.get(host)
+            return state is not None and state.opened_at is not None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+
+
+class Deadline:
+    """Overall time budget; `seconds=None` means unlimited."""
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self._expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> Optional[float]:
+        if self._expires_at is None:
+            return None
+        return max(0.0, self._expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+
+class LatencyHistory:
+    """
+    Keeps the last `max_samples` successful download latencies per URL
+    pattern (digits collapsed, so every month/lead of one map type shares
+    a pattern).
+    """
+
+    def __init__(self, max_samples: int = 200):
+        self.max_samples = max_samples
+        self.path: Optional[Path] = None
+        self._samples: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def pattern_for(url: str) -> str:
+        return re.sub(r"\d+", "{n}", url)
+
+    def record(self, url: str, seconds: float) -> None:
+        key = self.pattern_for(url)
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.max_samples)).append(seconds)
+
+    def percentile(self, url: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """Nearest-rank percentile for the URL's pattern (None if too few samples)."""
+        with self._lock:
+            samples = sorted(self._samples.get(self.pattern_for(url), ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        rank = max(1, math.ceil(pct / 100 * len(samples)))
+        return samples[rank - 1]
+
+    def load(self, path: Path | str) -> None:
+        """Binds the history to `path` and loads it (missing/corrupt file = empty)."""
+        self.path = Path(path)
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for key, values in data.items():
+                self._samples[key] = deque(values, maxlen=self.max_samples)
+
+    def save(self) -> None:
+        """Writes the history back to the bound path (no-op when unbound)."""
+        if self.path is None:
+            return
+        with self._lock:
+            data = {key: list(values) for key, values in self._samples.items()}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit.
+
+    - success with latency <= `tolerance` x the running average: limit += 1/limit
+      (about +1 per "window" of successful requests)
+    - overload (5xx in status_forcelist, 429, timeout): limit halves, at most
+      once per `decrease_interval` so one burst of failures counts once
+    - Retry-After: no new request starts before it has elapsed
+    """
+
+    def __init__(
+        self,
+        host: str = "",
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        tolerance: float = 2.0,
+        decrease_interval: float = 1.0,
+    ):
+        self.host = host
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.tolerance = tolerance
+        self.decrease_interval = decrease_interval
+
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._latency_avg: Optional[float] = None
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                elif self._in_flight < int(self.limit):
+                    break
+                else:
+                    self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float) -> None:
+        with self._cond:
+            avg = self._latency_avg
+            stable = avg is None or latency <= avg * self.tolerance
+            self._latency_avg = latency if avg is None else 0.8 * avg + 0.2 * latency
+
+            if stable and self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self._publish()
+                self._cond.notify_all()
+
+    def on_overload(self, retry_after: Optional[float] = None) -> None:
+        with self._cond:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.decrease_interval:
+                self._last_decrease = now
+                self.limit = max(float(self.minimum), self.limit / 2)
+                self._publish()
+                logger.debug(f"Concurrency limit for {self.host} reduced to {int(self.limit)}")
+
+            if retry_after:
+                if now >= self._paused_until:
+                    logger.info(f"{self.host} asked to retry after {retry_after:.0f}s; pausing new requests.")
+                self._paused_until = max(self._paused_until, now + retry_after)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("fetch_concurrency_limit", int(self.limit), host=self.host)
+
+
+class HostLimiters:
+    """One AdaptiveLimiter per host, created on first use with shared settings."""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._limiters: dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, **settings) -> None:
+        """Updates settings for hosts not seen yet (running limits keep their state)."""
+        with self._lock:
+            self.settings.update(settings)
+
+    def get(self, host: str) -> AdaptiveLimiter:
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = AdaptiveLimiter(host, **self.settings)
+            return limiter
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Duplicate-call suppression: while `fn` runs for a key, other callers
+    with the same key wait and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Returns (result, shared); `shared` is True for callers that waited."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+# Process-wide state shared by all ImageHandler instances
+circuit_breaker = CircuitBreaker()
+latency_history = LatencyHistory()
+host_limiters = HostLimiters()
+single_flight = SingleFlight()
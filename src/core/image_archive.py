@@ -0,0 +1,116 @@
+# src/core/image_archive.py
+"""
+Local, content-addressed image archive.
+
+Layout (under global.archive_dir, default "cache/images"):
+    objects/<aa>/<sha256>.png     one file per distinct image content
+    manifest.jsonl                one JSON line per stored URL:
+                                  {"url", "sha256", "size", "stored_at"}
+
+The manifest is append-only (last line for a URL wins), so an interrupted
+prefetch loses nothing that was already written and simply resumes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = "cache/images"
+
+
+class ImageArchive:
+    MANIFEST_NAME = "manifest.jsonl"
+
+    def __init__(self, root: Path | str = DEFAULT_ARCHIVE_DIR):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.manifest_path = self.root / self.MANIFEST_NAME
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, Any]] = self._load_manifest()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ImageArchive":
+        return cls((config.get("global") or {}).get("archive_dir", DEFAULT_ARCHIVE_DIR))
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return url in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def digest_for(self, url: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(url)
+        return entry["sha256"] if entry else None
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Returns the archived bytes for `url`, or None if absent/unreadable."""
+        digest = self.digest_for(url)
+        if digest is None:
+            return None
+        try:
+            return self.object_path(digest).read_bytes()
+        except OSError as e:
+            logger.warning(f"Archive object missing for {url} ({e})")
+            return None
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / f"{digest}.png"
+
+    # ------------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------------
+    def put(self, url: str, data: bytes) -> str:
+        """Stores `data` for `url` (deduplicated by content). Returns the sha256."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+
+        entry = {
+            "url": url,
+            "sha256": digest,
+            "size": len(data),
+            "stored_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        with self._lock:
+            if self._entries.get(url, {}).get("sha256") == digest:
+                return digest
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._entries[url] = entry
+        return digest
+
+    def _load_manifest(self) -> dict[str, dict[str, Any]]:
+        entries: dict[str, dict[str, Any]] = {}
+        if not self.manifest_path.exists():
+            return entries
+
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entries[entry["url"]] = entry
+                except (ValueError, KeyError):
+                    # e.g. a half-written last line after a crash
+                    continue
+        return entries
@@ -1,26 +1,183 @@
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 from urllib3.util.retry import Retry
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, PngImagePlugin
 from io import BytesIO
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+import copy
 import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .fetch_control import (
+    CircuitBreaker,
+    Deadline,
+    circuit_breaker,
+    host_limiters,
+    latency_history,
+    single_flight,
+)
+from .image_archive import ImageArchive
+from .metrics import carry_scope, metrics
 
 # Setup Logger
 logger = logging.getLogger(__name__)
 
+
+# Default network settings (overridable via config.yaml -> global.fetch)
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 15.0
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN = 30.0
+REPORT_DEADLINE = 120.0
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+CONCURRENCY_INITIAL = 4
+CONCURRENCY_MIN = 1
+CONCURRENCY_MAX = 16
+
+# Errors that say "the host is unreachable/unhealthy" (a 404 does not)
+_HOST_FAILURES = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.RetryError,
+)
+
+# Placeholder geometry: long side in px; default matches the portrait map images
+PLACEHOLDER_LONG_SIDE = 1200
+DEFAULT_PLACEHOLDER_SIZE = (655, 1200)
+
+# PNG text chunk written into every placeholder so it can be told apart from real maps
+PLACEHOLDER_PNG_TAG = ("Software", "hii-report-placeholder")
+
+
+@lru_cache(maxsize=None)
+def _load_font(size: int):
+    """Loads the placeholder font once per size (disk lookup is slow on Windows)."""
+    try:
+        return ImageFont.truetype("arial.ttf", size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+@lru_cache(maxsize=64)
+def _render_placeholder(text: str, width: int, height: int) -> bytes:
+    """Renders a placeholder PNG and returns the encoded bytes (memoized)."""
+    img = Image.new('RGB', (width, height), color='white')
+    draw = ImageDraw.Draw(img)
+    font = _load_font(max(1, min(width, height) // 20))
+
+    # Text handling
+    try:
+        bbox = draw.textbbox((0, 0), text, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+    except AttributeError:
+        text_width, text_height = draw.textsize(text, font=font)
+
+    x = (width - text_width) // 2
+    y = (height - text_height) // 2
+
+    draw.text((x, y), text, fill='gray', font=font)
+    draw.rectangle([0, 0, width-1, height-1], outline='lightgray', width=2)
+
+    info = PngImagePlugin.PngInfo()
+    info.add_text(*PLACEHOLDER_PNG_TAG)
+
+    buf = BytesIO()
+    img.save(buf, format='PNG', pnginfo=info)
+    return buf.getvalue()
+
+
+def is_placeholder(data: bytes) -> bool:
+    """True for images made by _render_placeholder (tagged PNG), not real maps."""
+    try:
+        with Image.open(BytesIO(data)) as img:
+            return img.info.get(PLACEHOLDER_PNG_TAG[0]) == PLACEHOLDER_PNG_TAG[1]
+    except OSError:
+        return False
+
+
+class _HedgeCancelled(Exception):
+    """Raised inside the losing attempt of a hedged request."""
+
+
+class _RetryableFailure(Exception):
+    """One failed attempt that _fetch may retry; `error` is what the caller sees if it does not."""
+
+    def __init__(self, error: Exception, retry_after: float | None = None):
+        super().__init__(str(error))
+        self.error = error
+        self.retry_after = retry_after
+
+
+# Responses that are retried and reported to the host's adaptive limiter as overload
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Only used to parse Retry-After headers (seconds or HTTP date)
+_RETRY_AFTER_PARSER = Retry(0)
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    try:
+        return _RETRY_AFTER_PARSER.get_retry_after(response.raw)
+    except (Urllib3HTTPError, AttributeError, ValueError):
+        return None
+
+
 class ImageHandler:
-    def __init__(self, retries=3, backoff_factor=0.3):
+    def __init__(
+        self,
+        retries=3,
+        backoff_factor=0.3,
+        pool_maxsize=10,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        deadline: float | None = REPORT_DEADLINE,
+        breaker: CircuitBreaker | None = None,
+        hedge: bool = False,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        hedge_min_samples: int = HEDGE_MIN_SAMPLES,
+        archive: ImageArchive | None = None,
+        offline: bool = False,
+    ):
+        """
+        `deadline` is the overall fetch budget in seconds, counted from now
+        (one handler per report run). `breaker` defaults to the process-wide
+        per-host circuit breaker.
+
+        With `hedge=True`, a request still running after the URL pattern's
+        p`hedge_percentile` latency gets ONE duplicate; the first to finish
+        wins and the other is cancelled (load is at most doubled). Hedging
+        stays off for a pattern until `hedge_min_samples` latencies exist.
+
+        With `offline=True` no network request is made: images come only from
+        `archive` (see --prefetch) and anything missing becomes a placeholder.
+        """
         self.session = requests.Session()
+        # url -> raw bytes (None = download already failed), filled by prefetch()
+        self._prefetched: dict[str, bytes | None] = {}
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = Deadline(deadline)
+        self.breaker = breaker or circuit_breaker
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.archive = archive
+        self.offline = offline
+        self._pool_maxsize = pool_maxsize
+        self._hedge_pool: ThreadPoolExecutor | None = None
+        self._hedge_pool_lock = threading.Lock()
         
-        # Setup Retry Strategy
-        retry = Retry(
-            total=retries,
-            read=retries,
-            connect=retries,
-            backoff_factor=backoff_factor,
-            status_forcelist=[500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry)
+        # No urllib3 retries: _fetch retries itself, outside the limiter slot and within the deadline
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
         self.session.mount('http://', adapter)
         self.session.mount('https://', adapter)
         
@@ -28,62 +185,313 @@ class ImageHandler:
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         })
 
+    @classmethod
+    def from_config(cls, config: dict, offline: bool = False, **kwargs) -> "ImageHandler":
+        """
+        Builds a handler from config.yaml's `global.fetch` section
+        (missing keys keep the module defaults; explicit kwargs win).
+        `offline=True` attaches the local archive at `global.archive_dir`.
+        """
+        fetch_cfg = (config.get("global") or {}).get("fetch") or {}
+        hedge_cfg = fetch_cfg.get("hedge") or {}
+        circuit_breaker.configure(
+            failure_threshold=int(fetch_cfg.get("breaker_failures", BREAKER_FAILURES)),
+            cooldown=float(fetch_cfg.get("breaker_cooldown", BREAKER_COOLDOWN)),
+        )
+
+        concurrency_cfg = fetch_cfg.get("concurrency") or {}
+        host_limiters.configure(
+            initial=int(concurrency_cfg.get("initial", CONCURRENCY_INITIAL)),
+            minimum=int(concurrency_cfg.get("min", CONCURRENCY_MIN)),
+            maximum=int(concurrency_cfg.get("max", CONCURRENCY_MAX)),
+        )
+
+        history_file = fetch_cfg.get("latency_history_file")
+        if history_file and latency_history.path != Path(history_file):
+            latency_history.load(history_file)
+
+        params = dict(
+            connect_timeout=float(fetch_cfg.get("connect_timeout", CONNECT_TIMEOUT)),
+            read_timeout=float(fetch_cfg.get("read_timeout", READ_TIMEOUT)),
+            deadline=fetch_cfg.get("report_deadline", REPORT_DEADLINE),
+            hedge=bool(hedge_cfg.get("enabled", False)),
+            hedge_percentile=float(hedge_cfg.get("percentile", HEDGE_PERCENTILE)),
+            hedge_min_samples=int(hedge_cfg.get("min_samples", HEDGE_MIN_SAMPLES)),
+        )
+        if offline:
+            params.update(offline=True, archive=ImageArchive.from_config(config))
+        params.update(kwargs)
+        return cls(**params)
+
+    def prefetch(self, urls: list[str], max_workers: int = 8, cancel: threading.Event | None = None) -> int:
+        """
+        Downloads all URLs concurrently and keeps the raw bytes in memory,
+        so later get_image() calls for the same URLs are served without network I/O.
+        Once `cancel` is set, URLs not yet started are left out (not marked failed).
+        Returns the number of images that downloaded successfully.
+        """
+        pending = [u for u in dict.fromkeys(urls) if u not in self._prefetched]
+        if not pending:
+            return 0
+
+        download = carry_scope(self._download)
+
+        def _fetch(url: str) -> tuple[bool, bytes | None]:
+            if cancel is not None and cancel.is_set():
+                return False, None
+            return True, download(url)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending)))) as pool:
+            for url, (fetched, data) in zip(pending, pool.map(_fetch, pending)):
+                if fetched:
+                    self._prefetched[url] = data
+
+        ok = sum(1 for u in pending if self._prefetched.get(u) is not None)
+        logger.info(f"Prefetched {ok}/{len(pending)} images.")
+        return ok
+
+    def seed(self, images: dict[str, bytes | None]) -> None:
+        """
+        Serves `images` (url -> bytes, None = known to be unavailable) as if they
+        had been prefetched, e.g. from a resumed batch job's checkpoints.
+        """
+        self._prefetched.update(images)
+
+    def rearm(self, keep_prefetched: bool = True) -> None:
+        """
+        Prepares a handler that was warmed up ahead of time (speculative prefetch,
+        resident service) for a real run: restarts the fetch deadline from now and
+        forgets failed prefetches so they are retried instead of turning straight
+        into placeholders. `keep_prefetched=False` also drops successful ones.
+        """
+        self.deadline = Deadline(self.deadline.seconds)
+        for url, data in list(self._prefetched.items()):
+            if data is None or not keep_prefetched:
+                self._prefetched.pop(url, None)
+
+    def for_run(self) -> "ImageHandler":
+        """
+        A handler for one of several concurrent runs (--http jobs): shares this
+        one's session (connection pool), hedge pool and settings, but has its
+        own fetch deadline, counted from now, and its own prefetched images.
+        """
+        if self.hedge:
+            self._get_hedge_pool()  # created once here, not once per copy
+        handler = copy.copy(self)
+        handler.deadline = Deadline(self.deadline.seconds)
+        handler._prefetched = {}
+        return handler
+
     def download_image(self, url: str) -> BytesIO:
         """
         Downloads an image. Returns None if fails (logs warning).
+        Serves prefetched bytes first; a failed prefetch is not retried.
+        """
+        data = self._prefetched[url] if url in self._prefetched else self._download(url)
+        return BytesIO(data) if data is not None else None
+
+    def _timeout(self) -> tuple[float, float]:
+        """(connect, read) timeouts, clipped to what is left of the deadline."""
+        remaining = self.deadline.remaining()
+        if remaining is None:
+            return self.connect_timeout, self.read_timeout
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def _download(self, url: str) -> bytes | None:
+        """
+        Single-flight download: concurrent requests for the same URL (from any
+        handler in this process) share one network fetch and one bytes object.
         """
+        data, shared = single_flight.do(url, lambda: self._download_bytes(url))
+        if shared:
+            metrics.inc("image_download_coalesced_total")
+        return data
+
+    def _download_bytes(self, url: str) -> bytes | None:
+        if self.offline:
+            data = self.archive.get(url) if self.archive is not None else None
+            if data is None:
+                logger.warning(f"Not in local archive (offline): {url}")
+                metrics.inc("image_download_skipped_total", reason="offline_miss")
+            return data
+
+        host = urlsplit(url).hostname or ""
+
+        if self.deadline.expired():
+            logger.warning(f"Skipped (fetch deadline of {self.deadline.seconds}s reached): {url}")
+            metrics.inc("image_download_skipped_total", reason="deadline")
+            return None
+
+        if not self.breaker.allow(host):
+            logger.warning(f"Skipped (circuit open for {host}): {url}")
+            metrics.inc("image_download_skipped_total", reason="circuit_open")
+            return None
+
+        start = time.perf_counter()
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return BytesIO(response.content)
+            content = self._get_content(url)
+            self.breaker.record_success(host)
+            metrics.observe("image_download_seconds", time.perf_counter() - start, outcome="ok")
+            metrics.inc("image_download_bytes_total", len(content))
+            return content
             
         except requests.exceptions.HTTPError as e:
             # [Clean Log] บอกแค่ URL และ Status Code พอ
             status = e.response.status_code
+            self.breaker.record_success(host)  # host answered; the image just isn't there
             logger.warning(f"Image not found: {url} (Status: {status})")
+            metrics.observe("image_download_seconds", time.perf_counter() - start, outcome="http_error")
+            metrics.inc("image_download_failures_total", reason=str(status))
+            return None
+
+        except _HOST_FAILURES as e:
+            self.breaker.record_failure(host)
+            logger.warning(f"Download failed: {url} ({e})")
+            metrics.observe("image_download_seconds", time.perf_counter() - start, outcome="error")
+            metrics.inc("image_download_failures_total", reason=type(e).__name__)
             return None
             
         except Exception as e:
             logger.warning(f"Download failed: {url} ({e})")
+            metrics.observe("image_download_seconds", time.perf_counter() - start, outcome="error")
+            metrics.inc("image_download_failures_total", reason=type(e).__name__)
             return None
 
-    def create_placeholder(self, text: str, width: int = 655, height: int = 1200) -> BytesIO:
+        finally:
+            # A half-open probe that ended in neither success nor host failure
+            # must not leave the host blocked
+            self.breaker.end_probe(host)
+
+    # ------------------------------------------------------------------
+    # HTTP GET (plain / hedged)
+    # ------------------------------------------------------------------
+    def _get_content(self, url: str) -> bytes:
+        """GET `url` and return the body; raises like requests does."""
+        threshold = None
+        if self.hedge:
+            threshold = latency_history.percentile(url, self.hedge_percentile, self.hedge_min_samples)
+        if threshold is None:
+            return self._fetch(url)
+        return self._hedged_fetch(url, threshold)
+
+    def _fetch(self, url: str, cancel: threading.Event | None = None) -> bytes:
         """
-        Creates a placeholder image in memory.
+        GET with up to `retries` retries on connection errors, timeouts and
+        RETRY_STATUSES (backoff_factor * 2**n, or Retry-After if longer).
+        Each attempt runs inside a slot of the host's adaptive concurrency
+        limiter; the slot is free while backing off, and a retry whose wait
+        would outlast the fetch deadline is not made (the last error is raised).
+        With `cancel`, the body is streamed and abandoned once set.
         """
-        try:
-            img = Image.new('RGB', (width, height), color='white')
-            draw = ImageDraw.Draw(img)
-            
-            # Font handling
-            font_size = min(width, height) // 20
+        limiter = host_limiters.get(urlsplit(url).hostname or "")
+        attempt = 0
+        while True:
             try:
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except IOError:
-                font = ImageFont.load_default()
+                return self._attempt(url, limiter, cancel)
+            except _RetryableFailure as failure:
+                wait_for = max(self.backoff_factor * 2 ** attempt, failure.retry_after or 0.0)
+                remaining = self.deadline.remaining()
+                if (
+                    attempt >= self.retries
+                    or (remaining is not None and wait_for >= remaining)
+                    or (cancel is not None and cancel.is_set())
+                ):
+                    raise failure.error from None
 
-            # Text handling
+            attempt += 1
+            metrics.inc("image_download_retries_total")
+            logger.debug(f"Retry {attempt}/{self.retries} in {wait_for:.2f}s: {url}")
+            if cancel is not None:
+                cancel.wait(wait_for)
+            else:
+                time.sleep(wait_for)
+
+    def _attempt(self, url: str, limiter, cancel: threading.Event | None) -> bytes:
+        """Single GET inside a limiter slot; raises _RetryableFailure for retryable outcomes."""
+        with limiter.slot():
+            start = time.perf_counter()
             try:
-                bbox = draw.textbbox((0, 0), text, font=font)
-                text_width = bbox[2] - bbox[0]
-                text_height = bbox[3] - bbox[1]
-            except AttributeError:
-                text_width, text_height = draw.textsize(text, font=font)
-
-            x = (width - text_width) // 2
-            y = (height - text_height) // 2
-            
-            draw.text((x, y), text, fill='gray', font=font)
-            draw.rectangle([0, 0, width-1, height-1], outline='lightgray', width=2)
-            
-            buf = BytesIO()
-            img.save(buf, format='PNG')
-            buf.seek(0)
+                response = self.session.get(url, timeout=self._timeout(), stream=cancel is not None)
+            except requests.exceptions.Timeout as e:
+                limiter.on_overload()
+                raise _RetryableFailure(e) from e
+            except requests.exceptions.ConnectionError as e:
+                raise _RetryableFailure(e) from e
+            try:
+                if response.status_code in RETRY_STATUSES:
+                    retry_after = _retry_after(response)
+                    limiter.on_overload(retry_after)
+                    error = requests.exceptions.RetryError(
+                        f"Too many {response.status_code} responses from {url}", response=response
+                    )
+                    raise _RetryableFailure(error, retry_after)
+                response.raise_for_status()
+                if cancel is None:
+                    content = response.content
+                else:
+                    chunks = []
+                    for chunk in response.iter_content(64 * 1024):
+                        if cancel.is_set():
+                            raise _HedgeCancelled(url)
+                        chunks.append(chunk)
+                    content = b"".join(chunks)
+            finally:
+                response.close()
+            latency = time.perf_counter() - start
+
+        limiter.on_success(latency)
+        latency_history.record(url, latency)
+        return content
+
+    def _hedged_fetch(self, url: str, threshold: float) -> bytes:
+        pool = self._get_hedge_pool()
+        fetch = carry_scope(self._fetch)
+        cancels = [threading.Event(), threading.Event()]
+        attempts = [pool.submit(fetch, url, cancels[0])]
+
+        done, _ = wait(attempts, timeout=threshold)
+        if not done:
+            logger.debug(f"Hedging after {threshold:.2f}s: {url}")
+            metrics.inc("image_hedges_total")
+            attempts.append(pool.submit(fetch, url, cancels[1]))
+
+        pending = set(attempts)
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for attempt, cancel in zip(attempts, cancels):
+                        if attempt is not future:
+                            cancel.set()
+                    if future is not attempts[0]:
+                        metrics.inc("image_hedge_wins_total")
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+
+    def _get_hedge_pool(self) -> ThreadPoolExecutor:
+        with self._hedge_pool_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=2 * self._pool_maxsize, thread_name_prefix="hedge"
+                )
+            return self._hedge_pool
+
+    def create_placeholder(self, text: str, width: int = 655, height: int = 1200) -> BytesIO:
+        """
+        Creates a placeholder image in memory.
+        Rendered PNGs are memoized per (text, width, height), so repeated
+        misses (e.g. an upstream outage) cost only a BytesIO wrapper.
+        """
+        try:
+            buf = BytesIO(_render_placeholder(text, width, height))
             
             # [Clean Log] บอกแค่ว่าสร้าง Placeholder เสร็จแล้ว (ไม่ต้องบอก path/size)
             # .replace เพื่อให้ log อยู่บรรทัดเดียวสวยๆ
             clean_text = text.replace('\n', ' ').replace('\r', '')
             logger.info(f"-> Generated placeholder instead. (Text: '{clean_text}')")
+            metrics.inc("placeholders_total")
             
             return buf
             
@@ -95,9 +503,27 @@ class ImageHandler:
             buf.seek(0)
             return buf
 
-    def get_image(self, url: str, placeholder_text: str = "N/A") -> BytesIO:
+    @staticmethod
+    def placeholder_size(aspect_ratio: float | None) -> tuple[int, int]:
+        """
+        Returns a (width, height) in pixels matching the target shape's
+        aspect ratio (width / height), with the long side fixed.
+        """
+        if not aspect_ratio or aspect_ratio <= 0:
+            return DEFAULT_PLACEHOLDER_SIZE
+        if aspect_ratio < 1:
+            return max(1, round(PLACEHOLDER_LONG_SIDE * aspect_ratio)), PLACEHOLDER_LONG_SIDE
+        return PLACEHOLDER_LONG_SIDE, max(1, round(PLACEHOLDER_LONG_SIDE / aspect_ratio))
+
+    def get_image(
+        self,
+        url: str,
+        placeholder_text: str = "N/A",
+        aspect_ratio: float | None = None,
+    ) -> BytesIO:
         """
         Tries to download. If fails, returns placeholder immediately.
+        `aspect_ratio` (width / height of the target shape) sizes the placeholder.
         """
         img_stream = self.download_image(url)
         if img_stream:
@@ -106,4 +532,9 @@ class ImageHandler:
         # [Clean Log] ลบ log "Attempting..." ทิ้งไปเลย เพราะข้างบนมี Warning แล้ว
         # และข้างล่างก็จะมี Info บอกว่าสร้าง placeholder
         
-        return self.create_placeholder(f"Image Not Found:\n{placeholder_text}")
\ No newline at end of file
+        return self.placeholder_image(placeholder_text, aspect_ratio)
+
+    def placeholder_image(self, placeholder_text: str = "N/A", aspect_ratio: float | None = None) -> BytesIO:
+        """The "Image Not Found" placeholder get_image() falls back to."""
+        width, height = self.placeholder_size(aspect_ratio)
+        return self.create_placeholder(f"Image Not Found:\n{placeholder_text}", width, height)
\ No newline at end of file
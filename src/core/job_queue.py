@@ -0,0 +1,213 @@
+# src/core/job_queue.py
+"""
+Durable job queue for batch backfills (SQLite, standard library only).
+
+One row per OutputSpec (report_type, year, month, mode):
+
+    pending -> fetching -> assembling -> done
+                    \\            \\
+                     +------------+--> failed
+
+Per-job checkpoints record the sha256 (ImageArchive digest) of every image
+already fetched, so a run that crashed or was interrupted by a reboot resumes
+without downloading those images again. Jobs that are `done` are never
+re-run; jobs caught mid-way are put back to `pending` by recover().
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .output_manager import OutputSpec
+
+DEFAULT_QUEUE_PATH = "cache/jobs.sqlite3"
+
+STATES = ("pending", "fetching", "assembling", "done", "failed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_type TEXT    NOT NULL,
+    year        INTEGER NOT NULL,
+    month       INTEGER NOT NULL,
+    mode        TEXT    NOT NULL,
+    state       TEXT    NOT NULL DEFAULT 'pending',
+    output_path TEXT,
+    error       TEXT,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    created_at  TEXT    NOT NULL,
+    updated_at  TEXT    NOT NULL,
+    UNIQUE (report_type, year, month, mode)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    url    TEXT    NOT NULL,
+    sha256 TEXT    NOT NULL,
+    PRIMARY KEY (job_id, url)
+);
+"""
+
+
+@dataclass(frozen=True)
+class QueuedJob:
+    id: int
+    spec: OutputSpec
+    state: str
+    output_path: Optional[str]
+    attempts: int
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class JobQueue:
+    """
+    Thin wrapper over one SQLite file (WAL mode). Every call commits
+    immediately, so the on-disk state is always what the last step finished.
+    """
+
+    def __init__(self, path: Path | str = DEFAULT_QUEUE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "JobQueue":
+        return cls((config.get("global") or {}).get("job_queue", DEFAULT_QUEUE_PATH))
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "JobQueue":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+    def enqueue(self, specs: list[OutputSpec]) -> int:
+        """Adds specs not queued yet (existing rows, incl. done ones, are kept). Returns the number added."""
+        now = _now()
+        with self._lock, closing(self._conn.cursor()) as cur:
+            before = self._conn.total_changes
+            cur.executemany(
+                "INSERT OR IGNORE INTO jobs (report_type, year, month, mode, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(s.report_type, s.year, s.month, s.mode, now, now) for s in specs],
+            )
+            return self._conn.total_changes - before
+
+    def recover(self, retry_failed: bool = True, max_attempts: int = 3) -> int:
+        """
+        Puts jobs interrupted mid-way (fetching/assembling) back to pending,
+        plus failed ones with attempts left. Returns the number re-queued.
+        """
+        states = ("fetching", "assembling") + (("failed",) if retry_failed else ())
+        placeholders = ",".join("?" * len(states))
+        with self._lock:
+            cur = self._conn.execute(
+                f"UPDATE jobs SET state='pending', updated_at=? "
+                f"WHERE state IN ({placeholders}) AND (state != 'failed' OR attempts < ?)",
+                (_now(), *states, max_attempts),
+            )
+            return cur.rowcount
+
+    def claim_next(self) -> Optional[QueuedJob]:
+        """Moves the oldest pending job to `fetching` and returns it (None when drained)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE state='pending' ORDER BY year, month, id LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET state='fetching', attempts=attempts+1, error=NULL, updated_at=? WHERE id=?",
+                    (_now(), row[0]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get(row[0])
+
+    def output_paths_in_use(self) -> set[Path]:
+        """Output paths reserved by jobs not done yet (a failed or resumed job reuses its path)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT output_path FROM jobs WHERE state != 'done' AND output_path IS NOT NULL"
+            ).fetchall()
+        return {Path(row[0]) for row in rows}
+
+    def get(self, job_id: int) -> Optional[QueuedJob]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, report_type, year, month, mode, state, output_path, attempts FROM jobs WHERE id=?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return QueuedJob(
+            id=row[0],
+            spec=OutputSpec(report_type=row[1], year=row[2], month=row[3], mode=row[4]),
+            state=row[5],
+            output_path=row[6],
+            attempts=row[7],
+        )
+
+    def set_state(self, job_id: int, state: str, output_path: str | None = None, error: str | None = None) -> None:
+        if state not in STATES:
+            raise ValueError(f"Unknown job state: {state!r}")
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state=?, output_path=COALESCE(?, output_path), error=?, updated_at=? WHERE id=?",
+                (state, output_path, error, _now(), job_id),
+            )
+
+    def counts(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        return {state: 0 for state in STATES} | dict(rows)
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+    def add_checkpoint(self, job_id: int, url: str, sha256: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (job_id, url, sha256) VALUES (?, ?, ?)",
+                (job_id, url, sha256),
+            )
+
+    def checkpoints(self, job_id: int) -> dict[str, str]:
+        """url -> sha256 of the images this job already fetched."""
+        with self._lock:
+            rows = self._conn.execute("SELECT url, sha256 FROM checkpoints WHERE job_id=?", (job_id,)).fetchall()
+        return dict(rows)
+
+
+def output_paths_in_use(config: dict) -> set[Path]:
+    """
+    JobQueue.output_paths_in_use() of the queue at `global.job_queue`, for an
+    OutputManager outside the batch (the queue file is not created if no batch ran).
+    """
+    path = Path((config.get("global") or {}).get("job_queue", DEFAULT_QUEUE_PATH))
+    if not path.exists():
+        return set()
+    with JobQueue(path) as queue:
+        return queue.output_paths_in_use()
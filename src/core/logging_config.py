@@ -1,7 +1,26 @@
 # src/core/logging_config.py
+"""
+Logging goes through a queue: loggers (worker threads, hot paths such as
+PptEngine.set_text or download warnings) only put the record on a queue;
+one background QueueListener thread formats it and does the console (Rich)
+and file I/O.
+
+    setup_logging(...)       -> sinks: console and/or file (call again to change them)
+    set_log_file(path)       -> swap only the per-run log file (CLI menu loop, service)
+    process_log_queue()      -> a multiprocessing queue for worker processes, which call
+    init_worker_logging(q)      in their pool initializer
+"""
 from __future__ import annotations
+import atexit
 import logging
+import multiprocessing
+import queue
+import threading
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Any, Iterator
 
 # ต้องลง rich ใน requirements.txt ด้วยนะครับ
 try:
@@ -15,6 +34,57 @@ except ImportError:
 FILE_FMT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 DATE_FMT = "%Y-%m-%d %H:%M:%S"
 
+# Records kept while the menu has logging muted (the oldest are dropped beyond this)
+MUTED_RECORDS_LIMIT = 10000
+
+
+class _LocalQueueHandler(QueueHandler):
+    """
+    Same-process queue: the record object is handed over as is, so only the
+    message is merged here (cheap) and exc_info stays for Rich tracebacks.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class _LogPipeline:
+    """The root QueueHandler, its queue and the listener thread that owns the sinks."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.queue: Any = queue.SimpleQueue()
+        self.handler: QueueHandler = _LocalQueueHandler(self.queue)
+        self.listener: QueueListener | None = None
+        self.console: logging.Handler | None = None
+        self.file: logging.Handler | None = None
+
+    def restart(self) -> None:
+        """Drains the queue into the current sinks, then listens with the new ones."""
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+            sinks = [h for h in (self.console, self.file) if h is not None]
+            # Records no sink wants are dropped at the logger, before the queue
+            logging.getLogger().setLevel(min((h.level for h in sinks), default=logging.WARNING))
+            self.listener = QueueListener(self.queue, *sinks, respect_handler_level=True)
+            self.listener.start()
+
+    def stop(self) -> None:
+        with self.lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+            if self.file is not None:
+                self.file.close()
+
+
+_pipeline = _LogPipeline()
+# Runs before logging's own atexit shutdown: flush what is still queued
+atexit.register(_pipeline.stop)
+
 def setup_logging(
     level: str = "INFO",
     log_file: Path | None = None,
@@ -22,12 +92,17 @@ def setup_logging(
     console_style: str = "dev",  # "dev" หรือ "user"
     file_level: str | None = None,
 ) -> None:
+    """
+    Configures the console / file sinks. The root logger only ever gets the
+    one QueueHandler; calling this again swaps the sinks behind the queue.
+    """
     root = logging.getLogger()
-    root.setLevel(logging.DEBUG) # ปล่อยให้ Root รับทุกอย่าง Handler ค่อยกรองเอง
+    # ระดับของ Root = ระดับต่ำสุดของ sink ทั้งหมด (ตั้งใน _LogPipeline.restart) แต่ละ Handler ค่อยกรองเอง
 
-    # ล้าง handler เก่า
+    # ล้าง handler เก่า (root มีแค่ QueueHandler ตัวเดียว)
     for h in list(root.handlers):
         root.removeHandler(h)
+    root.addHandler(_pipeline.handler)
 
     # ---- 1. Mute Noisy Libraries (Silence the clutter) ----
     # จำกัดระดับ Log ของ Library ภายนอกให้แสดงเฉพาะคำเตือน (WARNING) หรือข้อผิดพลาด (ERROR) เท่านั้น
@@ -37,6 +112,7 @@ def setup_logging(
     logging.getLogger("matplotlib").setLevel(logging.WARNING)
 
     # ---- 2. Console Handler ----
+    console_handler: logging.Handler | None = None
     if not quiet:
         console_level = getattr(logging, level.upper(), logging.INFO)
         
@@ -53,20 +129,117 @@ def setup_logging(
                 show_level=True,
                 log_time_format="[%X]" if is_user_mode else "[%Y-%m-%d %H:%M:%S]"
             )
-            root.addHandler(rich_handler)
+            console_handler = rich_handler
         else:
             # Fallback when rich is not available
             ch = logging.StreamHandler()
             ch.setLevel(console_level)
             fmt = "[%(levelname)s] %(message)s"
             ch.setFormatter(logging.Formatter(fmt))
-            root.addHandler(ch)
+            console_handler = ch
 
     # ---- 3. File Handler (Detailed Logging) ----
-    if log_file:
-        log_file.parent.mkdir(parents=True, exist_ok=True)
-        fh = logging.FileHandler(log_file, encoding="utf-8")
-        effective_file_level = file_level or level
-        fh.setLevel(getattr(logging, effective_file_level.upper(), logging.DEBUG))
-        fh.setFormatter(logging.Formatter(fmt=FILE_FMT, datefmt=DATE_FMT))
-        root.addHandler(fh)
\ No newline at end of file
+    with _pipeline.lock:
+        _pipeline.console = console_handler
+        _swap_file_handler(_build_file_handler(log_file, file_level or level))
+
+
+def set_log_file(log_file: Path | None, file_level: str = "DEBUG") -> None:
+    """
+    Points the file sink at a new per-run log (None = no file); the console
+    sink and the root logger are left alone. Call setup_logging() first.
+    """
+    with _pipeline.lock:
+        _swap_file_handler(_build_file_handler(log_file, file_level))
+
+
+def _build_file_handler(log_file: Path | None, level: str) -> logging.Handler | None:
+    if not log_file:
+        return None
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    fh = logging.FileHandler(log_file, encoding="utf-8")
+    fh.setLevel(getattr(logging, level.upper(), logging.DEBUG))
+    fh.setFormatter(logging.Formatter(fmt=FILE_FMT, datefmt=DATE_FMT))
+    return fh
+
+
+def _swap_file_handler(handler: logging.Handler | None) -> None:
+    old = _pipeline.file
+    _pipeline.file = handler
+    _pipeline.restart()  # old sinks get every record queued before the swap
+    if old is not None:
+        old.close()
+
+
+def process_log_queue(context: Any = None) -> Any:
+    """
+    Switches the pipeline to a multiprocessing queue (once) and returns it;
+    pass it to init_worker_logging() in worker processes so their records are
+    written by this process's listener (one writer per log file).
+    `context` must be the multiprocessing context the workers are started with.
+    """
+    with _pipeline.lock:
+        if not isinstance(_pipeline.queue, queue.SimpleQueue):
+            return _pipeline.queue
+        if _pipeline.listener is not None:
+            _pipeline.listener.stop()
+            _pipeline.listener = None
+        _pipeline.queue = (context or multiprocessing.get_context()).Queue(-1)
+        # Records now get pickled by the queue's feeder thread: standard prepare()
+        root = logging.getLogger()
+        installed = _pipeline.handler in root.handlers
+        if installed:
+            root.removeHandler(_pipeline.handler)
+        _pipeline.handler = QueueHandler(_pipeline.queue)
+        if installed:
+            root.addHandler(_pipeline.handler)
+        _pipeline.restart()
+        return _pipeline.queue
+
+
+def init_worker_logging(log_queue: Any, level: int = logging.DEBUG) -> None:
+    """Pool initializer for worker processes: everything goes to the parent's queue."""
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.setLevel(level)
+    # Standard QueueHandler: records are pickled, so it formats exc_info into text
+    root.addHandler(QueueHandler(log_queue))
+
+
+class _BufferHandler(logging.Handler):
+    """Keeps the newest `limit` records in memory (see mute_logging)."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.records: deque[logging.LogRecord] = deque(maxlen=limit)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+@contextmanager
+def mute_logging() -> Iterator[None]:
+    """
+    ปิด log ชั่วคราว (เช่น ระหว่างแสดงเมนู interactive) เพื่อไม่ให้ log จาก
+    background thread ไปแทรกหน้าจอ prompt; handler เดิมจะถูกคืนเมื่อออกจาก block
+    record ที่เกิดระหว่างนั้น (เช่น warning จาก speculative prefetch) ถูกเก็บไว้
+    แล้วส่งต่อให้ handler เดิมหลังออกจาก block จึงไม่หายไปจาก console/log file
+    """
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    for h in handlers:
+        root.removeHandler(h)
+    # ใช้แทน NullHandler: กัน logging.lastResort พิมพ์ WARNING ออก stderr ด้วย
+    buffer = _BufferHandler(MUTED_RECORDS_LIMIT)
+    root.addHandler(buffer)
+    try:
+        yield
+    finally:
+        root.removeHandler(buffer)
+        for h in handlers:
+            root.addHandler(h)
+        for record in buffer.records:
+            for h in handlers:
+                if record.levelno >= h.level:
+                    h.handle(record)
@@ -0,0 +1,323 @@
+# src/core/metrics.py
+"""
+Lightweight in-process metrics (counters, gauges, histograms).
+
+A single module-level registry (`metrics`) collects observations for the
+current run. At the end of a run main.py exports it to:
+  - a Prometheus node-exporter textfile (overwritten atomically each run)
+  - an append-only JSON-lines log that is NOT touched by log rotation
+
+Long-lived processes running several reports at once (the HTTP job API) give
+each run its own series with `metrics.scoped()`; pool threads started for that
+run join its scope when their task is wrapped with `carry_scope()`.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+PREFIX = "hii_report_"
+
+# Upper bounds (seconds) used by every histogram
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+# Raw values kept per histogram series (for the run history's per-image latencies)
+MAX_RAW_SAMPLES = 5000
+
+T = TypeVar("T")
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.samples: list[float] = []
+
+    def observe(self, value: float) -> None:
+        if len(self.samples) < MAX_RAW_SAMPLES:
+            self.samples.append(value)
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self, raw_samples: bool = False) -> dict[str, Any]:
+        data = {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": self.min,
+            "max": self.max,
+            "buckets": {str(b): c for b, c in zip(self.buckets, self.counts)},
+        }
+        if raw_samples:
+            data["samples"] = list(self.samples)
+        return data
+
+    def merge(self, data: dict[str, Any]) -> None:
+        """Adds another histogram's to_dict() (same buckets)."""
+        self.samples.extend(data.get("samples", [])[:MAX_RAW_SAMPLES - len(self.samples)])
+        self.count += data["count"]
+        self.sum += data["sum"]
+        for attr, pick in (("min", min), ("max", max)):
+            other, own = data[attr], getattr(self, attr)
+            if other is not None:
+                setattr(self, attr, other if own is None else pick(own, other))
+        for i, bound in enumerate(self.buckets):
+            self.counts[i] += data["buckets"].get(str(bound), 0)
+
+
+class _Series:
+    """One set of counters/gauges/histograms (the registry's own, or a scope's)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: dict[str, dict[LabelKey, float]] = {}
+        self.gauges: dict[str, dict[LabelKey, float]] = {}
+        self.histograms: dict[str, dict[LabelKey, _Histogram]] = {}
+
+
+class MetricsRegistry:
+    """
+    Thread-safe metric store.
+
+    Labels set with `labels(...)` apply to every observation made on the same
+    thread inside that context (e.g. report="flood" for one manager run).
+    Inside `scoped()` every read and write goes to that scope's series instead.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._own = _Series()
+        self._scope: contextvars.ContextVar[_Series | None] = contextvars.ContextVar(
+            f"metrics_scope_{id(self)}", default=None
+        )
+
+    @property
+    def _series(self) -> _Series:
+        return self._scope.get() or self._own
+
+    def reset(self) -> None:
+        """Forgets every series of the current scope (or of the registry)."""
+        fresh = _Series()
+        if self._scope.get() is not None:
+            self._scope.set(fresh)
+        else:
+            self._own = fresh
+
+    @contextmanager
+    def scoped(self) -> Iterator[None]:
+        """
+        Runs the block against a fresh, empty set of series: observations,
+        samples() and the exports see only what this block (and the pool
+        threads it hands `carry_scope()` tasks to) recorded. Used for one job
+        of the HTTP API while other jobs run on neighbouring threads.
+        """
+        token = self._scope.set(_Series())
+        try:
+            yield
+        finally:
+            self._scope.reset(token)
+
+    # ------------------------------------------------------------------
+    # Labels
+    # ------------------------------------------------------------------
+    @contextmanager
+    def labels(self, **labels: str) -> Iterator[None]:
+        """Context manager / decorator adding default labels on this thread."""
+        previous = getattr(self._local, "labels", {})
+        self._local.labels = {**previous, **labels}
+        try:
+            yield
+        finally:
+            self._local.labels = previous
+
+    def _key(self, labels: dict[str, Any]) -> LabelKey:
+        merged = {**getattr(self._local, "labels", {}), **labels}
+        return tuple(sorted((k, str(v)) for k, v in merged.items()))
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        data = self._series
+        with data.lock:
+            series = data.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        data = self._series
+        with data.lock:
+            data.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        data = self._series
+        with data.lock:
+            series = data.histograms.setdefault(name, {})
+            series.setdefault(key, _Histogram()).observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observes the wall time of the block (seconds) into histogram `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+    def samples(self, name: str, **labels: Any) -> list[float]:
+        """Raw observations of histogram `name` across series matching `labels`."""
+        wanted = {(k, str(v)) for k, v in labels.items()}
+        data = self._series
+        with data.lock:
+            return [
+                value
+                for key, hist in data.histograms.get(name, {}).items()
+                if wanted <= set(key)
+                for value in hist.samples
+            ]
+
+    def snapshot(self, raw_samples: bool = False) -> dict[str, Any]:
+        """
+        Returns a JSON-serialisable copy of all series; `raw_samples=True` also
+        includes each histogram's raw observations (for merge()).
+        """
+
+        def _series(store, convert):
+            return {
+                name: [{"labels": dict(key), "value": convert(v)} for key, v in series.items()]
+                for name, series in store.items()
+            }
+
+        data = self._series
+        with data.lock:
+            return {
+                "counters": _series(data.counters, lambda v: v),
+                "gauges": _series(data.gauges, lambda v: v),
+                "histograms": _series(data.histograms, lambda h: h.to_dict(raw_samples)),
+            }
+
+    def merge(self, snapshot: dict[str, Any]) -> None:
+        """
+        Adds a snapshot(raw_samples=True) taken in another process (e.g. a
+        --batch worker): counters and histograms are summed, gauges take the
+        snapshot's value. The snapshot's labels are used as they are.
+        """
+
+        def _items(kind):
+            for name, series in snapshot.get(kind, {}).items():
+                for item in series:
+                    yield name, tuple(sorted((k, str(v)) for k, v in item["labels"].items())), item["value"]
+
+        data = self._series
+        with data.lock:
+            for name, key, value in _items("counters"):
+                series = data.counters.setdefault(name, {})
+                series[key] = series.get(key, 0) + value
+            for name, key, value in _items("gauges"):
+                data.gauges.setdefault(name, {})[key] = value
+            for name, key, value in _items("histograms"):
+                data.histograms.setdefault(name, {}).setdefault(key, _Histogram()).merge(value)
+
+    def to_prometheus(self) -> str:
+        """Renders all series in the Prometheus text exposition format."""
+        lines: list[str] = []
+
+        def _fmt(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ""
+            body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+            return "{" + body + "}"
+
+        data = self._series
+        with data.lock:
+            for name, series in sorted(data.counters.items()):
+                lines.append(f"# TYPE {PREFIX}{name} counter")
+                for key, value in series.items():
+                    lines.append(f"{PREFIX}{name}{_fmt(key)} {value}")
+
+            for name, series in sorted(data.gauges.items()):
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{PREFIX}{name}{_fmt(key)} {value}")
+
+            for name, series in sorted(data.histograms.items()):
+                lines.append(f"# TYPE {PREFIX}{name} histogram")
+                for key, hist in series.items():
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{PREFIX}{name}_bucket{_fmt(key, (('le', str(bound)),))} {count}")
+                    lines.append(f"{PREFIX}{name}_bucket{_fmt(key, (('le', '+Inf'),))} {hist.count}")
+                    lines.append(f"{PREFIX}{name}_sum{_fmt(key)} {hist.sum}")
+                    lines.append(f"{PREFIX}{name}_count{_fmt(key)} {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(self, path: Path | str) -> None:
+        """
+        Writes the textfile atomically (tmp + rename), as node-exporter
+        may read the directory at any moment.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(self.to_prometheus(), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def append_json_log(self, path: Path | str, **run_info: Any) -> None:
+        """Appends one JSON line (run info + snapshot) to the metrics log."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            **run_info,
+            **self.snapshot(),
+        }
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def carry_scope(fn: Callable[..., T]) -> Callable[..., T]:
+    """
+    Wraps `fn` for a pool thread so it records into the metrics scope that is
+    active where it was wrapped (pool threads do not inherit context vars).
+    """
+    parent = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args: Any, **kwargs: Any) -> T:
+        # One copy per call: the same wrapper may run on several threads at once
+        return parent.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+# Process-wide registry
+metrics = MetricsRegistry()
@@ -2,14 +2,21 @@
 
 from __future__ import annotations
 
+import logging
+import time
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Callable, Iterable, Literal, Optional
 
+logger = logging.getLogger(__name__)
 
 Mode = Literal["prod", "dev"]
 
+# Temp files / empty reservations older than this are left over from a crashed run
+# (unless a batch job not done yet still holds the reservation: see `in_use`)
+STALE_TEMP_SECONDS = 6 * 3600
+
 
 @dataclass(frozen=True)
 class OutputSpec:
@@ -17,6 +24,7 @@ class OutputSpec:
     year: int
     month: int
     mode: Mode = "prod"
+    variant: Optional[str] = None  # <type>_report.variants.<name> (None = the main deck)
 
 
 class OutputManager:
@@ -28,15 +36,30 @@ class OutputManager:
     Filename (Official Thai Gov Format):
       - Drought: yyyymm_ผลการวิเคราะห์พื้นที่เสี่ยงแล้งเดือน{Start}-{End}{YY}.pptx
       - Flood:   yyyymm_ผลการวิเคราะห์พื้นที่เสี่ยงอุทกภัย{Start}-{End}{YY}.pptx
+      - Variant decks append "_{variant}" (e.g. ..._briefing.pptx)
       
     Responsibility:
       - Create folders
       - Generate official filename
       - Handle duplicates with Windows style naming: "File (1).pptx"
+      - Reserve the chosen name atomically (exclusive create), so concurrent
+        workers / operators on a shared drive never get the same file.
+        The deck is then written to a temp file in the same folder and
+        renamed over the reservation (PptEngine.save).
     """
 
-    def __init__(self, base_output_dir: str | Path = "output"):
+    def __init__(
+        self,
+        base_output_dir: str | Path = "output",
+        in_use: Optional[Callable[[], Iterable[Path | str]]] = None,
+    ):
+        """
+        `in_use` returns the reservations that must survive the stale-file
+        cleanup however old they are (job_queue.output_paths_in_use: a
+        re-queued --batch job writes to the path it reserved days ago).
+        """
         self.base_dir = Path(base_output_dir)
+        self.in_use = in_use
 
     def build_output_path(
         self,
@@ -45,7 +68,8 @@ class OutputManager:
     ) -> Path:
         """
         Returns the full output filepath with official naming and unique handling.
-        Ensures parent directories exist.
+        Ensures parent directories exist. The returned path is RESERVED (an empty
+        file now exists there); call release() if the run fails before saving.
         """
         self._validate_spec(spec)
 
@@ -60,9 +84,39 @@ class OutputManager:
         # 2. Generate Official Filename
         filename = self._generate_official_filename(spec)
 
-        # 3. Get Unique Path (Handle duplicates)
+        # 3. Reserve a Unique Path (Handle duplicates)
+        self._remove_stale_files(out_dir)
         return self._get_unique_filepath(out_dir, filename)
 
+    @staticmethod
+    def release(path: Path | str) -> None:
+        """Removes a reservation made by build_output_path() that was never written."""
+        path = Path(path)
+        try:
+            if path.stat().st_size == 0:
+                path.unlink()
+        except OSError:
+            pass
+
+    def find_latest(self, spec: OutputSpec) -> Optional[Path]:
+        """
+        Returns the most recently written output for spec (the official
+        filename or one of its "(n)" copies), or None if there is none yet.
+        """
+        self._validate_spec(spec)
+
+        out_dir = self.base_dir / spec.report_type
+        if spec.mode == "dev":
+            out_dir = out_dir / "_dev"
+
+        filename = Path(self._generate_official_filename(spec))
+        candidates = [out_dir / filename.name, *out_dir.glob(f"{filename.stem} (*){filename.suffix}")]
+        # Empty files are reservations of runs still in progress (or failed)
+        existing = [p for p in candidates if p.is_file() and p.stat().st_size > 0]
+        if not existing:
+            return None
+        return max(existing, key=lambda p: p.stat().st_mtime_ns)
+
     # --- Helper Functions ---
 
     def _get_thai_month_abbr(self, month_idx: int) -> str:
@@ -96,27 +150,61 @@ class OutputManager:
             topic = "อุทกภัย"
 
         # Format: 202601_ผลการวิเคราะห์พื้นที่เสี่ยง...
+        # 4. Variant decks (--variants) ต่อท้ายชื่อ variant เช่น ..._briefing.pptx
+        variant = f"_{spec.variant}" if spec.variant else ""
+
         return (
             f"{spec.year}{spec.month:02d}_"
-            f"ผลการวิเคราะห์พื้นที่เสี่ยง{topic}{m_start}-{m_end}{thai_year_short}.pptx"
+            f"ผลการวิเคราะห์พื้นที่เสี่ยง{topic}{m_start}-{m_end}{thai_year_short}{variant}.pptx"
         )
 
     def _get_unique_filepath(self, directory: Path, filename: str) -> Path:
         """
         เช็คไฟล์ซ้ำ ถ้าซ้ำให้เติม (1), (2) ... ตามสไตล์ Windows
+        จองชื่อด้วย exclusive create ("x"): check + create เป็นขั้นเดียว
+        จึงไม่มีสอง process ได้ชื่อเดียวกัน
         """
         name_stem = Path(filename).stem
         suffix = Path(filename).suffix
         
-        counter = 1
-        final_path = directory / filename
-        
-        while final_path.exists():
-            new_name = f"{name_stem} ({counter}){suffix}"
-            final_path = directory / new_name
-            counter += 1
-            
-        return final_path
+        counter = 0
+        while True:
+            name = filename if counter == 0 else f"{name_stem} ({counter}){suffix}"
+            final_path = directory / name
+            try:
+                with open(final_path, "x"):
+                    pass
+                return final_path
+            except FileExistsError:
+                counter += 1
+
+    def _remove_stale_files(self, directory: Path) -> None:
+        """
+        Deletes what crashed runs left behind: temp files of an interrupted save
+        (".<name>.<pid>.<thread>.tmp") and empty reservations, once they are
+        older than STALE_TEMP_SECONDS. Reservations listed by `in_use` are kept.
+        """
+        cutoff = time.time() - STALE_TEMP_SECONDS
+        stale = []
+        for path in [*directory.glob(".*.tmp"), *directory.glob("*.pptx")]:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_mtime < cutoff and (path.suffix == ".tmp" or st.st_size == 0):
+                stale.append(path)
+
+        keep: set[Path] = set()
+        if self.in_use is not None and any(path.suffix == ".pptx" for path in stale):
+            keep = {Path(p).resolve() for p in self.in_use()}
+        for path in stale:
+            if path.resolve() in keep:
+                continue
+            try:
+                path.unlink()
+                logger.info(f"Removed stale output file: {path}")
+            except OSError:
+                pass  # another worker got there first
 
     @staticmethod
     def _validate_spec(spec: OutputSpec) -> None:
@@ -130,4 +218,7 @@ class OutputManager:
             raise ValueError(f"year looks invalid (got {spec.year})")
 
         if spec.mode not in ("prod", "dev"):
-            raise ValueError(f"mode must be 'prod' or 'dev' (got {spec.mode})")
\ No newline at end of file
+            raise ValueError(f"mode must be 'prod' or 'dev' (got {spec.mode})")
+
+        if spec.variant is not None and (not spec.variant.strip() or any(c in spec.variant for c in '/\\:')):
+            raise ValueError(f"variant must be a plain name (got {spec.variant!r})")
\ No newline at end of file
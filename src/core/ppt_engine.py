@@ -1,14 +1,32 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import IO, TYPE_CHECKING, Optional
 from io import BytesIO
 import logging
+import os
+import posixpath
+import threading
+import zipfile
 
+from lxml import etree
 from pptx import Presentation
+from pptx.presentation import Presentation as PresentationObj
 from pptx.slide import Slide
 from pptx.shapes.base import BaseShape
 from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import _Relationship
+from pptx.opc.packuri import PackURI
+from pptx.opc.serialized import PackageWriter
+from pptx.parts.image import ImagePart
+from pptx.parts.slide import SlidePart
+
+from . import shared_template
+
+if TYPE_CHECKING:
+    from .template_binding import TemplateBinding
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +43,223 @@ class ShapeNotFoundError(PptEngineError):
     pass
 
 
+# Already-compressed media: deflating them again costs CPU for ~0% size gain
+STORED_EXTENSIONS = frozenset({
+    ".png", ".jpg", ".jpeg", ".jpe", ".gif", ".tif", ".tiff", ".wdp",
+    ".mp3", ".m4a", ".mp4", ".m4v", ".mov", ".wmv",
+})
+
+# Deterministic saves: every member gets this timestamp (the ZIP epoch)
+FIXED_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+_R_ATTR_PREFIX = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# Top-level shape elements of a slide's spTree, by cNvPr id / name (evaluated in C)
+_P_NS = {"p": "http://schemas.openxmlformats.org/presentationml/2006/main"}
+_SHAPE_BY_ID = etree.XPath("./*[*/p:cNvPr[@id = $id]]", namespaces=_P_NS)
+_SHAPE_BY_NAME = etree.XPath("./*[*/p:cNvPr[@name = $name]]", namespaces=_P_NS)
+
+
+@dataclass(frozen=True)
+class ZipPolicy:
+    """
+    Per-member compression for saved decks.
+
+    store_media:   write already-compressed media (PNG/JPEG/...) as ZIP_STORED
+    xml_level:     deflate level (0-9) for XML and everything else
+    deterministic: identical inputs -> identical bytes (fixed timestamps,
+                   members sorted by name, normalised image rIds/part names)
+    """
+
+    store_media: bool = True
+    xml_level: int = 6
+    deterministic: bool = True
+
+    @classmethod
+    def from_config(cls, config: dict, draft: bool = False) -> "ZipPolicy":
+        """
+        Reads `global.save` (store_media, xml_level, draft_xml_level, deterministic).
+        `draft=True` (--dev output) uses the faster draft_xml_level.
+        """
+        save_cfg = (config.get("global") or {}).get("save") or {}
+        level = save_cfg.get("draft_xml_level", 1) if draft else save_cfg.get("xml_level", cls.xml_level)
+        return cls(
+            store_media=bool(save_cfg.get("store_media", cls.store_media)),
+            xml_level=min(9, max(0, int(level))),
+            deterministic=bool(save_cfg.get("deterministic", cls.deterministic)),
+        )
+
+    def compression_for(self, member_name: str) -> tuple[int, Optional[int]]:
+        """(compress_type, compresslevel) for one zip member."""
+        ext = posixpath.splitext(member_name)[1].lower()
+        if self.store_media and ext in STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED, None
+        if self.xml_level == 0:
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.xml_level
+
+
+class _PolicyZipWriter:
+    """Drop-in for python-pptx's _ZipPkgWriter that applies a ZipPolicy per member."""
+
+    def __init__(self, pkg_file: str | IO[bytes], policy: ZipPolicy):
+        self._zipf = zipfile.ZipFile(pkg_file, "w", strict_timestamps=False)
+        self._policy = policy
+
+    def __enter__(self) -> "_PolicyZipWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._zipf.close()
+
+    def write(self, pack_uri, blob: bytes) -> None:
+        compress_type, level = self._policy.compression_for(pack_uri.membername)
+        if self._policy.deterministic:
+            # writestr(name) would stamp the current local time (and OS) into every entry
+            member = zipfile.ZipInfo(pack_uri.membername, date_time=FIXED_ZIP_DATE_TIME)
+            member.create_system = 3
+            member.external_attr = 0o644 << 16
+        else:
+            member = pack_uri.membername
+        self._zipf.writestr(member, blob, compress_type=compress_type, compresslevel=level)
+
+
+class _PolicyPackageWriter(PackageWriter):
+    """python-pptx's PackageWriter, but writing through _PolicyZipWriter."""
+
+    def __init__(self, pkg_file, pkg_rels, parts, policy: ZipPolicy):
+        if policy.deterministic:
+            # [Content_Types].xml and _rels/.rels still come first (PackageWriter._write)
+            parts = tuple(sorted(parts, key=lambda part: part.partname))
+        super().__init__(pkg_file, pkg_rels, parts)
+        self._policy = policy
+
+    def _write(self) -> None:
+        with _PolicyZipWriter(self._pkg_file, self._policy) as phys_writer:
+            self._write_content_types_stream(phys_writer)
+            self._write_pkg_rels(phys_writer)
+            self._write_parts(phys_writer)
+
+
+def _normalize_package(package) -> None:
+    """
+    Removes what depends on the ORDER images were placed (ImagePipeline
+    places them as they arrive) from the part graph, before a deterministic save:
+
+    - per slide: image relationships no picture references any more (the
+      replaced originals) are dropped, the rest get rIds in document order
+    - every image part under /ppt/media/ is renamed image<n> in package
+      order (others, e.g. /docProps/thumbnail.jpeg, keep their names)
+    """
+    for part in package.iter_parts():
+        if isinstance(part, SlidePart):
+            _normalize_slide_rels(part)
+
+    parts = list(package.iter_parts())
+    media = [
+        part for part in parts
+        if isinstance(part, ImagePart) and part.partname.startswith("/ppt/media/")
+    ]
+    taken = {part.partname for part in parts} - {part.partname for part in media}
+    n = 0
+    for part in media:
+        ext = posixpath.splitext(part.partname)[1]
+        n += 1
+        while PackURI(f"/ppt/media/image{n}{ext}") in taken:
+            n += 1
+        part.partname = PackURI(f"/ppt/media/image{n}{ext}")
+
+
+def _normalize_slide_rels(slide_part: SlidePart) -> None:
+    rels = slide_part.rels
+    # rIds in the order the slide XML references them (r:embed, r:link, r:id ...)
+    referenced: dict[str, int] = {}
+    for element in slide_part._element.iter():
+        for name, value in element.attrib.items():
+            if name.startswith(_R_ATTR_PREFIX):
+                referenced.setdefault(value, len(referenced))
+
+    images = [rId for rId, rel in rels.items() if rel.reltype == RT.IMAGE]
+    for rId in images:
+        if rId not in referenced:
+            rels.pop(rId)
+    images = sorted((rId for rId in images if rId in referenced), key=referenced.get)
+
+    # Other relationships (layout, notes, hyperlinks) keep their rIds
+    taken = {rId for rId in rels if rId not in images}
+    renamed: dict[str, str] = {}
+    n = 1
+    for rId in images:
+        while f"rId{n}" in taken:
+            n += 1
+        renamed[rId] = f"rId{n}"
+        n += 1
+
+    # _Relationship.rId is a cached lazyproperty: a renamed relationship has to
+    # be rebuilt, or the .rels part keeps the old id while the XML gets the new one
+    ordered = [
+        _Relationship(rel._base_uri, renamed[rId], rel.reltype, rel._target_mode, rel._target)
+        if rId in renamed and renamed[rId] != rId else rel
+        for rId, rel in rels.items()
+    ]
+    ordered.sort(key=lambda rel: int(rel.rId[3:]) if rel.rId[3:].isdigit() else 0)
+    rels._rels.clear()
+    rels._rels.update((rel.rId, rel) for rel in ordered)
+
+    if any(old != new for old, new in renamed.items()):
+        for element in slide_part._element.iter():
+            for name, value in element.attrib.items():
+                if name.startswith(_R_ATTR_PREFIX) and value in renamed:
+                    element.set(name, renamed[value])
+
+
+class TemplatePool:
+    """
+    Pre-parsed template copies for the resident service (--serve).
+
+    Every report mutates its own Presentation, so a parsed template cannot be
+    shared; instead the service parses ONE spare copy per template in idle time
+    (warm) and the next PptEngine takes it instead of parsing from disk (take).
+    A spare is discarded when the template file changed since it was parsed.
+    Empty by default, i.e. normal CLI runs load from disk as before.
+    """
+
+    def __init__(self):
+        self._spares: dict[Path, tuple[tuple[int, int], PresentationObj]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stamp(path: Path) -> tuple[int, int]:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+
+    def warm(self, template_path: Path | str) -> None:
+        """Parses a spare copy of `template_path` unless an up-to-date one is ready."""
+        path = Path(template_path).resolve()
+        stamp = self._stamp(path)
+        with self._lock:
+            spare = self._spares.get(path)
+        if spare is not None and spare[0] == stamp:
+            return
+
+        prs = Presentation(path)
+        with self._lock:
+            self._spares[path] = (stamp, prs)
+        logger.debug(f"Pre-parsed template: {path}")
+
+    def take(self, template_path: Path | str) -> Optional[PresentationObj]:
+        """Removes and returns the spare for `template_path` (None if absent or stale)."""
+        path = Path(template_path).resolve()
+        with self._lock:
+            spare = self._spares.pop(path, None)
+        if spare is None or spare[0] != self._stamp(path):
+            return None
+        return spare[1]
+
+
+template_pool = TemplatePool()
+
+
 class PptEngine:
     """
     Low-level PowerPoint engine.
@@ -40,21 +275,65 @@ class PptEngine:
 
     SLIDE_KEY_PREFIX = "SLIDE_KEY_"
 
-    def __init__(self, template_path: Path | str):
+    def __init__(self, template_path: Path | str, binding: Optional["TemplateBinding"] = None):
+        """
+        `binding` (see template_binding.load_binding) maps slide keys to slide
+        positions and shape names to shape ids resolved at preflight, so
+        lookups skip the anchor and shape-name scans.
+        """
         self.template_path = Path(template_path)
         if not self.template_path.exists():
             raise FileNotFoundError(f"Template not found: {self.template_path}")
+        self.binding = binding
+        # slide_id -> slide_key of every slide found by find_slide_by_key
+        self._slide_keys: dict[int, str] = {}
+
+        self.prs = template_pool.take(self.template_path)
+        if self.prs is not None:
+            logger.debug(f"Using pre-parsed presentation: {self.template_path}")
+            return
 
-        logger.debug(f"Loading presentation: {self.template_path}")
-        self.prs = Presentation(self.template_path)
+        # Worker processes parse straight from the parent's mapped snapshot
+        stream = shared_template.open_template(self.template_path)
+        if stream is not None:
+            logger.debug(f"Loading presentation from shared snapshot: {self.template_path}")
+            with stream:
+                self.prs = Presentation(stream)
+        else:
+            logger.debug(f"Loading presentation: {self.template_path}")
+            self.prs = Presentation(self.template_path)
 
     # ------------------------------------------------------------------
     # Save
     # ------------------------------------------------------------------
-    def save(self, output_path: Path | str) -> None:
+    def save(self, output_path: Path | str, policy: Optional[ZipPolicy] = None) -> None:
+        """
+        Saves the deck. Without `policy` python-pptx's default writer is used
+        (everything deflated); with one, members are compressed per ZipPolicy.
+        A deterministic policy also normalises the package first (see
+        _normalize_package), so the same inputs give byte-identical files.
+        """
         output_path = Path(output_path)
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        self.prs.save(output_path)
+
+        # Write next to the target, then rename: readers (and other workers)
+        # never see a half-written deck, and a crash leaves only the temp file
+        tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            if policy is None:
+                self.prs.save(tmp_path)
+            else:
+                # Same as Presentation.save() -> OpcPackage.save(), with our zip writer
+                package = self.prs.part.package
+                if policy.deterministic:
+                    _normalize_package(package)
+                _PolicyPackageWriter(
+                    str(tmp_path), package._rels, tuple(package.iter_parts()), policy
+                )._write()
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
     # ------------------------------------------------------------------
     # Slide handling
@@ -63,14 +342,25 @@ class PptEngine:
         """
         Find slide by invisible anchor shape:
         shape.name == f"SLIDE_KEY_{slide_key}"
+
+        The bound position is tried first; it is only trusted when that slide
+        carries the anchor (a --pages base deck may have slides added or moved).
         """
         anchor_name = f"{self.SLIDE_KEY_PREFIX}{slide_key}"
 
+        index = self.binding.slide_index(slide_key) if self.binding else None
+        if index is not None and index < len(self.prs.slides):
+            slide = self.prs.slides[index]
+            if _SHAPE_BY_NAME(slide.shapes._spTree, name=anchor_name):
+                self._slide_keys[slide.slide_id] = slide_key
+                return slide
+            logger.debug(f"Slide key '{slide_key}' is not at bound position {index + 1}; scanning")
+
         for slide in self.prs.slides:
-            for shape in slide.shapes:
-                if shape.name == anchor_name:
-                    logger.debug(f"Found slide by key '{slide_key}' (slide_id={slide.slide_id})")
-                    return slide
+            if _SHAPE_BY_NAME(slide.shapes._spTree, name=anchor_name):
+                logger.debug(f"Found slide by key '{slide_key}' (slide_id={slide.slide_id})")
+                self._slide_keys[slide.slide_id] = slide_key
+                return slide
 
         raise SlideNotFoundError(
             f"Slide with key '{slide_key}' not found "
@@ -83,15 +373,33 @@ class PptEngine:
     def get_shape(self, slide: Slide, shape_name: str) -> BaseShape:
         """
         Get shape by exact name.
+        On a slide found by find_slide_by_key, a bound shape is reached by its
+        id; the name scan remains for unbound shapes and hand-edited decks.
         """
-        for shape in slide.shapes:
-            if shape.name == shape_name:
-                return shape
+        slide_key = self._slide_keys.get(slide.slide_id)
+        shape_id = self.binding.shape_id(slide_key, shape_name) if self.binding and slide_key else None
+        if shape_id is not None:
+            for element in _SHAPE_BY_ID(slide.shapes._spTree, id=shape_id):
+                shape = slide.shapes._shape_factory(element)
+                if shape.name == shape_name:
+                    return shape
+
+        for element in _SHAPE_BY_NAME(slide.shapes._spTree, name=shape_name):
+            return slide.shapes._shape_factory(element)
 
         raise ShapeNotFoundError(
             f"Shape '{shape_name}' not found on slide_id={slide.slide_id}"
         )
         
+    def get_aspect_ratio(self, slide: Slide, shape_name: str) -> Optional[float]:
+        """
+        Width / height of a shape (None if the shape has no size).
+        """
+        shape = self.get_shape(slide, shape_name)
+        if not shape.width or not shape.height:
+            return None
+        return shape.width / shape.height
+
     # ------------------------------------------------------------------
     # Footer handling
     # ------------------------------------------------------------------
@@ -231,6 +539,7 @@ class PptEngine:
         top = shape.top
         width = shape.width
         height = shape.height
+        shape_id = shape.shape_id
         z_order = shape._element.getparent().index(shape._element)
 
         # Remove old shape
@@ -245,6 +554,10 @@ class PptEngine:
             width=width,
             height=height,
         )
+        # Keep the configured name so the saved deck can be edited again (--pages)
+        pic.name = shape_name
+        # ...and its id: a fresh max+1 id would depend on the replacement order
+        pic._element.nvPicPr.cNvPr.id = shape_id
 
         # Try to restore z-order (best effort)
         try:
@@ -0,0 +1,181 @@
+# src/core/profiling.py
+"""
+Opt-in profiling for a report run (--profile cpu|mem).
+
+  cpu -> <stem>.prof (cProfile dump, open with snakeviz / pstats)
+         <stem>_profile.txt (hot-function summary)
+  mem -> <stem>_profile.txt (tracemalloc top allocations + peak)
+
+The summary has dedicated sections for PptEngine, ImageHandler and the
+python-pptx / lxml internals, which is where report time is normally spent.
+
+CPU time of worker threads (downloads, parallel assembly) is included: on
+Python 3.12+ cProfile hooks sys.monitoring, which is process-wide, so the one
+profiler sees every thread; older versions profile each new thread with a
+profiler of its own, merged into the report.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Section title -> (pstats regex on "file:line(function)", tracemalloc filename glob)
+HOTSPOT_FILTERS = {
+    "PptEngine": (r"ppt_engine\.py", "*ppt_engine.py"),
+    "ImageHandler": (r"image_handler\.py", "*image_handler.py"),
+    "python-pptx": (r"[/\\]pptx[/\\]", "*pptx*"),
+    "lxml": (r"lxml", "*lxml*"),
+}
+
+TOP_N = 25
+
+# 3.12+: a second Profile().enable() raises "Another profiling tool is
+# already active", and the first one already covers all threads.
+PER_THREAD_PROFILERS = sys.version_info < (3, 12)
+
+
+@contextmanager
+def profile_run(mode: Optional[str], output_stem: Path | str) -> Iterator[None]:
+    """
+    Profiles the enclosed block. `mode` is None (no-op), "cpu" or "mem".
+    Reports are written as <output_stem>.prof / <output_stem>_profile.txt.
+    """
+    if mode is None:
+        yield
+        return
+
+    output_stem = Path(output_stem)
+    output_stem.parent.mkdir(parents=True, exist_ok=True)
+
+    if mode == "cpu":
+        with _profile_cpu(output_stem):
+            yield
+    elif mode == "mem":
+        with _profile_mem(output_stem):
+            yield
+    else:
+        raise ValueError(f"Unknown profile mode: {mode!r} (expected 'cpu' or 'mem')")
+
+
+@contextmanager
+def _profile_cpu(output_stem: Path) -> Iterator[None]:
+    main_profiler = cProfile.Profile()
+    thread_profilers: list[tuple[threading.Thread, cProfile.Profile]] = []
+
+    def _start_thread_profiler(*_args) -> None:
+        # Runs once per new thread (downloads, parallel assembly):
+        # swap this bootstrap hook for a dedicated profiler.
+        sys.setprofile(None)
+        profiler = cProfile.Profile()
+        thread_profilers.append((threading.current_thread(), profiler))
+        profiler.enable()
+
+    if PER_THREAD_PROFILERS:
+        threading.setprofile(_start_thread_profiler)
+    main_profiler.enable()
+    try:
+        yield
+    finally:
+        main_profiler.disable()
+        if PER_THREAD_PROFILERS:
+            threading.setprofile(None)
+
+        stats = pstats.Stats(main_profiler)
+        for thread, profiler in thread_profilers:
+            if thread.is_alive():
+                # disable() only unhooks the calling thread: take what a thread
+                # outliving the block has so far and leave its profiler alone.
+                profiler.snapshot_stats()
+                stats.add(_ProfileSnapshot(profiler.stats))
+            else:
+                stats.add(profiler)
+
+        prof_path = output_stem.with_suffix(".prof")
+        stats.dump_stats(prof_path)
+
+        summary_path = output_stem.with_name(f"{output_stem.name}_profile.txt")
+        summary_path.write_text(_cpu_summary(stats), encoding="utf-8")
+        logger.info(f"CPU profile written: {prof_path} (summary: {summary_path})")
+
+
+class _ProfileSnapshot:
+    """Stats already taken from a profiler, in the shape pstats.Stats loads."""
+
+    def __init__(self, stats: dict) -> None:
+        self.stats = dict(stats)
+
+    def create_stats(self) -> None:
+        pass
+
+
+def _cpu_summary(stats: pstats.Stats) -> str:
+    buf = io.StringIO()
+    stats.stream = buf
+
+    buf.write(f"=== Top {TOP_N} by cumulative time ===\n")
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_N)
+
+    buf.write(f"=== Top {TOP_N} by own time ===\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP_N)
+
+    for title, (pattern, _glob) in HOTSPOT_FILTERS.items():
+        buf.write(f"=== {title} (by cumulative time) ===\n")
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(pattern, TOP_N)
+
+    return buf.getvalue()
+
+
+@contextmanager
+def _profile_mem(output_stem: Path) -> Iterator[None]:
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(25)
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+
+        summary_path = output_stem.with_name(f"{output_stem.name}_profile.txt")
+        summary_path.write_text(_mem_summary(snapshot, current, peak), encoding="utf-8")
+        logger.info(f"Memory profile written: {summary_path} (peak {peak / 1024 / 1024:.1f} MiB)")
+
+
+def _mem_summary(snapshot: tracemalloc.Snapshot, current: int, peak: int) -> str:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+
+    lines = [
+        f"Current traced memory: {current / 1024 / 1024:.2f} MiB",
+        f"Peak traced memory:    {peak / 1024 / 1024:.2f} MiB",
+        "",
+        f"=== Top {TOP_N} allocations by line ===",
+    ]
+    lines += [str(stat) for stat in snapshot.statistics("lineno")[:TOP_N]]
+
+    lines += ["", f"=== Top {TOP_N} allocations by file ==="]
+    lines += [str(stat) for stat in snapshot.statistics("filename")[:TOP_N]]
+
+    for title, (_pattern, glob) in HOTSPOT_FILTERS.items():
+        section = snapshot.filter_traces((tracemalloc.Filter(True, glob),))
+        lines += ["", f"=== {title} (by line) ==="]
+        lines += [str(stat) for stat in section.statistics("lineno")[:TOP_N]] or ["(no allocations)"]
+
+    return "\n".join(lines) + "\n"
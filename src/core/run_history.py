@@ -0,0 +1,226 @@
+# src/core/run_history.py
+"""
+Run history (SQLite, standard library only): one compact row per run, kept
+forever (unlike logs/, which keeps only the newest few run_*.log files).
+
+Each row holds the run spec (report, year, month, mode), status and wall time,
+per-stage timings, the latency of every image download, download/placeholder
+counts and the size of the saved deck(s). export_run_metrics() appends a row
+for every entry point; `python -m src.main --stats` summarises them
+(percentiles and trends) for planning batch windows.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import sqlite3
+import statistics
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .metrics import MetricsRegistry
+
+DEFAULT_HISTORY_PATH = "cache/run_history.sqlite3"
+
+# Runs compared by the trend column: the newest TREND_WINDOW vs the ones before
+TREND_WINDOW = 5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at     TEXT    NOT NULL,
+    report         TEXT    NOT NULL,
+    year           INTEGER,
+    month          INTEGER,
+    mode           TEXT,
+    status         TEXT    NOT NULL,
+    duration       REAL    NOT NULL,
+    images         INTEGER NOT NULL DEFAULT 0,
+    image_failures INTEGER NOT NULL DEFAULT 0,
+    placeholders   INTEGER NOT NULL DEFAULT 0,
+    image_bytes    INTEGER NOT NULL DEFAULT 0,
+    output_bytes   INTEGER NOT NULL DEFAULT 0,
+    stages         TEXT    NOT NULL DEFAULT '{}',
+    image_seconds  TEXT    NOT NULL DEFAULT '[]',
+    extra          TEXT    NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS runs_report_started ON runs (report, started_at);
+"""
+
+_SPEC_KEYS = ("report", "year", "month", "mode")
+
+
+@dataclass(frozen=True)
+class RunStats:
+    """Summary of a group of runs (durations in seconds)."""
+    key: tuple
+    runs: int
+    ok: int
+    p50: float
+    p90: float
+    p95: float
+    max: float
+    image_p95: Optional[float]
+    placeholders_per_run: float
+    output_mb: float
+    trend: Optional[float]  # newest TREND_WINDOW median vs earlier median (+0.12 = 12% slower)
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (None for no values)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _issue_month(row: dict[str, Any]) -> str:
+    """Target month of the report a row ran (not when it ran)."""
+    if row.get("year") is None or row.get("month") is None:
+        return "-"
+    return f"{row['year']}-{row['month']:02d}"
+
+
+class RunHistory:
+    """Thin wrapper over one SQLite file (WAL mode, autocommit), like JobQueue."""
+
+    def __init__(self, path: Path | str = DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> Optional["RunHistory"]:
+        """`global.metrics.history_db` (default cache/run_history.sqlite3; null disables)."""
+        metrics_cfg = (config.get("global") or {}).get("metrics") or {}
+        path = metrics_cfg.get("history_db", DEFAULT_HISTORY_PATH)
+        return cls(path) if path else None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "RunHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+    def record(self, status: str, duration: float, registry: MetricsRegistry, **run_info: Any) -> int:
+        """Appends one run built from `registry` (the run's metrics). Returns the row id."""
+        snapshot = registry.snapshot()
+        counters, gauges, histograms = snapshot["counters"], snapshot["gauges"], snapshot["histograms"]
+
+        def _total(store: dict, name: str) -> float:
+            return sum(series["value"] for series in store.get(name, []))
+
+        stages = {}
+        for series in histograms.get("stage_seconds", []):
+            labels = series["labels"]
+            name = f"{labels['report']}/{labels['stage']}" if "report" in labels else labels.get("stage", "?")
+            stages[name] = round(stages.get(name, 0.0) + series["value"]["sum"], 4)
+
+        image_seconds = [round(v, 4) for v in registry.samples("image_download_seconds", outcome="ok")]
+        failures = _total(counters, "image_download_failures_total") + _total(counters, "image_download_skipped_total")
+        started_at = datetime.now() - timedelta(seconds=duration)
+        extra = {k: v for k, v in run_info.items() if k not in _SPEC_KEYS}
+
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO runs (started_at, report, year, month, mode, status, duration, images, "
+                "image_failures, placeholders, image_bytes, output_bytes, stages, image_seconds, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    started_at.isoformat(timespec="seconds"),
+                    str(run_info.get("report", "?")),
+                    run_info.get("year"),
+                    run_info.get("month"),
+                    run_info.get("mode"),
+                    status,
+                    round(duration, 4),
+                    len(image_seconds),
+                    int(failures),
+                    int(_total(counters, "placeholders_total")),
+                    int(_total(counters, "image_download_bytes_total")),
+                    int(_total(gauges, "output_bytes")),
+                    json.dumps(stages),
+                    json.dumps(image_seconds),
+                    json.dumps(extra, ensure_ascii=False, default=str),
+                ),
+            )
+            return cur.lastrowid
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def runs(self, report: str | None = None, since: str | None = None) -> list[dict[str, Any]]:
+        """Rows oldest first; `since` is an ISO date/datetime prefix (e.g. "2026-01")."""
+        query, params = "SELECT * FROM runs WHERE 1=1", []
+        if report:
+            query += " AND report=?"
+            params.append(report)
+        if since:
+            query += " AND started_at >= ?"
+            params.append(since)
+        with self._lock:
+            cur = self._conn.execute(query + " ORDER BY started_at, id", params)
+            columns = [c[0] for c in cur.description]
+            rows = cur.fetchall()
+        result = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            for field in ("stages", "image_seconds", "extra"):
+                item[field] = json.loads(item[field])
+            result.append(item)
+        return result
+
+    @staticmethod
+    def summarize(rows: list[dict[str, Any]], by: tuple[str, ...] = ("report",)) -> list[RunStats]:
+        """
+        Groups rows by `by` (column names, or "issue_month" = the report's
+        target YYYY-MM from its year/month columns; "-" for runs without one,
+        e.g. --batch) and returns duration percentiles, the p95 image latency
+        and the trend of each group. Only successful runs count for durations.
+        """
+        groups: dict[tuple, list[dict[str, Any]]] = {}
+        for row in rows:
+            key = tuple(_issue_month(row) if col == "issue_month" else row.get(col) for col in by)
+            groups.setdefault(key, []).append(row)
+
+        stats = []
+        for key in sorted(groups, key=lambda k: tuple(str(part) for part in k)):
+            group = groups[key]
+            ok = [r for r in group if r["status"] == "success"]
+            durations = [r["duration"] for r in ok] or [0.0]
+            images = [v for r in ok for v in r["image_seconds"]]
+
+            trend = None
+            if len(ok) > TREND_WINDOW:
+                recent = statistics.median(r["duration"] for r in ok[-TREND_WINDOW:])
+                earlier = statistics.median(r["duration"] for r in ok[:-TREND_WINDOW])
+                trend = (recent - earlier) / earlier if earlier else None
+
+            stats.append(RunStats(
+                key=key,
+                runs=len(group),
+                ok=len(ok),
+                p50=percentile(durations, 50),
+                p90=percentile(durations, 90),
+                p95=percentile(durations, 95),
+                max=max(durations),
+                image_p95=percentile(images, 95),
+                placeholders_per_run=sum(r["placeholders"] for r in group) / len(group),
+                output_mb=(sum(r["output_bytes"] for r in ok) / len(ok) / 1e6) if ok else 0.0,
+                trend=trend,
+            ))
+        return stats
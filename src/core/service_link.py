@@ -0,0 +1,94 @@
+# src/core/service_link.py
+"""
+Local transport between the resident report service (python -m src.main --serve)
+and thin clients (python -m src.client).
+
+multiprocessing.connection over a named pipe (Windows) or a Unix socket,
+authenticated with a random key generated at every service start. The running
+service publishes {address, authkey, pid} in cache/report_service.json.
+
+Standard library only, so a client starts without importing python-pptx & co.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import secrets
+import tempfile
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from pathlib import Path
+from typing import Any, Optional
+
+SERVICE_INFO_PATH = Path("cache") / "report_service.json"
+
+# Generous: one request covers a full report generation
+JOB_TIMEOUT = 600.0
+
+
+class ServiceTimeout(Exception):
+    """The service took the message but sent no reply in time (it may still be working on it)."""
+
+
+def new_address() -> str:
+    """Fresh per-process address (named pipe on Windows, Unix socket elsewhere)."""
+    name = f"hii_report_service_{os.getpid()}"
+    if os.name == "nt":
+        return rf"\\.\pipe\{name}"
+    return str(Path(tempfile.gettempdir()) / f"{name}.sock")
+
+
+def new_authkey() -> bytes:
+    return secrets.token_bytes(32)
+
+
+def publish(address: str, authkey: bytes, path: Path = SERVICE_INFO_PATH) -> None:
+    """Writes the discovery file (owner-only permissions where supported)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(
+        json.dumps({"address": address, "authkey": authkey.hex(), "pid": os.getpid()}),
+        encoding="utf-8",
+    )
+    if os.name != "nt":
+        os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def unpublish(path: Path = SERVICE_INFO_PATH) -> None:
+    """Removes the discovery file if it still belongs to this process."""
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+        if info.get("pid") == os.getpid():
+            path.unlink()
+    except (OSError, ValueError):
+        pass
+
+
+def request(
+    message: dict[str, Any],
+    timeout: float = JOB_TIMEOUT,
+    path: Path = SERVICE_INFO_PATH,
+) -> Optional[dict[str, Any]]:
+    """
+    Sends one message to the running service and returns its reply.
+    Returns None when no service is reachable (no/stale discovery file,
+    refused connection, failed handshake, connection lost). Raises
+    ServiceTimeout when the message was delivered but no reply came
+    within `timeout`.
+    """
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+        conn = Client(info["address"], authkey=bytes.fromhex(info["authkey"]))
+    except (OSError, ValueError, KeyError, EOFError, AuthenticationError):
+        return None
+
+    with conn:
+        try:
+            conn.send(message)
+            if not conn.poll(timeout):
+                raise ServiceTimeout(f"no reply from the report service within {timeout:.0f}s")
+            return conn.recv()
+        except (OSError, EOFError):
+            return None
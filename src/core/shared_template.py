@@ -0,0 +1,183 @@
+# src/core/shared_template.py
+"""
+Template bytes shared by worker processes (--batch --processes N).
+
+The parent publishes each template ONCE as a content-addressed snapshot
+(cache/templates/<sha256>.pptx); every worker maps the snapshot read-only
+(mmap). The raw package then lives once in the OS page cache for all
+processes and PptEngine parses it straight from the mapping: no per-worker
+read() of the whole file and no private copy of the raw package.
+
+What this does NOT save: python-pptx still loads every part, so each worker
+holds its own inflated XML and media blobs (zipfile copies every member out
+of the mapping as it reads it). The win is the raw .pptx buffer per worker
+plus the file read, not the parsed presentation.
+
+A snapshot never changes (new content = new file name), so editing a
+template while a batch runs cannot hand a half-written file to a worker;
+workers fall back to reading the template normally once it differs from
+what was published.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import mmap
+import multiprocessing.util
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path("cache") / "templates"
+
+
+@dataclass(frozen=True)
+class TemplateSnapshot:
+    """Picklable handle passed from the parent to worker initializers."""
+    template_path: str           # resolved path of the configured template
+    snapshot_path: str
+    sha256: str
+    stamp: tuple[int, int]       # (mtime_ns, size) of the template when published
+
+
+class _MappedReader(io.RawIOBase):
+    """
+    Read-only, seekable file object over a memoryview (what zipfile needs),
+    with its own position so several engines can read one mapping at once.
+    read() returns bytes, i.e. a copy of the requested range only.
+    """
+
+    def __init__(self, buffer: memoryview):
+        self._buffer = buffer
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._buffer)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._buffer) if size is None or size < 0 else min(len(self._buffer), self._pos + size)
+        data = self._buffer[self._pos:end].tobytes()
+        self._pos = max(self._pos, end)
+        return data
+
+    def readinto(self, b) -> int:
+        # Straight from the mapping into the caller's buffer (no temporary bytes)
+        chunk = self._buffer[self._pos:self._pos + len(b)]
+        b[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._buffer.release()  # lets detach() close the mapping
+        super().close()
+
+
+# resolved template path -> (snapshot, mapping); filled by attach() in workers
+_mapped: dict[str, tuple[TemplateSnapshot, mmap.mmap]] = {}
+_lock = threading.Lock()
+
+
+def _stamp(path: Path) -> tuple[int, int]:
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def publish(template_paths: Iterable[Path | str], snapshot_dir: Path | str = SNAPSHOT_DIR) -> list[TemplateSnapshot]:
+    """Parent side: snapshots every template (once per content) and returns the handles."""
+    snapshot_dir = Path(snapshot_dir)
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    snapshots = []
+    for template_path in dict.fromkeys(Path(p).resolve() for p in template_paths):
+        stamp = _stamp(template_path)
+        data = template_path.read_bytes()
+        sha = hashlib.sha256(data).hexdigest()
+        target = snapshot_dir / f"{sha}.pptx"
+        if not target.exists():
+            tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, target)
+        snapshots.append(TemplateSnapshot(str(template_path), str(target.resolve()), sha, stamp))
+        logger.debug(f"Published template {template_path.name} -> {target}")
+    return snapshots
+
+
+def attach(snapshots: Iterable[TemplateSnapshot]) -> None:
+    """
+    Worker side (pool initializer): maps every published snapshot read-only.
+    The mappings are closed by detach(), which also runs when the worker
+    process exits.
+    """
+    with _lock:
+        first = not _mapped
+        for snapshot in snapshots:
+            if snapshot.template_path in _mapped:
+                continue
+            with open(snapshot.snapshot_path, "rb") as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _mapped[snapshot.template_path] = (snapshot, mapping)
+    if first:
+        # Pool workers leave through os._exit(): atexit would not run, these finalizers do
+        multiprocessing.util.Finalize(None, detach, exitpriority=10)
+
+
+def detach() -> None:
+    """Closes every mapping; later lookups fall back to reading the template."""
+    with _lock:
+        entries = list(_mapped.values())
+        _mapped.clear()
+    for snapshot, mapping in entries:
+        try:
+            mapping.close()
+        except BufferError:
+            # A stream from open_template() is still open; the OS unmaps at exit
+            logger.debug(f"Template snapshot still in use, not unmapped: {snapshot.snapshot_path}")
+
+
+def _lookup(template_path: Path | str) -> Optional[tuple[TemplateSnapshot, mmap.mmap]]:
+    if not _mapped:
+        return None
+    path = Path(template_path).resolve()
+    with _lock:
+        entry = _mapped.get(str(path))
+    if entry is None:
+        return None
+    try:
+        if _stamp(path) != entry[0].stamp:
+            return None  # edited since it was published: read the new file
+    except OSError:
+        return None
+    return entry
+
+
+def open_template(template_path: Path | str) -> Optional[io.RawIOBase]:
+    """
+    A stream over the mapped snapshot (None if not attached / stale); only the
+    ranges actually read are copied out of the mapping. Close it when done.
+    """
+    entry = _lookup(template_path)
+    return _MappedReader(memoryview(entry[1])) if entry else None
+
+
+def template_sha256(template_path: Path | str) -> Optional[str]:
+    """The published snapshot's sha256 (None if not attached / stale)."""
+    entry = _lookup(template_path)
+    return entry[0].sha256 if entry else None
@@ -0,0 +1,189 @@
+# src/core/template_binding.py
+"""
+Compiled template binding: config.yaml shape names resolved against the
+template ONCE, before any image is fetched.
+
+compile step (template_index + validate_report_config, lxml only):
+  - every pages.*.slide_key -> slide position
+  - title_shape / report_period_shape / issue_date_shape / labels.* / images.*
+    -> shape id on that slide (type-checked: text frame / picture), so
+    PptEngine reaches them by id instead of scanning shape names
+  - Txt_Footer present on a slide layout
+
+The result is cached as JSON in cache/bindings/, keyed by the template's
+sha256 plus the sha256 of its config section, so a warm check costs one file
+hash. Any problem raises TemplateBindingError listing ALL bad entries.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from . import shared_template
+from .ppt_engine import PptEngineError
+from .template_index import index_pptx, validate_report_config
+
+logger = logging.getLogger(__name__)
+
+BINDING_CACHE_DIR = Path("cache") / "bindings"
+BINDING_VERSION = 2
+
+# (resolved template path, mtime_ns, size, config sha256) -> binding
+_memo: dict[tuple, "TemplateBinding"] = {}
+_memo_lock = threading.Lock()
+
+
+class TemplateBindingError(PptEngineError):
+    """config.yaml does not match the template; `problems` lists every mismatch."""
+
+    def __init__(self, report: str, template_path: Path | str, problems: list[str]):
+        self.problems = problems
+        details = "\n".join(f"  - {p}" for p in problems)
+        super().__init__(f"{report}: config does not match template {template_path}:\n{details}")
+
+
+@dataclass(frozen=True)
+class TemplateBinding:
+    report: str
+    template_sha256: str
+    config_sha256: str
+    slides: dict[str, int]                 # slide_key -> 0-based slide position
+    shapes: dict[str, dict[str, int]]      # slide_key -> {shape name: shape id}
+
+    def slide_index(self, slide_key: str) -> int | None:
+        return self.slides.get(slide_key)
+
+    def shape_id(self, slide_key: str, shape_name: str) -> int | None:
+        return self.shapes.get(slide_key, {}).get(shape_name)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": BINDING_VERSION,
+            "report": self.report,
+            "template_sha256": self.template_sha256,
+            "config_sha256": self.config_sha256,
+            "slides": self.slides,
+            "shapes": self.shapes,
+        }
+
+
+def load_binding(config: dict, report: str, cache_dir: Path | str = BINDING_CACHE_DIR) -> TemplateBinding:
+    """
+    Returns the binding for config[report] (e.g. "flood_report"), compiling
+    and caching it when needed. Raises TemplateBindingError / FileNotFoundError.
+    """
+    report_cfg = config[report]
+    template_path = Path(report_cfg["template_path"])
+    if not template_path.exists():
+        raise FileNotFoundError(f"Template not found: {template_path}")
+
+    config_sha = _sha256(json.dumps(report_cfg, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    st = template_path.stat()
+    memo_key = (template_path.resolve(), st.st_mtime_ns, st.st_size, config_sha)
+    with _memo_lock:
+        binding = _memo.get(memo_key)
+    if binding is not None:
+        return binding
+
+    # Worker processes know the sha of the shared snapshot: no need to read the template
+    template_sha = shared_template.template_sha256(template_path)
+    template_bytes = None
+    if template_sha is None:
+        template_bytes = template_path.read_bytes()
+        template_sha = _sha256(template_bytes)
+    cache_path = Path(cache_dir) / f"{report}_{template_sha[:16]}_{config_sha[:16]}.json"
+
+    binding = _read_cached(cache_path, template_sha, config_sha)
+    if binding is None:
+        if template_bytes is None:
+            template_bytes = template_path.read_bytes()
+        binding = compile_binding(report, report_cfg, template_bytes, template_sha, config_sha, template_path)
+        _write_cached(cache_path, binding)
+        logger.debug(f"Compiled template binding: {cache_path}")
+
+    with _memo_lock:
+        _memo[memo_key] = binding
+    return binding
+
+
+def compile_binding(
+    report: str,
+    report_cfg: dict,
+    template_bytes: bytes,
+    template_sha: str,
+    config_sha: str,
+    template_path: Path | str = "",
+) -> TemplateBinding:
+    """Resolves every config entry against the template (raises on any mismatch)."""
+    index = index_pptx(io.BytesIO(template_bytes))
+    problems = validate_report_config(report_cfg, index)
+    if problems:
+        raise TemplateBindingError(report, template_path, problems)
+
+    slides = {
+        key: slide["index"] - 1
+        for slide in index["slides"]
+        for key in slide["slide_keys"]
+    }
+    shapes: dict[str, dict[str, int]] = {}
+    for page_cfg in report_cfg.get("pages", {}).values():
+        slide = index["slides"][slides[page_cfg["slide_key"]]]
+        by_name = {s["name"]: s["id"] for s in slide["shapes"] if "depth" not in s}
+        fields = {
+            field: page_cfg[field]
+            for field in ("title_shape", "report_period_shape", "issue_date_shape")
+            if field in page_cfg
+        }
+        fields.update({f"labels.{k}": v for k, v in page_cfg.get("labels", {}).items()})
+        fields.update({f"images.{k}": v for k, v in page_cfg.get("images", {}).items()})
+        shapes.setdefault(page_cfg["slide_key"], {}).update({name: by_name[name] for name in fields.values()})
+
+    return TemplateBinding(
+        report=report,
+        template_sha256=template_sha,
+        config_sha256=config_sha,
+        slides=slides,
+        shapes=shapes,
+    )
+
+
+def _read_cached(path: Path, template_sha: str, config_sha: str) -> TemplateBinding | None:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        data.get("version") != BINDING_VERSION
+        or data.get("template_sha256") != template_sha
+        or data.get("config_sha256") != config_sha
+    ):
+        return None
+    return TemplateBinding(
+        report=data["report"],
+        template_sha256=template_sha,
+        config_sha256=config_sha,
+        slides=data["slides"],
+        shapes=data["shapes"],
+    )
+
+
+def _write_cached(path: Path, binding: TemplateBinding) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(binding.to_dict(), ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        # Cache only; the binding itself is valid
+        logger.warning(f"Could not write template binding cache {path}: {e}")
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
@@ -0,0 +1,353 @@
+# src/core/template_index.py
+"""
+Fast, read-only index of a .pptx package built straight from the slide XML.
+
+Unlike tools/page_inspector.py (python-pptx object model, human-readable
+dump) this streams each slide part through lxml.iterparse and records only
+what the report pipeline binds to:
+  - slide order and part name
+  - SLIDE_KEY_* anchors
+  - shape id, name, type and geometry (EMU)
+The result is a plain dict, ready for json.dump and for config validation.
+
+extract_pictures() reads the embedded images of named pictures the same way
+(--seed-cache imports them from earlier decks into the image archive). Decks
+written before pictures kept their template names ("Picture N") are matched
+by the template's slide anchor, geometry and z-order instead (picture_spots).
+"""
+
+from __future__ import annotations
+
+import logging
+import posixpath
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, IO, Iterable
+
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+SLIDE_KEY_PREFIX = "SLIDE_KEY_"
+FOOTER_SHAPE = "Txt_Footer"
+
+NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+
+# Shape element (local name) -> reported type
+SHAPE_TAGS = {
+    "sp": "shape",
+    "pic": "picture",
+    "grpSp": "group",
+    "graphicFrame": "graphic_frame",
+    "cxnSp": "connector",
+}
+
+_P = "{%s}" % NS["p"]
+_R_ID = "{%s}id" % NS["r"]
+_R_EMBED = "{%s}embed" % NS["r"]
+
+
+def index_pptx(source: Path | str | IO[bytes], include_layouts: bool = True) -> dict[str, Any]:
+    """
+    Returns {"slides": [...], "layouts": [...]} for a .pptx file or stream.
+    Each slide: {"index", "part", "slide_keys", "shapes": [...]}; shapes
+    nested in groups carry a "depth" (top-level shapes have none).
+    """
+    with zipfile.ZipFile(source) as zf:
+        index: dict[str, Any] = {
+            "slides": [
+                {"index": i, "part": part, **_index_part(zf, part)}
+                for i, part in enumerate(slide_parts(zf), start=1)
+            ]
+        }
+        if include_layouts:
+            layout_parts = sorted(
+                (n for n in zf.namelist() if n.startswith("ppt/slideLayouts/") and n.endswith(".xml")),
+                key=_natural_key,
+            )
+            index["layouts"] = [{"part": part, **_index_part(zf, part)} for part in layout_parts]
+    return index
+
+
+@dataclass(frozen=True)
+class PictureSpot:
+    """Where a configured picture sits in the template (see picture_spots)."""
+    slide_key: str
+    geometry: tuple[int, int, int, int]  # x, y, cx, cy (EMU)
+    z: int                               # position among the slide's top-level shapes
+
+
+def picture_spots(report_cfg: dict[str, Any], index: dict[str, Any]) -> dict[str, PictureSpot]:
+    """
+    Picture shape name -> its PictureSpot in the template `index`, for every
+    images.* entry of a '<type>_report' config section. Replacing a picture
+    keeps its geometry and z-order, so this finds it again in decks where the
+    replacement lost the name.
+    """
+    slides_by_key = {key: slide for slide in index["slides"] for key in slide["slide_keys"]}
+    spots: dict[str, PictureSpot] = {}
+    for page_cfg in report_cfg.get("pages", {}).values():
+        slide = slides_by_key.get(page_cfg.get("slide_key"))
+        if slide is None:
+            continue
+        top_level = [s for s in slide["shapes"] if "depth" not in s]
+        for shape_name in page_cfg.get("images", {}).values():
+            for z, shape in enumerate(top_level):
+                if shape["name"] == shape_name and "geometry" in shape:
+                    spots[shape_name] = PictureSpot(page_cfg["slide_key"], tuple(shape["geometry"]), z)
+                    break
+    return spots
+
+
+def extract_pictures(
+    source: Path | str | IO[bytes],
+    names: Iterable[str] | None = None,
+    spots: dict[str, PictureSpot] | None = None,
+) -> dict[str, bytes]:
+    """
+    Returns picture shape name -> embedded image bytes for the pictures on
+    every slide (only `names`, if given). The first picture of a name wins.
+
+    Names in `spots` that no picture carries are looked up by position: the
+    picture on the anchored slide with the same geometry (nearest z-order
+    wins), as older decks replaced pictures under python-pptx's "Picture N".
+    """
+    wanted = set(names) if names is not None else None
+    pictures: dict[str, bytes] = {}
+    claimed: set[tuple[str, int]] = set()  # (slide part, shape id) already returned
+
+    with zipfile.ZipFile(source) as zf:
+        deck = getattr(zf, "filename", None) or "deck"
+        parts = slide_parts(zf)
+        for part in parts:
+            rels = None
+            with zf.open(part) as fp:
+                for _, el in etree.iterparse(fp, tag=_P + "pic"):
+                    c_nv_pr = el.find("./p:nvPicPr/p:cNvPr", NS)
+                    blip = el.find("./p:blipFill/a:blip", NS)
+                    name = c_nv_pr.get("name", "") if c_nv_pr is not None else ""
+                    if (
+                        blip is not None and blip.get(_R_EMBED)
+                        and name not in pictures
+                        and (wanted is None or name in wanted)
+                    ):
+                        if rels is None:
+                            rels = read_rels(zf, part)
+                        data = _read_embed(zf, deck, part, rels, blip.get(_R_EMBED), name)
+                        if data is not None:
+                            pictures[name] = data
+                            claimed.add((part, int(c_nv_pr.get("id", 0))))
+                    el.clear()
+
+        missing = {
+            name: spot for name, spot in (spots or {}).items()
+            if name not in pictures and (wanted is None or name in wanted)
+        }
+        if missing:
+            pictures.update(_extract_by_spot(zf, deck, parts, missing, claimed))
+    return pictures
+
+
+def _extract_by_spot(
+    zf: zipfile.ZipFile,
+    deck: str,
+    parts: list[str],
+    spots: dict[str, PictureSpot],
+    claimed: set[tuple[str, int]],
+) -> dict[str, bytes]:
+    slides = {}
+    for part in parts:
+        record = _index_part(zf, part)
+        for key in record["slide_keys"]:
+            slides.setdefault(key, (part, [s for s in record["shapes"] if "depth" not in s]))
+
+    pictures: dict[str, bytes] = {}
+    rels_by_part: dict[str, dict[str, str]] = {}
+    for name, spot in spots.items():
+        if spot.slide_key not in slides:
+            continue
+        part, top_level = slides[spot.slide_key]
+        candidates = [
+            (abs(z - spot.z), shape)
+            for z, shape in enumerate(top_level)
+            if shape["type"] == "picture" and "embed" in shape
+            and tuple(shape.get("geometry", ())) == spot.geometry
+            and (part, shape["id"]) not in claimed
+        ]
+        if not candidates:
+            continue
+        _, shape = min(candidates, key=lambda c: c[0])
+        rels = rels_by_part.get(part)
+        if rels is None:
+            rels = rels_by_part[part] = read_rels(zf, part)
+        data = _read_embed(zf, deck, part, rels, shape["embed"], shape["name"])
+        if data is not None:
+            pictures[name] = data
+            claimed.add((part, shape["id"]))
+            logger.debug(f"{deck}: '{name}' found by position as '{shape['name']}' on {part}")
+    return pictures
+
+
+def _read_embed(
+    zf: zipfile.ZipFile, deck: str, part: str, rels: dict[str, str], r_embed: str, name: str
+) -> bytes | None:
+    target = rels.get(r_embed)
+    if target is None or target not in zf.NameToInfo:
+        # A broken deck: say so instead of quietly finding nothing
+        logger.warning(f"{deck}: picture '{name}' on {part} embeds {r_embed}, which resolves to no image part")
+        return None
+    return zf.read(target)
+
+
+def slide_parts(zf: zipfile.ZipFile) -> list[str]:
+    """Slide part names in presentation order (follows sldIdLst, not file names)."""
+    rels = read_rels(zf, "ppt/presentation.xml")
+    root = etree.fromstring(zf.read("ppt/presentation.xml"))
+    return [
+        rels[sld_id.get(_R_ID)]
+        for sld_id in root.iterfind("p:sldIdLst/p:sldId", NS)
+    ]
+
+
+def read_rels(zf: zipfile.ZipFile, part: str) -> dict[str, str]:
+    """rId -> absolute part name for the relationships of `part`."""
+    folder, name = posixpath.split(part)
+    rels_name = posixpath.join(folder, "_rels", f"{name}.rels")
+    if rels_name not in zf.namelist():
+        return {}
+
+    root = etree.fromstring(zf.read(rels_name))
+    rels = {}
+    for rel in root.iterfind("rel:Relationship", NS):
+        if rel.get("TargetMode") == "External":
+            continue
+        rels[rel.get("Id")] = posixpath.normpath(posixpath.join(folder, rel.get("Target")))
+    return rels
+
+
+def _index_part(zf: zipfile.ZipFile, part: str) -> dict[str, Any]:
+    shapes: list[dict[str, Any]] = []
+    open_shapes: list[dict[str, Any]] = []
+    tags = [_P + tag for tag in SHAPE_TAGS]
+
+    with zf.open(part) as fp:
+        for event, el in etree.iterparse(fp, events=("start", "end"), tag=tags):
+            if event == "start":
+                # Reserve the slot now so groups precede their children (document order)
+                open_shapes.append({"depth": len(open_shapes)} if open_shapes else {})
+                shapes.append(open_shapes[-1])
+                continue
+            open_shapes.pop().update(_shape_record(el))
+            if el.tag != _P + "grpSp":
+                el.clear()  # children already recorded; keeps memory flat
+
+    slide_keys = [
+        s["name"][len(SLIDE_KEY_PREFIX):]
+        for s in shapes
+        if s["name"].startswith(SLIDE_KEY_PREFIX) and "depth" not in s
+    ]
+    return {"slide_keys": slide_keys, "shapes": shapes}
+
+
+def _shape_record(el: etree._Element) -> dict[str, Any]:
+    local = etree.QName(el).localname
+    c_nv_pr = el.find("./*/p:cNvPr", NS)
+    xfrm = el.find("./p:spPr/a:xfrm", NS)
+    if xfrm is None:
+        xfrm = el.find("./p:grpSpPr/a:xfrm", NS)
+    if xfrm is None:
+        xfrm = el.find("./p:xfrm", NS)
+
+    shape_type = SHAPE_TAGS[local]
+    if local == "sp" and el.find("./p:nvSpPr/p:cNvSpPr[@txBox='1']", NS) is not None:
+        shape_type = "text_box"
+
+    record: dict[str, Any] = {
+        "id": int(c_nv_pr.get("id")) if c_nv_pr is not None else None,
+        "name": c_nv_pr.get("name", "") if c_nv_pr is not None else "",
+        "type": shape_type,
+    }
+    if el.find("./*/p:nvPr/p:ph", NS) is not None:
+        record["placeholder"] = True
+    if el.find("./p:txBody", NS) is not None:
+        record["has_text"] = True
+    if local == "pic":
+        blip = el.find("./p:blipFill/a:blip", NS)
+        if blip is not None and blip.get(_R_EMBED):
+            record["embed"] = blip.get(_R_EMBED)
+
+    if xfrm is not None:
+        off = xfrm.find("a:off", NS)
+        ext = xfrm.find("a:ext", NS)
+        if off is not None and ext is not None:
+            record["geometry"] = [
+                int(off.get("x")), int(off.get("y")),
+                int(ext.get("cx")), int(ext.get("cy")),
+            ]
+    return record
+
+
+def _natural_key(name: str) -> tuple:
+    stem = Path(name).stem
+    digits = "".join(ch for ch in stem if ch.isdigit())
+    return (stem.rstrip("0123456789"), int(digits) if digits else 0)
+
+
+# ----------------------------------------------------------------------
+# Config validation
+# ----------------------------------------------------------------------
+def validate_report_config(report_cfg: dict[str, Any], index: dict[str, Any]) -> list[str]:
+    """
+    Checks one '<type>_report' config section against a template index.
+    Returns a list of human-readable problems (empty = OK).
+    """
+    problems: list[str] = []
+    slides_by_key = {
+        key: slide for slide in index["slides"] for key in slide["slide_keys"]
+    }
+
+    for page_name, page_cfg in report_cfg.get("pages", {}).items():
+        slide_key = page_cfg.get("slide_key")
+        slide = slides_by_key.get(slide_key)
+        if slide is None:
+            problems.append(f"[{page_name}] slide_key '{slide_key}' has no {SLIDE_KEY_PREFIX}{slide_key} anchor")
+            continue
+
+        # PptEngine only looks at top-level shapes, so grouped shapes don't count
+        shapes = {s["name"]: s for s in slide["shapes"] if "depth" not in s}
+        for field, shape_name in _text_shape_fields(page_cfg):
+            shape = shapes.get(shape_name)
+            if shape is None:
+                problems.append(f"[{page_name}] {field} '{shape_name}' not found on slide {slide['index']}")
+            elif not shape.get("has_text"):
+                problems.append(f"[{page_name}] {field} '{shape_name}' has no text frame")
+
+        for lead, shape_name in page_cfg.get("images", {}).items():
+            shape = shapes.get(shape_name)
+            if shape is None:
+                problems.append(f"[{page_name}] images.{lead} '{shape_name}' not found on slide {slide['index']}")
+            elif shape["type"] != "picture":
+                problems.append(f"[{page_name}] images.{lead} '{shape_name}' is a {shape['type']}, not a picture")
+
+    if "layouts" in index:
+        on_layouts = any(
+            s["name"] == FOOTER_SHAPE for layout in index["layouts"] for s in layout["shapes"]
+        )
+        if not on_layouts:
+            problems.append(f"[footer] '{FOOTER_SHAPE}' not found on any slide layout")
+
+    return problems
+
+
+def _text_shape_fields(page_cfg: dict[str, Any]):
+    for field in ("title_shape", "report_period_shape", "issue_date_shape"):
+        if field in page_cfg:
+            yield field, page_cfg[field]
+    for lead, shape_name in page_cfg.get("labels", {}).items():
+        yield f"labels.{lead}", shape_name
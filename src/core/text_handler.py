@@ -34,6 +34,12 @@ def get_next_months(start_year: int, start_month: int, n: int):
     return results
 
 
+def iter_months(start_year: int, start_month: int, end_year: int, end_month: int) -> list[tuple[int, int]]:
+    """คืนค่า (year, month) ทุกเดือนตั้งแต่เดือนเริ่มต้นถึงเดือนสุดท้าย (รวมทั้งสองเดือน)"""
+    n = (end_year - start_year) * 12 + (end_month - start_month) + 1
+    return [(m["year"], m["month"]) for m in get_next_months(start_year, start_month, n)]
+
+
 def get_months_for_leads(start_year: int, start_month: int, leads: list[int]):
     if not leads:
         return []
@@ -0,0 +1,359 @@
+# src/http_api.py
+"""
+Local HTTP job API (python -m src.main --http [--http-port 8750]).
+
+    POST /reports                    {"type": "flood|drought|all", "year": 2026, "month": 1, "dev": false}
+                                     -> 202 {"job_id", "status", ...}  (200 + "deduplicated" if the
+                                        same job is already queued/running)
+    GET  /reports                    -> all known jobs
+    GET  /reports/<id>               -> job status (queued / running / done / failed)
+    GET  /reports/<id>/download      -> the .pptx (add ?type=flood|drought for "all" jobs)
+    GET  /health                     -> {"ok": true}
+
+Jobs run on a bounded thread pool inside one process, so the parsed config,
+pre-parsed templates (TemplatePool), one ImageHandler's HTTP connection pool,
+the placeholder cache and the process-wide fetch guards (breaker, limiters,
+single-flight) are shared by all jobs. Each job has its own fetch deadline and
+prefetched images (ImageHandler.for_run) and records into its own metrics
+scope, so its exported metrics and RunHistory row cover that job only.
+Binds to 127.0.0.1 by default: there is no authentication.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+from .core.data_loader import DataLoader
+from .core.image_handler import ImageHandler
+from .core.job_queue import output_paths_in_use
+from .core.metrics import metrics
+from .core.output_manager import OutputManager, OutputSpec
+from .core.ppt_engine import template_pool
+from .reports.runner import REPORT_GENERATORS, export_run_metrics, generate_reports
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8750
+DEFAULT_WORKERS = 2
+# Connection pool size of the ImageHandler shared by all jobs
+FETCH_POOL_SIZE = 8
+
+# Accepted report years (file names and data URLs use four digits)
+MIN_YEAR, MAX_YEAR = 1900, 9999
+
+# Finished jobs kept for status/download queries (oldest are forgotten first)
+MAX_FINISHED_JOBS = 200
+
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+@dataclass
+class Job:
+    id: str
+    report_type: str
+    year: int
+    month: int
+    mode: str
+    status: str = "queued"  # queued -> running -> done | failed
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    output_paths: dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def key(self) -> tuple:
+        return (self.report_type, self.year, self.month, self.mode)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "type": self.report_type,
+            "year": self.year,
+            "month": self.month,
+            "mode": self.mode,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration_seconds": self.duration_seconds,
+            "outputs": {rt: Path(p).name for rt, p in self.output_paths.items()},
+            "error": self.error,
+            "status_url": f"/reports/{self.id}",
+            "download_url": f"/reports/{self.id}/download" if self.status == "done" else None,
+        }
+
+
+class JobManager:
+    """
+    Bounded pool of report jobs. Submitting a job whose (type, year, month, mode)
+    is already queued or running returns that job instead of starting another.
+    """
+
+    def __init__(self, config_path: str = "config.yaml", max_workers: int = DEFAULT_WORKERS,
+                 output_dir: str | Path = "output"):
+        self.config_path = config_path
+        self.output_manager = OutputManager(
+            base_output_dir=output_dir,
+            in_use=lambda: output_paths_in_use(DataLoader(self.config_path).get_config()),
+        )
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="report-job")
+        self._jobs: dict[str, Job] = {}
+        self._in_flight: dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        self._img_handler: ImageHandler | None = None
+
+    def submit(self, report_type: str, year: int, month: int, mode: str = "prod") -> tuple[Job, bool]:
+        """Returns (job, deduplicated)."""
+        job = Job(id=uuid.uuid4().hex[:12], report_type=report_type, year=year, month=month, mode=mode)
+        with self._lock:
+            existing = self._in_flight.get(job.key)
+            if existing is not None:
+                return self._jobs[existing], True
+            self._jobs[job.id] = job
+            self._in_flight[job.key] = job.id
+            self._prune()
+
+        self._pool.submit(self._run, job)
+        logger.info(f"Job {job.id} queued: {report_type} {year}-{month:02d} ({mode})")
+        return job, False
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in ("done", "failed")]
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def image_handler(self) -> ImageHandler:
+        """
+        The handler all jobs share (HTTP connection pool, hedge pool), created
+        on first use. Each job fetches through its own for_run() copy, so
+        one job starting never restarts another's fetch deadline or drops
+        the images it prefetched.
+        """
+        with self._lock:
+            if self._img_handler is None:
+                config = DataLoader(self.config_path).get_config()
+                self._img_handler = ImageHandler.from_config(config, pool_maxsize=FETCH_POOL_SIZE)
+            return self._img_handler
+
+    def _run(self, job: Job) -> None:
+        with metrics.scoped():
+            self._run_scoped(job)
+        self.warm_up()
+
+    def _run_scoped(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = datetime.now().isoformat(timespec="seconds")
+        start = time.perf_counter()
+        status = "failed"
+        output_paths: dict[str, Path] = {}
+        try:
+            report_types = list(REPORT_GENERATORS) if job.report_type == "all" else [job.report_type]
+            # build_output_path() reserves each name atomically (safe across workers)
+            output_paths = {
+                rt: self.output_manager.build_output_path(
+                    OutputSpec(report_type=rt, year=job.year, month=job.month, mode=job.mode)
+                )
+                for rt in report_types
+            }
+
+            img_handler = self.image_handler().for_run()
+            if len(output_paths) > 1:
+                generate_reports(
+                    output_paths, year=job.year, month=job.month, config_path=self.config_path,
+                    img_handler=img_handler, draft=job.mode == "dev",
+                )
+            else:
+                REPORT_GENERATORS[job.report_type](
+                    year=job.year,
+                    month=job.month,
+                    output_path=output_paths[job.report_type],
+                    config_path=self.config_path,
+                    img_handler=img_handler,
+                    draft=job.mode == "dev",
+                )
+
+            job.output_paths = {rt: str(p.resolve()) for rt, p in output_paths.items()}
+            status = "done"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}", exc_info=True)
+            job.error = f"{type(e).__name__}: {e}"
+            for path in output_paths.values():
+                OutputManager.release(path)
+        finally:
+            job.duration_seconds = round(time.perf_counter() - start, 3)
+            job.finished_at = datetime.now().isoformat(timespec="seconds")
+            job.status = status
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+
+        export_run_metrics(
+            "success" if status == "done" else "failed", job.duration_seconds, self.config_path,
+            report=job.report_type, year=job.year, month=job.month, mode=job.mode, job_id=job.id,
+        )
+
+    def warm_up(self) -> None:
+        """Parses the next template copies (at start-up and while a worker is idle)."""
+        try:
+            config = DataLoader(self.config_path).get_config()
+            for rt in REPORT_GENERATORS:
+                template_pool.warm(config[f"{rt}_report"]["template_path"])
+        except Exception as e:
+            logger.debug(f"Template warm-up skipped: {e}")
+
+
+def parse_job_request(body: Any) -> tuple[str, int, int, str]:
+    """
+    Checks a POST /reports body; returns (report_type, year, month, mode).
+    Raises ValueError with a message for the client on anything malformed.
+    """
+    if not isinstance(body, dict) or not {"type", "year", "month"} <= body.keys():
+        raise ValueError('Expected JSON {"type", "year", "month"}')
+
+    report_type, year, month, dev = body["type"], body["year"], body["month"], body.get("dev", False)
+    if not isinstance(report_type, str) or (report_type != "all" and report_type not in REPORT_GENERATORS):
+        raise ValueError(f"Unknown report type: {report_type!r} (expected one of: all, {', '.join(REPORT_GENERATORS)})")
+    # bool is an int subclass: {"month": true} is not month 1
+    if not isinstance(year, int) or isinstance(year, bool) or not MIN_YEAR <= year <= MAX_YEAR:
+        raise ValueError(f"year must be an integer {MIN_YEAR}..{MAX_YEAR} (got {year!r})")
+    if not isinstance(month, int) or isinstance(month, bool) or not 1 <= month <= 12:
+        raise ValueError(f"month must be an integer 1..12 (got {month!r})")
+    if not isinstance(dev, bool):
+        raise ValueError(f"dev must be true or false (got {dev!r})")
+    return report_type, year, month, "dev" if dev else "prod"
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    server_version = "HIIReportAPI/1.0"
+    manager: JobManager  # set by make_server()
+
+    # --- Routing ---
+    def do_GET(self) -> None:
+        parts = self._path_parts()
+        if parts == ["health"]:
+            self._send_json(HTTPStatus.OK, {"ok": True})
+        elif parts == ["reports"]:
+            self._send_json(HTTPStatus.OK, {"jobs": [j.to_dict() for j in self.manager.list()]})
+        elif len(parts) == 2 and parts[0] == "reports":
+            job = self._job_or_404(parts[1])
+            if job:
+                self._send_json(HTTPStatus.OK, job.to_dict())
+        elif len(parts) == 3 and parts[0] == "reports" and parts[2] == "download":
+            job = self._job_or_404(parts[1])
+            if job:
+                self._send_download(job)
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found")
+
+    def do_POST(self) -> None:
+        if self._path_parts() != ["reports"]:
+            self._send_error(HTTPStatus.NOT_FOUND, "Not found")
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_error(HTTPStatus.BAD_REQUEST, 'Expected JSON {"type", "year", "month"}')
+            return
+
+        try:
+            report_type, year, month, mode = parse_job_request(body)
+        except ValueError as e:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(e))
+            return
+
+        job, deduplicated = self.manager.submit(report_type, year, month, mode)
+        status = HTTPStatus.OK if deduplicated else HTTPStatus.ACCEPTED
+        self._send_json(status, {**job.to_dict(), "deduplicated": deduplicated},
+                        headers={"Location": f"/reports/{job.id}"})
+
+    # --- Helpers ---
+    def _path_parts(self) -> list[str]:
+        return [p for p in urlsplit(self.path).path.split("/") if p]
+
+    def _job_or_404(self, job_id: str) -> Optional[Job]:
+        job = self.manager.get(job_id)
+        if job is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job: {job_id}")
+        return job
+
+    def _send_download(self, job: Job) -> None:
+        if job.status != "done":
+            self._send_error(HTTPStatus.CONFLICT, f"Job {job.id} is {job.status}")
+            return
+
+        wanted = parse_qs(urlsplit(self.path).query).get("type", [None])[0]
+        if wanted is None and len(job.output_paths) == 1:
+            wanted = next(iter(job.output_paths))
+        if wanted not in job.output_paths:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"Choose ?type= one of: {', '.join(job.output_paths)}")
+            return
+
+        path = Path(job.output_paths[wanted])
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self._send_error(HTTPStatus.GONE, f"Output file no longer exists: {path.name}")
+            return
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", PPTX_MIME)
+        self.send_header("Content-Length", str(len(data)))
+        # Thai file names: RFC 5987 filename* plus an ASCII fallback
+        self.send_header(
+            "Content-Disposition",
+            f"attachment; filename=\"{wanted}_{job.year}{job.month:02d}.pptx\"; "
+            f"filename*=UTF-8''{quote(path.name)}",
+        )
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status: HTTPStatus, payload: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json(status, {"error": message})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def make_server(manager: JobManager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Builds (but does not start) the HTTP server; port=0 picks a free port."""
+    handler = type("BoundReportRequestHandler", (ReportRequestHandler,), {"manager": manager})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -14,25 +14,46 @@ import os
 import sys
 import argparse
 import logging
-import subprocess
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
 from pathlib import Path
 from datetime import datetime
 
 # --- Third-party Imports ---
 try:
     from rich.console import Console
-    from rich.prompt import Prompt, IntPrompt
-    from rich.panel import Panel
-    from rich.text import Text
+    from rich.table import Table
     RICH_AVAILABLE = True
 except ImportError:
     RICH_AVAILABLE = False
 
 # --- Project Imports ---
-from .reports.drought.manager import generate_drought_report
-from .reports.flood.manager import generate_flood_report
+from .reports.runner import (
+    REPORT_GENERATORS,
+    REPORT_PAGES,
+    SpeculativePrefetch,
+    export_run_metrics,
+    generate_reports,
+    generate_variants,
+    prefetch_archive,
+    run_batch,
+    run_batch_processes,
+    seed_archive_from_decks,
+)
 from .core.output_manager import OutputManager, OutputSpec
-from .core.logging_config import setup_logging
+from .core.text_handler import iter_months
+from .core.logging_config import mute_logging, set_log_file, setup_logging
+from .core.data_loader import DataLoader
+from .core.image_handler import ImageHandler
+from .core.job_queue import JobQueue, output_paths_in_use
+from .core.run_history import TREND_WINDOW, RunHistory
+from .core.metrics import metrics
+from .core.ppt_engine import template_pool
+from .core.profiling import profile_run
+from .core import service_link
+from .ui import interactive_mode, open_output_folder
+from .http_api import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_WORKERS, JobManager, make_server
 
 # Setup module-level logger
 logger = logging.getLogger(__name__)
@@ -70,72 +91,502 @@ def cleanup_old_logs(log_dir: Path, pattern: str = "run_*.log", keep: int = 5) -
             pass
 
 
-def interactive_mode() -> tuple[str, int, int]:
+def parse_year_month(value: str) -> tuple[int, int]:
+    """argparse type for 'YYYY-MM' values."""
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got '{value}'")
+    if not 1 <= month <= 12:
+        raise argparse.ArgumentTypeError(f"month must be 1..12 (got {month})")
+    return year, month
+
+
+def parse_page_list(value: str) -> list[str]:
+    """argparse type for --pages 'risk_forecast,rain_forecast_part2'."""
+    pages = [p.strip() for p in value.split(",") if p.strip()]
+    known = {page for names in REPORT_PAGES.values() for page in names}
+    unknown = [p for p in pages if p not in known]
+    if not pages or unknown:
+        raise argparse.ArgumentTypeError(
+            f"expected a comma-separated list of: {', '.join(sorted(known))}"
+            + (f" (unknown: {', '.join(unknown)})" if unknown else "")
+        )
+    return pages
+
+
+def parse_variant_list(value: str) -> list[str]:
+    """argparse type for --variants 'briefing,agency_a' (names are checked against config later)."""
+    variants = list(dict.fromkeys(v.strip() for v in value.split(",") if v.strip()))
+    if not variants:
+        raise argparse.ArgumentTypeError("expected a comma-separated list of variant names")
+    return variants
+
+
+def build_log_path(args: argparse.Namespace, name: str) -> Path:
     """
-    Launches an interactive CLI session using 'Rich'.
-    Returns the user's selected report type, year, and month.
+    Returns the log file for one run: --log-file if given, otherwise
+    logs/<name>_<timestamp>.log (applying the retention policy first).
     """
-    
-    # ล้างปุ่มที่ User อาจเผลอกดค้างไว้ตอนรอรายงานเสร็จ
-    if os.name == 'nt': 
-        import msvcrt
-        while msvcrt.kbhit():
-            msvcrt.getch()   
-    
-    console = Console()
-    
-    # 1. Display Header
-    console.print(Panel(
-        Text("HII Report Generator", justify="center", style="bold white"),
-        style="bold blue",
-        subtitle="v2.0"
-    ))
-
-# Display menu options
-    console.print("\nSelect an option:")
-    console.print(" [bold cyan]1[/]: Drought Report")
-    console.print(" [bold cyan]2[/]: Flood Report")
-    console.print(" [bold red]0[/]: Exit Program")
-    
-    # Prompt for user choice (Removed default value for UX clarity)
-    choice = Prompt.ask(
-        "Enter choice", 
-        choices=["1", "2", "0"], 
-        show_choices=False
+    if args.log_file:
+        return Path(args.log_file)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    log_dir = Path("logs")
+    log_dir.mkdir(exist_ok=True)
+    cleanup_old_logs(log_dir, pattern="run_*.log", keep=5)
+    cleanup_old_logs(log_dir, pattern="run_*.prof", keep=5)
+    cleanup_old_logs(log_dir, pattern="run_*_profile.txt", keep=5)
+    return log_dir / f"{name}_{timestamp}.log"
+
+
+def show_stats(args: argparse.Namespace) -> str:
+    """
+    --stats: duration percentiles, image latency, placeholders and trends from
+    the run history (global.metrics.history_db), per report type and per issue month.
+    Narrow with --report and --from YYYY-MM (runs started since then).
+    """
+    history = RunHistory.from_config(DataLoader(args.config).get_config())
+    if history is None:
+        print("Run history is disabled (global.metrics.history_db).")
+        return "STATS"
+
+    since = f"{args.from_month[0]}-{args.from_month[1]:02d}" if args.from_month else None
+    report = args.report if args.report and args.report != "all" else None
+    with history:
+        rows = history.runs(report=report, since=since)
+    if not rows:
+        print(f"No runs recorded in {history.path} yet.")
+        return "STATS"
+
+    def _fmt_trend(trend: float | None) -> str:
+        return "-" if trend is None else f"{trend:+.0%}"
+
+    columns = ["runs", "ok", "p50", "p90", "p95", "max", "img p95", "placeholders", "MB", "trend"]
+    tables = [
+        ("By report type", ["report"], RunHistory.summarize(rows, by=("report",))),
+        ("By report type and issue month", ["report", "month"], RunHistory.summarize(rows, by=("report", "issue_month"))),
+    ]
+    for title, key_columns, stats in tables:
+        body = [
+            [*(str(k) for k in st.key), str(st.runs), str(st.ok), f"{st.p50:.2f}", f"{st.p90:.2f}",
+             f"{st.p95:.2f}", f"{st.max:.2f}", "-" if st.image_p95 is None else f"{st.image_p95:.2f}",
+             f"{st.placeholders_per_run:.1f}", f"{st.output_mb:.2f}", _fmt_trend(st.trend)]
+            for st in stats
+        ]
+        if RICH_AVAILABLE:
+            table = Table(title=f"{title} (seconds; placeholders per run; deck MB)")
+            for name in [*key_columns, *columns]:
+                table.add_column(name, justify="left" if name in key_columns else "right")
+            for row in body:
+                table.add_row(*row)
+            Console().print(table)
+        else:
+            print(f"\n{title}")
+            print(" | ".join([*key_columns, *columns]))
+            for row in body:
+                print(" | ".join(row))
+
+    print(f"\n{len(rows)} runs from {rows[0]['started_at']} to {rows[-1]['started_at']} "
+          f"(trend = median of the last {TREND_WINDOW} successful runs vs the earlier ones)")
+    return "STATS"
+
+
+def run_prefetch(args: argparse.Namespace) -> str:
+    """
+    --prefetch: fills the local image archive for a month range without
+    building decks. Safe to interrupt and re-run (already archived images are skipped).
+    """
+    (from_year, from_month), (to_year, to_month) = args.from_month, args.to_month
+    log_file_path = build_log_path(args, f"run_prefetch_{from_year}{from_month:02d}-{to_year}{to_month:02d}")
+    setup_logging(
+        level=args.log_level,
+        log_file=log_file_path,
+        quiet=args.quiet,
+        console_style=args.log_style,
+        file_level="DEBUG"
     )
 
-    if choice == "0":
-        return None, None, None 
+    report_types = list(REPORT_GENERATORS) if args.report in (None, "all") else [args.report]
+    run_info = {"report": "prefetch", "report_types": report_types,
+                "from": f"{from_year}-{from_month:02d}", "to": f"{to_year}-{to_month:02d}"}
 
-    report_type = "drought" if choice == "1" else "flood"
+    metrics.reset()
+    run_start = time.perf_counter()
+    try:
+        stored, missing = prefetch_archive(report_types, args.from_month, args.to_month, config_path=args.config)
+    except Exception as e:
+        logger.critical(f"Prefetch failed: {e}", exc_info=True)
+        export_run_metrics("failed", time.perf_counter() - run_start, args.config, **run_info)
+        exit(1)
 
-    # 3. Ask Year
-    # Provide visual hint for current year
-    current_year = datetime.now().year
-    year = IntPrompt.ask(
-        f"Enter year (e.g. [bold cyan]{current_year}[/]) [dim](default: current)[/]", 
-        default=current_year, 
-        show_default=False
+    export_run_metrics("success", time.perf_counter() - run_start, args.config, **run_info)
+    logger.info(f"Prefetch finished: {stored} new, {missing} unavailable upstream.")
+    return "PREFETCH"
+
+
+def run_seed_cache(args: argparse.Namespace) -> str:
+    """
+    --seed-cache DIR: imports the images of earlier decks under DIR into the
+    local image archive (no network), so --offline / --batch rebuilds of
+    those months start warm. Safe to re-run (archived URLs are skipped).
+    """
+    log_file_path = build_log_path(args, "run_seed_cache")
+    setup_logging(
+        level=args.log_level,
+        log_file=log_file_path,
+        quiet=args.quiet,
+        console_style=args.log_style,
+        file_level="DEBUG"
     )
 
-    # 4. Ask Month
-    current_month = datetime.now().month
-    month = IntPrompt.ask(
-        f"Enter month ([bold cyan]1-12[/]) [dim](default: current)[/]", 
-        default=current_month, 
-        show_default=False
+    report_types = list(REPORT_GENERATORS) if args.report in (None, "all") else [args.report]
+    run_info = {"report": "seed_cache", "report_types": report_types, "source": str(args.seed_cache)}
+
+    metrics.reset()
+    run_start = time.perf_counter()
+    try:
+        decks, stored, placeholders = seed_archive_from_decks(
+            args.seed_cache, report_types, config_path=args.config
+        )
+    except Exception as e:
+        logger.critical(f"Cache seeding failed: {e}", exc_info=True)
+        export_run_metrics("failed", time.perf_counter() - run_start, args.config, **run_info)
+        exit(1)
+
+    export_run_metrics("success", time.perf_counter() - run_start, args.config, **run_info, decks=decks)
+    logger.info(f"Cache seeding finished: {stored} images from {decks} decks, {placeholders} placeholders skipped.")
+    return "SEED_CACHE"
+
+
+def run_batch_cli(args: argparse.Namespace) -> str:
+    """
+    --batch: queues one job per report type and month of --from..--to in the
+    durable SQLite queue (global.job_queue), then works through every unfinished
+    job. Re-running after a crash/reboot continues where the last run stopped.
+    """
+    (from_year, from_month), (to_year, to_month) = args.from_month, args.to_month
+    log_file_path = build_log_path(args, f"run_batch_{from_year}{from_month:02d}-{to_year}{to_month:02d}")
+    setup_logging(
+        level=args.log_level,
+        log_file=log_file_path,
+        quiet=args.quiet,
+        console_style=args.log_style,
+        file_level="DEBUG"
     )
-    
-    return report_type, year, month
+
+    report_types = list(REPORT_GENERATORS) if args.report in (None, "all") else [args.report]
+    mode = "dev" if args.dev else "prod"
+    run_info = {"report": "batch", "report_types": report_types,
+                "from": f"{from_year}-{from_month:02d}", "to": f"{to_year}-{to_month:02d}"}
+
+    metrics.reset()
+    run_start = time.perf_counter()
+    try:
+        with JobQueue.from_config(DataLoader(args.config).get_config()) as queue:
+            specs = [
+                OutputSpec(report_type=rt, year=year, month=month, mode=mode)
+                for year, month in iter_months(*args.from_month, *args.to_month)
+                for rt in report_types
+            ]
+            added = queue.enqueue(specs)
+            resumed = queue.recover()
+            logger.info(f"Job queue {queue.path}: {added} new jobs, {resumed} resumed, {queue.counts()}")
+
+            if args.processes > 1:
+                counts = run_batch_processes(queue.path, args.processes, config_path=args.config)
+            else:
+                counts = run_batch(queue, config_path=args.config)
+    except Exception as e:
+        logger.critical(f"Batch failed: {e}", exc_info=True)
+        export_run_metrics("failed", time.perf_counter() - run_start, args.config, **run_info)
+        exit(1)
+
+    status = "success" if counts["failed"] == 0 else "failed"
+    export_run_metrics(status, time.perf_counter() - run_start, args.config, **run_info, jobs=counts)
+    logger.info(f"Batch finished: {counts['done']} done, {counts['failed']} failed.")
+    return "BATCH"
+
+
+def run_report(
+    args: argparse.Namespace,
+    report_type: str,
+    year: int,
+    month: int,
+    img_handler: ImageHandler | None = None,
+    speculative: SpeculativePrefetch | None = None,
+) -> Path:
+    """
+    One generation run: per-run log file, metrics, output naming and the
+    generator call(s). Returns the saved deck (the last one for 'all').
+    Raises on failure (after exporting the failed-run metrics).
+    """
+    # Generate log filename based on current report task
+    log_file_path = build_log_path(args, f"run_{report_type}_{year}{month:02d}")
+
+    # Point the file sink at this run's log (console sink + root handler stay as set up in main)
+    set_log_file(log_file_path, file_level="DEBUG")
+
+    if RICH_AVAILABLE and not args.quiet:
+        Console().print(f"\n[dim]Log file: {log_file_path}[/dim]\n")
+
+    # --- Execute Report Generation ---
+    metrics.reset()
+    run_start = time.perf_counter()
+    mode = "dev" if args.dev else "prod"
+    output_paths: dict[str, Path] = {}
+    variant_paths: dict[str, Path] = {}
+    try:
+        out_mgr = OutputManager(
+            base_output_dir="output", in_use=lambda: output_paths_in_use(DataLoader(args.config).get_config())
+        )
+        report_types = list(REPORT_GENERATORS) if report_type == "all" else [report_type]
+
+        # --pages: update the latest earlier output (or --base) instead of the template
+        base_paths: dict[str, Path] = {}
+        if args.pages:
+            for rt in report_types:
+                spec = OutputSpec(report_type=rt, year=year, month=month, mode=mode)
+                base = Path(args.base) if args.base else out_mgr.find_latest(spec)
+                if base is not None:
+                    base_paths[rt] = base
+                else:
+                    logger.warning(f"No earlier {rt} output for {year}-{month:02d}; updating the template instead.")
+
+        output_paths = {
+            rt: out_mgr.build_output_path(OutputSpec(
+                report_type=rt,
+                year=year,
+                month=month,
+                mode=mode,
+            ))
+            for rt in report_types
+        }
+        # --variants: extra decks of the same report, rendered from the same images
+        variant_paths = {
+            variant: out_mgr.build_output_path(OutputSpec(
+                report_type=report_type,
+                year=year,
+                month=month,
+                mode=mode,
+                variant=variant,
+            ))
+            for variant in args.variants or []
+        }
+
+        if img_handler is None and args.offline:
+            img_handler = ImageHandler.from_config(DataLoader(args.config).get_config(), offline=True)
+        elif img_handler is None and speculative is not None:
+            img_handler = speculative.claim(year, month)
+            if img_handler is not None:
+                logger.info("Using images prefetched while the menu was open.")
+
+        with profile_run(args.profile, log_file_path.with_suffix("")):
+            if variant_paths:
+                # One fetch of the images, every variant assembled in parallel
+                generate_variants(
+                    report_type, {None: output_paths[report_type], **variant_paths},
+                    year=year, month=month, config_path=args.config,
+                    img_handler=img_handler, draft=args.dev,
+                )
+            elif len(output_paths) > 1:
+                # Shared fetch plan + parallel assembly
+                generate_reports(
+                    output_paths, year=year, month=month, config_path=args.config,
+                    img_handler=img_handler, draft=args.dev,
+                    pages=args.pages, base_paths=base_paths,
+                )
+            else:
+                generator = REPORT_GENERATORS[report_type]
+                generator(
+                    year=year,
+                    month=month,
+                    output_path=output_paths[report_type],
+                    config_path=args.config,
+                    img_handler=img_handler,
+                    draft=args.dev,
+                    pages=args.pages,
+                    base_path=base_paths.get(report_type),
+                )
+    except Exception:
+        for path in [*output_paths.values(), *variant_paths.values()]:
+            OutputManager.release(path)
+        export_run_metrics("failed", time.perf_counter() - run_start, args.config,
+                           report=report_type, year=year, month=month, mode=mode)
+        raise
+
+    export_run_metrics("success", time.perf_counter() - run_start, args.config,
+                       report=report_type, year=year, month=month, mode=mode)
+    return output_paths[report_types[-1]]
+
+
+def serve(args: argparse.Namespace) -> str:
+    """
+    --serve: resident warm generator for the desktop launcher.
+
+    Keeps imports, config, pre-parsed templates, the HTTP connection pool and
+    placeholder fonts warm, and runs jobs sent by thin clients
+    (python -m src.client, see src/core/service_link.py) one at a time.
+    """
+    config = DataLoader(args.config).get_config()
+    template_paths = [config[f"{rt}_report"]["template_path"] for rt in REPORT_GENERATORS]
+    for template_path in template_paths:
+        template_pool.warm(template_path)
+
+    img_handler = ImageHandler.from_config(config, offline=args.offline)
+    img_handler.create_placeholder("Lead0")  # loads the placeholder font
+
+    address, authkey = service_link.new_address(), service_link.new_authkey()
+    listener = Listener(address, authkey=authkey)
+    service_link.publish(address, authkey)
+    logger.info(f"Report service ready on {address} (stop: python -m src.client --stop)")
+
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, AuthenticationError) as e:
+                logger.warning(f"Rejected service connection: {e}")
+                continue
+
+            with conn:
+                try:
+                    message = conn.recv()
+                except (OSError, EOFError):
+                    continue
+                reply, stop = handle_service_request(args, message, img_handler)
+                try:
+                    conn.send(reply)
+                except OSError:
+                    pass
+
+            if stop:
+                break
+            # Idle time: parse fresh template copies before the next job arrives
+            for template_path in template_paths:
+                template_pool.warm(template_path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        service_link.unpublish()
+
+    logger.info("Report service stopped.")
+    return "SERVICE_STOPPED"
+
+
+def serve_http(args: argparse.Namespace) -> str:
+    """
+    --http: local HTTP job API for other tools (see src/http_api.py).
+    Runs until interrupted (Ctrl+C).
+    """
+    log_file_path = build_log_path(args, "run_http_api")
+    setup_logging(
+        level=args.log_level,
+        log_file=log_file_path,
+        quiet=args.quiet,
+        console_style=args.log_style,
+        file_level="DEBUG"
+    )
+
+    manager = JobManager(config_path=args.config, max_workers=args.workers)
+    manager.warm_up()
+    server = make_server(manager, args.http_host, args.http_port)
+    host, port = server.server_address[:2]
+    logger.info(f"HTTP job API listening on http://{host}:{port} ({args.workers} workers)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        manager.shutdown()
+
+    logger.info("HTTP job API stopped.")
+    return "HTTP_STOPPED"
+
+
+def handle_service_request(
+    args: argparse.Namespace,
+    message: dict,
+    img_handler: ImageHandler,
+) -> tuple[dict, bool]:
+    """Runs one client request. Returns (reply, stop_service)."""
+    op = message.get("op") if isinstance(message, dict) else None
+
+    if op == "ping":
+        return {"ok": True, "pid": os.getpid()}, False
+    if op == "shutdown":
+        return {"ok": True}, True
+    if op != "generate":
+        return {"ok": False, "error": f"Unknown request: {op!r}"}, False
+
+    report_type = message.get("report")
+    if report_type != "all" and report_type not in REPORT_GENERATORS:
+        return {"ok": False, "error": f"Unknown report type: {report_type!r}"}, False
+
+    # Same HTTP pool for every job, but a fresh deadline and no images from earlier jobs
+    img_handler.rearm(keep_prefetched=False)
+    job_args = argparse.Namespace(**{**vars(args), "dev": bool(message.get("dev"))})
+    try:
+        output_path = run_report(
+            job_args, report_type, int(message["year"]), int(message["month"]), img_handler=img_handler
+        )
+    except Exception as e:
+        logger.critical(f"Report generation failed: {e}", exc_info=True)
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}, False
+
+    return {"ok": True, "output_path": str(output_path.resolve())}, False
 
 
 def main():
     # --- Argument Parsing ---
     parser = argparse.ArgumentParser(description="HII Drought/Flood Report Generator")
-    parser.add_argument("--report", choices=["drought", "flood"], help="Report type to generate.")
+    parser.add_argument("--report", choices=["drought", "flood", "all"], help="Report type to generate ('all' = flood + drought).")
     parser.add_argument("--year", type=int, help="Target year (e.g., 2026).")
     parser.add_argument("--month", type=int, help="Target month (1-12).")
     parser.add_argument("--dev", action="store_true", help="Enable development mode output.")
+    parser.add_argument("--config", default="config.yaml", help="Path to config.yaml.")
+    parser.add_argument("--profile", choices=["cpu", "mem"], default=None,
+                        help="Profile generation (cProfile / tracemalloc); reports are written next to the log file.")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print run-time percentiles and trends from the run history (--report / --from narrow it).")
+    parser.add_argument("--pages", type=parse_page_list, default=None, metavar="PAGE[,PAGE...]",
+                        help="Regenerate only these pages (e.g. risk_forecast,rain_forecast_part2) "
+                             "on the latest existing output; fetches only their images.")
+    parser.add_argument("--variants", type=parse_variant_list, default=None, metavar="NAME[,NAME...]",
+                        help="Also render these template variants (<report>_report.variants in config) "
+                             "from the same fetched images.")
+    parser.add_argument("--base", default=None, metavar="PPTX",
+                        help="Deck to update with --pages (default: latest output of that month, else the template).")
+
+    # Local image archive
+    parser.add_argument("--prefetch", action="store_true",
+                        help="Only download images for --from..--to into the local archive (no decks).")
+    parser.add_argument("--from", dest="from_month", type=parse_year_month, metavar="YYYY-MM",
+                        help="First month for --prefetch / --batch.")
+    parser.add_argument("--to", dest="to_month", type=parse_year_month, metavar="YYYY-MM",
+                        help="Last month for --prefetch / --batch.")
+    parser.add_argument("--seed-cache", default=None, metavar="DIR",
+                        help="Import the images of earlier decks under DIR (e.g. output/) into the local archive.")
+    parser.add_argument("--offline", action="store_true",
+                        help="Generate from the local archive only (no network).")
+    parser.add_argument("--batch", action="store_true",
+                        help="Generate every month of --from..--to via the durable, resumable job queue.")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Worker processes for --batch (templates are shared, not re-read per worker).")
+
+    # Resident service (used by the thin client: python -m src.client)
+    parser.add_argument("--serve", action="store_true",
+                        help="Run as a resident warm generator for thin clients.")
+
+    # Local HTTP job API (POST /reports, GET /reports/<id>[/download])
+    parser.add_argument("--http", action="store_true", help="Run the local HTTP job API.")
+    parser.add_argument("--http-host", default=DEFAULT_HOST, help="Bind address for --http.")
+    parser.add_argument("--http-port", type=int, default=DEFAULT_PORT, help="Port for --http.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent report jobs for --http.")
     
     # Logging arguments
     parser.add_argument("--log-level", default="INFO", help="Set logging verbosity.")
@@ -145,6 +596,17 @@ def main():
 
     args = parser.parse_args()
 
+    if (args.prefetch or args.batch) and not (args.from_month and args.to_month):
+        parser.error("--prefetch / --batch require --from YYYY-MM and --to YYYY-MM")
+    if args.base and not args.pages:
+        parser.error("--base requires --pages")
+    if args.variants and args.report not in ("flood", "drought"):
+        parser.error("--variants requires --report flood|drought")
+    if args.variants and args.pages:
+        parser.error("--variants renders whole decks; it cannot be combined with --pages")
+    if args.base and args.report == "all":
+        parser.error("--base names one deck; use --report flood|drought (or omit --base)")
+
     # Check for automation mode (CLI arguments provided)
     is_cli_automation = (args.report and args.year and args.month)
     
@@ -157,105 +619,79 @@ def main():
     
     exit_reason = "NORMAL" 
 
+    if args.stats:
+        return show_stats(args)
+    if args.prefetch:
+        return run_prefetch(args)
+    if args.seed_cache:
+        return run_seed_cache(args)
+    if args.batch:
+        return run_batch_cli(args)
+    if args.serve:
+        return serve(args)
+    if args.http:
+        return serve_http(args)
+
     # --- Main Application Loop ---
-    while True:
-        try:
-            # --- Determine Parameters ---
-            if is_cli_automation:
-                report_type = args.report
-                year = args.year
-                month = args.month
-            else:
-                # Interactive Mode
-                if RICH_AVAILABLE:
-                    report_type, year, month = interactive_mode()
-                    
-                    # Exit condition
-                    if report_type is None:
-                        exit_reason = "USER_EXIT"
-                        break
+    # Menu rounds share one background prefetch of the default month (restarted when the month changes)
+    speculative: SpeculativePrefetch | None = None
+    try:
+        while True:
+            try:
+                # --- Determine Parameters ---
+                if is_cli_automation:
+                    report_type = args.report
+                    year = args.year
+                    month = args.month
                 else:
-                    # Standard input fallback
-                    print("Rich library not found. Using standard input.")
-                    report_type = input("Report (drought/flood): ").strip()
-                    year = int(input("Year: "))
-                    month = int(input("Month: "))
-
-            # --- Reset Logging Handlers ---
-            # Remove existing handlers to prevent duplication across iterations
-            root_logger = logging.getLogger()
-            if root_logger.handlers:
-                for h in root_logger.handlers[:]:
-                    root_logger.removeHandler(h)
-
-            # Generate log filename based on current report task
-            if not args.log_file:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                log_dir = Path("logs")
-                log_dir.mkdir(exist_ok=True)
-                cleanup_old_logs(log_dir, pattern="run_*.log", keep=5)
-
-                log_filename = f"run_{report_type}_{year}{month:02d}_{timestamp}.log"
-                log_file_path = log_dir / log_filename
-            else:
-                log_file_path = Path(args.log_file)
-
-            # Re-configure logging with file handler
-            setup_logging(
-                level=args.log_level,
-                log_file=log_file_path,
-                quiet=args.quiet,
-                console_style=args.log_style,
-                file_level="DEBUG"
-            )
-
-            if RICH_AVAILABLE and not args.quiet:
-                Console().print(f"\n[dim]Log file: {log_file_path}[/dim]\n")
-
-            # --- Execute Report Generation ---
-            out_mgr = OutputManager(base_output_dir="output")
-            spec = OutputSpec(
-                report_type=report_type,
-                year=year,
-                month=month,
-                mode="dev" if args.dev else "prod",
-            )
-            output_path = out_mgr.build_output_path(spec)
-
-            REPORT_GENERATORS = {
-                "flood": generate_flood_report,
-                "drought": generate_drought_report,
-            }
-            
-            generator = REPORT_GENERATORS[report_type]
-            generator(
-                year=year,
-                month=month,
-                output_path=output_path,
-            )
-
-            # --- Post-Processing ---
-            logger.info("Opening output folder...")
-            if os.name == 'nt':
-                subprocess.Popen(f'explorer /select,"{output_path}"')
-            else:
-                subprocess.Popen(['open' if os.name == 'posix' else 'xdg-open', str(output_path.parent)])
-
-        except Exception as e:
-            logger.critical(f"Report generation failed: {e}", exc_info=True)
+                    # Interactive Mode
+                    if RICH_AVAILABLE:
+                        # The menu defaults to the current month: start fetching it
+                        # (flood + drought) while the user is still choosing.
+                        if not args.offline:
+                            now = datetime.now()
+                            if speculative is None or (speculative.year, speculative.month) != (now.year, now.month):
+                                if speculative is not None:
+                                    speculative.stop()
+                                speculative = SpeculativePrefetch(now.year, now.month, config_path=args.config).start()
+
+                        with mute_logging():
+                            report_type, year, month = interactive_mode()
+                    
+                        # Exit condition
+                        if report_type is None:
+                            exit_reason = "USER_EXIT"
+                            break
+                    else:
+                        # Standard input fallback
+                        print("Rich library not found. Using standard input.")
+                        report_type = input("Report (drought/flood/all): ").strip()
+                        year = int(input("Year: "))
+                        month = int(input("Month: "))
+
+                output_path = run_report(args, report_type, year, month, speculative=speculative)
+
+                # --- Post-Processing ---
+                open_output_folder(output_path)
+
+            except Exception as e:
+                logger.critical(f"Report generation failed: {e}", exc_info=True)
             
-            # Pause on error in interactive mode
-            if not args.quiet and RICH_AVAILABLE:
-                input("\nAn error occurred. Press Enter to return to menu...")
+                # Pause on error in interactive mode
+                if not args.quiet and RICH_AVAILABLE:
+                    input("\nAn error occurred. Press Enter to return to menu...")
             
-            # Exit immediately in automation mode
+                # Exit immediately in automation mode
+                if is_cli_automation:
+                    exit(1)
+
+            # Break loop if running in automation mode
             if is_cli_automation:
-                exit(1)
+                break
+    finally:
+        if speculative is not None:
+            speculative.stop()
 
-        # Break loop if running in automation mode
-        if is_cli_automation:
-            break
-        
     return exit_reason
 
 
@@ -1,5 +1,6 @@
 import logging
 from pathlib import Path
+from typing import Iterable
 
 # --- Rich UI Imports ---
 try:
@@ -10,10 +11,16 @@ except ImportError:
     RICH_AVAILABLE = False
 # -----------------------
 
-from ...core.ppt_engine import PptEngine
+from ...core.assembly_pipeline import ImagePipeline, ImageSet
+from ...core.ppt_engine import PptEngine, ZipPolicy
+from ...core.template_binding import load_binding
 from ...core.data_loader import DataLoader
+from ...core.image_handler import ImageHandler
+from ...core.metrics import metrics
 # Import tasks ให้ตรงกับที่คุณเขียนไว้ใน drought/tasks.py
 from .tasks import (
+    build_image_slots,
+    select_pages,
     update_footer,
     update_cover,
     update_rain_forecast_part1,  # Page 3
@@ -23,75 +30,130 @@ from .tasks import (
 
 logger = logging.getLogger(__name__)
 
+@metrics.labels(report="drought")
 def generate_drought_report(
     year: int,
     month: int,
     output_path: Path | str,
     config_path: str = "config.yaml",
+    img_handler: ImageHandler | None = None,
+    draft: bool = False,
+    pages: Iterable[str] | None = None,
+    base_path: Path | str | None = None,
+    variant: str | None = None,
+    image_set: ImageSet | None = None,
 ):
     """
     Entry point for Drought Report generation.
+
+    Pass a shared (optionally prefetched) img_handler to reuse downloads
+    across reports; otherwise one handler is created for this run.
+    draft=True (--dev output) saves with the faster draft compression level.
+
+    pages (names from tasks.PAGES) runs only those page tasks (--pages); the
+    deck is then loaded from base_path (an earlier output) when given, so the
+    other pages keep their content. Defaults: every page, from the template.
+
+    variant (a name under drought_report.variants) renders that variant's template
+    and page layout instead; pass a shared image_set to reuse one fetch of the
+    month's images across variant decks (see runner.generate_variants).
     """
+    pages = select_pages(pages)
     # Setup Console
     console = Console() if RICH_AVAILABLE else None
 
     # Header
     if console:
-        console.print(Rule(f"Generating Drought Report for {year}-{month:02d}", style="bold blue"))
+        title = f"Generating Drought Report for {year}-{month:02d}" + (f" ({variant})" if variant else "")
+        console.print(Rule(title, style="bold blue"))
     
-    logger.info("Start drought report generation: year=%s month=%s", year, month)
+    logger.info("Start drought report generation: year=%s month=%s variant=%s", year, month, variant or "-")
     logger.info("Output path: %s", output_path)
 
     # 1. Load Resources
     loader = DataLoader(config_path)
-    config = loader.get_config()
+    config = DataLoader.with_variant(loader.get_config(), "drought_report", variant)
     template_path = Path(config["drought_report"]["template_path"])
+    # A variant may leave pages out of its layout
+    pages = tuple(p for p in pages if p == "footer" or p in config["drought_report"]["pages"])
     
     logger.info(f"Template: {template_path}")
 
-    # 2. Init Engine
-    engine = PptEngine(template_path)
-    
-    # 3. Update Footer
-    if console: console.print(Rule("Updating Footer"))
-    else: logger.info("--- Updating Footer ---")
-    
-    update_footer(engine, config, year, month)
-    logger.info("Footer updated successfully.")
-
-    # 4. Update Cover (Page 1)
-    if console: console.print(Rule("Updating Page 1 (Title Page)"))
-    else: logger.info("--- Updating Cover Page ---")
-
-    update_cover(engine, config, year, month)
-    logger.info("Page 1 updated successfully.")
+    # 2. Preflight: every configured slide/shape must exist BEFORE any image is fetched
+    with metrics.timer("stage_seconds", stage="preflight"):
+        binding = load_binding(config, "drought_report")
 
-    # 5. Drought Forecast Part 1 (Page 3)
-    if console: console.print(Rule("Updating Page 3 (3-Month Forecast)"))
-    else: logger.info("--- Updating Page 3 ---")
-
-    update_rain_forecast_part1(engine=engine, config=config, year=year, month=month)
-    logger.info("Page 3 updated successfully.")
-
-    # 6. Drought Forecast Part 2 (Page 4)
-    if console: console.print(Rule("Updating Page 4 (3-Month Forecast)"))
-    else: logger.info("--- Updating Page 4 ---")
-
-    update_rain_forecast_part2(engine, config, year, month)
-    logger.info("Page 4 updated successfully.")
-
-    # 7. Drought Summary (Page 5)
-    if console: console.print(Rule("Updating Page 5 (6-Month Summary)"))
-    else: logger.info("--- Updating Page 5 ---")
-
-    update_risk_forecast(engine, config, year, month)
-    logger.info("Page 5 updated successfully.")
-
-    # 8. Save
+    # 3. Init Engine (an earlier output shares the template's slide layout)
+    if base_path:
+        logger.info(f"Base deck: {base_path} (pages: {', '.join(pages)})")
+    with metrics.timer("stage_seconds", stage="load_template"):
+        engine = PptEngine(base_path or template_path, binding=binding)
+    img_handler = img_handler or ImageHandler.from_config(config)
+    
+    # 4. Start fetching the selected pages' images; the text edits below run meanwhile
+    slots = build_image_slots(engine, config, year, month, pages)
+    with ImagePipeline(engine, img_handler, slots, image_set=image_set) as pipeline:
+        # 5. Update Footer
+        if "footer" in pages:
+            if console: console.print(Rule("Updating Footer"))
+            else: logger.info("--- Updating Footer ---")
+
+            with metrics.timer("stage_seconds", stage="footer"):
+                update_footer(engine, config, year, month)
+            logger.info("Footer updated successfully.")
+
+        # 6. Update Cover (Page 1)
+        if "cover" in pages:
+            if console: console.print(Rule("Updating Page 1 (Title Page)"))
+            else: logger.info("--- Updating Cover Page ---")
+
+            with metrics.timer("stage_seconds", stage="cover"):
+                update_cover(engine, config, year, month)
+            logger.info("Page 1 updated successfully.")
+
+        # 7. Drought Forecast Part 1 (Page 3)
+        if "rain_forecast_part1" in pages:
+            if console: console.print(Rule("Updating Page 3 (3-Month Forecast)"))
+            else: logger.info("--- Updating Page 3 ---")
+
+            with metrics.timer("stage_seconds", stage="rain_forecast_part1"):
+                update_rain_forecast_part1(engine, config, year, month)
+            logger.info("Page 3 updated successfully.")
+
+        # 8. Drought Forecast Part 2 (Page 4)
+        if "rain_forecast_part2" in pages:
+            if console: console.print(Rule("Updating Page 4 (3-Month Forecast)"))
+            else: logger.info("--- Updating Page 4 ---")
+
+            with metrics.timer("stage_seconds", stage="rain_forecast_part2"):
+                update_rain_forecast_part2(engine, config, year, month)
+            logger.info("Page 4 updated successfully.")
+
+        # 9. Drought Summary (Page 5)
+        if "risk_forecast" in pages:
+            if console: console.print(Rule("Updating Page 5 (6-Month Summary)"))
+            else: logger.info("--- Updating Page 5 ---")
+
+            with metrics.timer("stage_seconds", stage="risk_forecast"):
+                update_risk_forecast(engine, config, year, month)
+            logger.info("Page 5 updated successfully.")
+
+        # 10. Place each image as soon as it lands
+        if slots:
+            if console: console.print(Rule(f"Placing {len(slots)} Images"))
+            else: logger.info("--- Placing Images ---")
+
+            with metrics.timer("stage_seconds", stage="images"):
+                pipeline.apply()
+            logger.info(f"{len(slots)} images placed.")
+
+    # 11. Save
     if console: console.print(Rule("Saving Final Report"))
     else: logger.info("--- Saving Final Report ---")
 
-    engine.save(output_path)
+    with metrics.timer("stage_seconds", stage="save"):
+        engine.save(output_path, policy=ZipPolicy.from_config(config, draft=draft))
+    metrics.set_gauge("output_bytes", Path(output_path).stat().st_size)
     logger.info(f"Report saved to: {output_path}")
     
     # Footer Summary (Green)
@@ -1,13 +1,105 @@
+from __future__ import annotations
+
 import logging
 from pathlib import Path
+from typing import Iterable
 
+from ...core.assembly_pipeline import ImageSlot
 from ...core.ppt_engine import PptEngine
 from ...core.data_loader import DataLoader
-from ...core.image_handler import ImageHandler
 from ...core.text_handler import get_months_for_leads, format_month_range
     
 logger = logging.getLogger(__name__)
 
+# Image-bearing pages: page name -> (url pattern key, leads)
+IMAGE_PAGES = {
+    "rain_forecast_part1": ("rain_pattern", [0, 1, 2]),
+    "rain_forecast_part2": ("rain_pattern", [3, 4, 5]),
+    "risk_forecast": ("risk_pattern", list(range(6))),
+}
+
+# Every page task in deck order (names accepted by --pages)
+PAGES = ("footer", "cover", *IMAGE_PAGES)
+
+
+def select_pages(pages: Iterable[str] | None) -> tuple[str, ...]:
+    """Validates a page selection; returns it in deck order (None -> every page)."""
+    if pages is None:
+        return PAGES
+    unknown = set(pages) - set(PAGES)
+    if unknown:
+        raise ValueError(f"Unknown page(s): {', '.join(sorted(unknown))} (choose from: {', '.join(PAGES)})")
+    return tuple(p for p in PAGES if p in pages)
+
+
+def build_image_plan(config: dict, year: int, month: int, pages: Iterable[str] | None = None) -> list[str]:
+    """
+    Returns every image URL the drought report needs for the given month,
+    in the order the page tasks consume them (only `pages`, if given).
+    """
+    data_sources = config["drought_report"]["data_sources"]
+
+    urls = []
+    for page_name, (pattern_key, leads) in IMAGE_PAGES.items():
+        if pages is not None and page_name not in pages:
+            continue
+        for lead in leads:
+            urls.append(
+                DataLoader.get_url(data_sources, pattern_key, yyyymm=f"{year}{month:02d}", lead=lead)
+            )
+    return urls
+
+
+def build_image_sources(config: dict, year: int, month: int) -> dict[str, str]:
+    """
+    Returns picture shape name -> image URL for the given month, i.e. where
+    every picture of a generated drought deck came from (--seed-cache).
+    """
+    report_cfg = config["drought_report"]
+
+    sources = {}
+    for page_name, (pattern_key, leads) in IMAGE_PAGES.items():
+        images_cfg = report_cfg["pages"][page_name]["images"]
+        for lead in leads:
+            sources[images_cfg[f"lead{lead}"]] = DataLoader.get_url(
+                report_cfg["data_sources"], pattern_key, yyyymm=f"{year}{month:02d}", lead=lead
+            )
+    return sources
+
+
+def build_image_slots(
+    engine: PptEngine,
+    config: dict,
+    year: int,
+    month: int,
+    pages: Iterable[str] | None = None,
+) -> list[ImageSlot]:
+    """
+    Resolves every picture of the selected pages (default: all) to its slide,
+    shape and URL, for the pipelined assembly (core.assembly_pipeline).
+    """
+    report_cfg = config["drought_report"]
+
+    slots = []
+    for page_name, (pattern_key, leads) in IMAGE_PAGES.items():
+        if pages is not None and page_name not in pages:
+            continue
+        page_cfg = report_cfg["pages"][page_name]
+        slide = engine.find_slide_by_key(page_cfg["slide_key"])
+        for lead in leads:
+            img_shape = page_cfg["images"][f"lead{lead}"]
+            slots.append(ImageSlot(
+                slide=slide,
+                shape_name=img_shape,
+                url=DataLoader.get_url(
+                    report_cfg["data_sources"], pattern_key, yyyymm=f"{year}{month:02d}", lead=lead
+                ),
+                placeholder_text=f"Lead{lead}",
+                aspect_ratio=engine.get_aspect_ratio(slide, img_shape),
+            ))
+    return slots
+
+
 def update_footer(engine: PptEngine, config: dict, year: int, month: int) -> None:
     months = get_months_for_leads(year, month, [0, 1, 2, 3, 4, 5])
     month_range = format_month_range(months)
@@ -46,20 +138,21 @@ def _format_risk_title(months: list[dict]) -> str:
     return f"สรุปพื้นที่เสี่ยงภัยแล้งจากปริมาณฝนเดือน{format_month_range(months)}"
 
 
-def update_rain_forecast_part1(engine: PptEngine, config: dict, year: int, month: int):
+def update_rain_forecast_part1(
+    engine: PptEngine,
+    config: dict,
+    year: int,
+    month: int,
+):
     """
     Drought – Rain Forecast Lead0–Lead2
     - Update title
     - Update month labels
-    - Replace 3 forecast images
+    - 3 forecast images: placed by the assembly pipeline (build_image_slots)
     """
     page_cfg = config["drought_report"]["pages"]["rain_forecast_part1"]
-    data_sources = config["drought_report"]["data_sources"]
     slide = engine.find_slide_by_key(page_cfg["slide_key"])
 
-    loader = DataLoader()
-    img_handler = ImageHandler()
-
     leads = [0, 1, 2]
     months = get_months_for_leads(year, month, leads)
 
@@ -71,32 +164,22 @@ def update_rain_forecast_part1(engine: PptEngine, config: dict, year: int, month
         lbl_shape = page_cfg["labels"][f"lead{lead}"]
         engine.set_text(slide, lbl_shape, month_info["thai_name"])
 
-        # Image
-        url = loader.get_url(
-            data_sources,
-            "rain_pattern",
-            yyyymm=f"{year}{month:02d}",
-            lead=lead,
-        )
-        image_stream = img_handler.get_image(url, placeholder_text=f"Lead{lead}")
-        img_shape = page_cfg["images"][f"lead{lead}"]
-        engine.replace_image(slide, img_shape, image_stream)
-
 
-def update_rain_forecast_part2(engine: PptEngine, config: dict, year: int, month: int):
+def update_rain_forecast_part2(
+    engine: PptEngine,
+    config: dict,
+    year: int,
+    month: int,
+):
     """
     Drought – Rain Forecast Lead3–Lead5
     - Update title
     - Update month labels
-    - Replace 3 forecast images
+    - 3 forecast images: placed by the assembly pipeline (build_image_slots)
     """
     page_cfg = config["drought_report"]["pages"]["rain_forecast_part2"]
-    data_sources = config["drought_report"]["data_sources"]
     slide = engine.find_slide_by_key(page_cfg["slide_key"])
 
-    loader = DataLoader()
-    img_handler = ImageHandler()
-
     leads = [3, 4, 5]
     months = get_months_for_leads(year, month, leads)
 
@@ -107,32 +190,22 @@ def update_rain_forecast_part2(engine: PptEngine, config: dict, year: int, month
         lbl_shape = page_cfg["labels"][f"lead{lead}"]
         engine.set_text(slide, lbl_shape, month_info["thai_name"])
 
-        url = loader.get_url(
-            data_sources,
-            "rain_pattern",
-            yyyymm=f"{year}{month:02d}",
-            lead=lead,
-        )
-        image_stream = img_handler.get_image(url, placeholder_text=f"Lead{lead}")
-
-        img_shape = page_cfg["images"][f"lead{lead}"]
-        engine.replace_image(slide, img_shape, image_stream)
 
-
-def update_risk_forecast(engine: PptEngine, config: dict, year: int, month: int):
+def update_risk_forecast(
+    engine: PptEngine,
+    config: dict,
+    year: int,
+    month: int,
+):
     """
     Drought – Risk Forecast Lead0–Lead5
     - Update title
-    - Replace 6 risk map images (lead0..lead5)
+    - 6 risk map images (lead0..lead5): placed by the assembly pipeline (build_image_slots)
     NOTE: This slide has no month label textboxes.
     """
     page_cfg = config["drought_report"]["pages"]["risk_forecast"]
-    data_sources = config["drought_report"]["data_sources"]
     slide = engine.find_slide_by_key(page_cfg["slide_key"])
 
-    loader = DataLoader()
-    img_handler = ImageHandler()
-
     leads = list(range(6))
     months = get_months_for_leads(year, month, leads)
 
@@ -142,17 +215,3 @@ def update_risk_forecast(engine: PptEngine, config: dict, year: int, month: int)
 
     title_text = _format_risk_title(months)
     engine.set_text(slide, page_cfg["title_shape"], title_text)
-    
-    # Replace images lead0..lead5
-    for lead in leads:
-        url = loader.get_url(
-            data_sources,
-            "risk_pattern",
-            yyyymm=f"{year}{month:02d}",
-            lead=lead,
-        )
-        image_stream = img_handler.get_image(url, placeholder_text=f"Lead{lead}")
-
-        img_shape = page_cfg["images"][f"lead{lead}"]
-        engine.replace_image(slide, img_shape, image_stream)
-
@@ -0,0 +1,602 @@
+# src/reports/runner.py
+"""
+Report dispatch shared by the CLI and combined runs.
+
+generate_reports() assembles several report types of the same month in
+parallel worker threads that share one ImageHandler (one connection pool,
+single-flight downloads); each deck places its images as they arrive.
+generate_variants() renders one report into several template variants
+(<type>_report.variants) in parallel from a single fetch of its images.
+
+prefetch_archive() downloads the images of a month range into the local
+ImageArchive without building decks (resumable; see --prefetch / --offline).
+seed_archive_from_decks() fills the same archive from earlier decks instead
+of the network (--seed-cache).
+
+export_run_metrics() writes the run-level metrics (Prometheus textfile +
+JSON log + SQLite run history) for every entry point (CLI, resident service,
+HTTP API).
+
+run_batch() works through the durable SQLite JobQueue (--batch): fetch with
+per-image checkpoints, then assemble + save; resumable after a crash.
+run_batch_processes() runs it in several worker processes on the same queue,
+with the templates shared through mapped snapshots (core.shared_template).
+
+SpeculativePrefetch starts fetching a guessed month (the interactive menu's
+default) in the background before the user has confirmed it.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from ..core.assembly_pipeline import ImageSet
+from ..core.data_loader import DataLoader
+from ..core.fetch_control import latency_history
+from ..core.image_archive import ImageArchive
+from ..core.image_handler import ImageHandler, is_placeholder
+from ..core import shared_template
+from ..core.job_queue import JobQueue, QueuedJob
+from ..core.logging_config import init_worker_logging, process_log_queue
+from ..core.metrics import carry_scope, metrics
+from ..core.output_manager import OutputManager
+from ..core.run_history import RunHistory
+from ..core.template_binding import load_binding
+from ..core.template_index import extract_pictures, index_pptx, picture_spots
+from ..core.text_handler import iter_months
+from .drought.manager import generate_drought_report
+from .drought.tasks import PAGES as DROUGHT_PAGES
+from .drought.tasks import build_image_plan as build_drought_image_plan
+from .drought.tasks import build_image_sources as build_drought_image_sources
+from .flood.manager import generate_flood_report
+from .flood.tasks import PAGES as FLOOD_PAGES
+from .flood.tasks import build_image_plan as build_flood_image_plan
+from .flood.tasks import build_image_sources as build_flood_image_sources
+
+logger = logging.getLogger(__name__)
+
+REPORT_GENERATORS = {
+    "flood": generate_flood_report,
+    "drought": generate_drought_report,
+}
+
+IMAGE_PLANNERS = {
+    "flood": build_flood_image_plan,
+    "drought": build_drought_image_plan,
+}
+
+# Picture shape name -> URL per report type (--seed-cache)
+IMAGE_SOURCES = {
+    "flood": build_flood_image_sources,
+    "drought": build_drought_image_sources,
+}
+
+# Generated decks start with the issue month: "202601_ผลการวิเคราะห์...pptx"
+_DECK_MONTH = re.compile(r"^(\d{4})(0[1-9]|1[0-2])_")
+
+# Page task names per report type (--pages)
+REPORT_PAGES = {
+    "flood": FLOOD_PAGES,
+    "drought": DROUGHT_PAGES,
+}
+
+
+def export_run_metrics(
+    status: str,
+    duration: float,
+    config_path: str = "config.yaml",
+    **run_info,
+) -> None:
+    """
+    Records run-level metrics and exports the registry to the Prometheus
+    textfile and the append-only JSON metrics log (see global.metrics in config),
+    and appends the run to the SQLite run history (--stats).
+    Also persists the per-URL-pattern latency history used for hedging.
+    Export problems are logged but never fail the run.
+    """
+    metrics.set_gauge("run_duration_seconds", duration)
+    metrics.set_gauge("run_last_timestamp_seconds", time.time())
+    metrics.inc("runs_total", status=status)
+
+    try:
+        latency_history.save()
+        config = DataLoader(config_path).get_config()
+        metrics_cfg = config.get("global", {}).get("metrics", {})
+        if metrics_cfg.get("json_log"):
+            metrics.append_json_log(
+                metrics_cfg["json_log"], status=status, duration_seconds=round(duration, 3), **run_info
+            )
+        if metrics_cfg.get("prometheus_textfile"):
+            metrics.write_prometheus_textfile(metrics_cfg["prometheus_textfile"])
+        history = RunHistory.from_config(config)
+        if history is not None:
+            with history:
+                history.record(status, duration, metrics, **run_info)
+    except Exception as e:
+        logger.warning(f"Metrics export failed: {e}")
+
+
+def generate_reports(
+    output_paths: dict[str, Path],
+    year: int,
+    month: int,
+    config_path: str = "config.yaml",
+    max_workers: int = 8,
+    img_handler: ImageHandler | None = None,
+    draft: bool = False,
+    pages: list[str] | None = None,
+    base_paths: dict[str, Path] | None = None,
+) -> dict[str, Path]:
+    """
+    Generates several report types for one month with a shared image handler.
+
+    Args:
+        output_paths: report_type -> destination .pptx path.
+        year, month: Target issue month.
+        config_path: Path to config.yaml.
+        max_workers: Connection pool size of the shared handler.
+        img_handler: Handler to fetch with (e.g. an offline one); created from config if omitted.
+        draft: Save with the faster draft compression (--dev output).
+        pages: Run only these page tasks (and fetch only their images).
+        base_paths: report_type -> earlier output to update instead of the template.
+
+    Returns:
+        The same report_type -> path mapping, once every deck is saved.
+    """
+    config = DataLoader(config_path).get_config()
+
+    # Fail before any download if a template and config.yaml disagree
+    with metrics.timer("stage_seconds", stage="preflight"):
+        for report_type in output_paths:
+            load_binding(config, f"{report_type}_report")
+
+    # No fetch-everything barrier: every deck starts its downloads and its text
+    # edits at once and places each image as it lands (core.assembly_pipeline)
+    img_handler = img_handler or ImageHandler.from_config(config, pool_maxsize=max_workers)
+    with ThreadPoolExecutor(max_workers=len(output_paths)) as pool:
+        futures = {
+            report_type: pool.submit(
+                carry_scope(REPORT_GENERATORS[report_type]),
+                year=year,
+                month=month,
+                output_path=path,
+                config_path=config_path,
+                img_handler=img_handler,
+                draft=draft,
+                pages=pages,
+                base_path=(base_paths or {}).get(report_type),
+            )
+            for report_type, path in output_paths.items()
+        }
+        for future in futures.values():
+            future.result()  # re-raise the first failure
+
+    return dict(output_paths)
+
+
+def generate_variants(
+    report_type: str,
+    output_paths: dict[str | None, Path],
+    year: int,
+    month: int,
+    config_path: str = "config.yaml",
+    max_workers: int = 8,
+    img_handler: ImageHandler | None = None,
+    draft: bool = False,
+) -> dict[str | None, Path]:
+    """
+    Renders one report type for one month into several decks at once.
+
+    The month's images are fetched ONCE into a shared ImageSet while every
+    variant (key of output_paths: a name under <type>_report.variants, None =
+    the main deck) is assembled in its own thread and places each image as it
+    lands. All decks embed the same downloaded bytes, so every additional
+    variant adds assembly cost only.
+
+    Returns:
+        The same variant -> path mapping, once every deck is saved.
+    """
+    config = DataLoader(config_path).get_config()
+    report_key = f"{report_type}_report"
+
+    # Fail before any download if a variant's template and its pages disagree
+    variant_configs = {v: DataLoader.with_variant(config, report_key, v) for v in output_paths}
+    with metrics.timer("stage_seconds", stage="preflight"):
+        for variant_config in variant_configs.values():
+            load_binding(variant_config, report_key)
+
+    # Same data_sources for every variant: the union only differs by left-out pages
+    urls = [
+        url
+        for variant, variant_config in variant_configs.items()
+        for url in IMAGE_PLANNERS[report_type](variant_config, year, month, variant_config[report_key]["pages"])
+    ]
+
+    img_handler = img_handler or ImageHandler.from_config(config, pool_maxsize=max_workers)
+    with ImageSet(img_handler, urls, max_workers=max_workers) as images:
+        with ThreadPoolExecutor(max_workers=len(output_paths)) as pool:
+            futures = {
+                variant: pool.submit(
+                    carry_scope(REPORT_GENERATORS[report_type]),
+                    year=year,
+                    month=month,
+                    output_path=path,
+                    config_path=config_path,
+                    img_handler=img_handler,
+                    draft=draft,
+                    variant=variant,
+                    image_set=images,
+                )
+                for variant, path in output_paths.items()
+            }
+            for future in futures.values():
+                future.result()  # re-raise the first failure
+
+    return dict(output_paths)
+
+
+def prefetch_archive(
+    report_types: list[str],
+    start: tuple[int, int],
+    end: tuple[int, int],
+    config_path: str = "config.yaml",
+    max_workers: int = 8,
+) -> tuple[int, int]:
+    """
+    Downloads every image of `report_types` for the months start..end
+    (inclusive, (year, month) tuples) into the local archive.
+    URLs already archived are skipped, so an interrupted run resumes.
+
+    Returns:
+        (newly stored, still missing) image counts.
+    """
+    config = DataLoader(config_path).get_config()
+    archive = ImageArchive.from_config(config)
+
+    urls: list[str] = []
+    for year, month in iter_months(*start, *end):
+        for report_type in report_types:
+            urls.extend(IMAGE_PLANNERS[report_type](config, year, month))
+    urls = list(dict.fromkeys(urls))
+    todo = [url for url in urls if url not in archive]
+
+    logger.info(
+        f"Archive {archive.root}: {len(urls) - len(todo)}/{len(urls)} images present, "
+        f"fetching {len(todo)}."
+    )
+    if not todo:
+        return 0, 0
+
+    # No per-report deadline: a long backfill is expected to take a while
+    img_handler = ImageHandler.from_config(config, pool_maxsize=max_workers, deadline=None)
+
+    def _store(url: str) -> bool:
+        stream = img_handler.download_image(url)
+        if stream is None:
+            return False
+        archive.put(url, stream.getvalue())
+        return True
+
+    with metrics.timer("stage_seconds", stage="prefetch_archive"):
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            stored = sum(pool.map(_store, todo))
+
+    logger.info(f"Archived {stored} new images; {len(todo) - stored} unavailable.")
+    return stored, len(todo) - stored
+
+
+def seed_archive_from_decks(
+    deck_dir: str | Path,
+    report_types: list[str],
+    config_path: str = "config.yaml",
+    max_workers: int = 8,
+) -> tuple[int, int, int]:
+    """
+    Imports the forecast images embedded in earlier decks under `deck_dir`
+    (e.g. output/) into the local archive, so rebuilding those months needs
+    no network. Decks are read in parallel.
+
+    A deck's month comes from its file name (yyyymm_...), each picture's URL
+    from its shape name (tasks.build_image_sources); a report-type folder in
+    the path (output/flood/...) narrows the candidate report types. Decks
+    whose pictures lost their shape names ("Picture N") are matched by the
+    template's slide, geometry and z-order instead; a deck matching nothing
+    is logged.
+    Placeholders and URLs already archived are skipped; when several decks
+    hold the same URL, the newest deck wins.
+
+    Returns:
+        (decks read, images stored, placeholders skipped) counts.
+    """
+    config = DataLoader(config_path).get_config()
+    archive = ImageArchive.from_config(config)
+
+    decks = []
+    for path in Path(deck_dir).rglob("*.pptx"):
+        match = _DECK_MONTH.match(path.name)
+        if match is None:
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if st.st_size == 0:
+            continue  # reserved by a run still in progress (OutputManager)
+        decks.append((st.st_mtime, path, int(match[1]), int(match[2])))
+    decks.sort(reverse=True)
+
+    logger.info(f"Seeding archive {archive.root} from {len(decks)} decks in {deck_dir}.")
+    if not decks:
+        return 0, 0, 0
+
+    spots_by_type = {}
+    for report_type in report_types:
+        report_cfg = config[f"{report_type}_report"]
+        try:
+            index = index_pptx(report_cfg["template_path"], include_layouts=False)
+            spots_by_type[report_type] = picture_spots(report_cfg, index)
+        except Exception as e:
+            logger.warning(f"Cannot index the {report_type} template; its pictures match by name only: {e}")
+            spots_by_type[report_type] = {}
+
+    def _extract(deck: tuple) -> tuple[dict[str, bytes], int]:
+        _, path, year, month = deck
+        sources: dict[str, str] = {}
+        spots = {}
+        for report_type in [rt for rt in report_types if rt in path.parts] or report_types:
+            sources.update(IMAGE_SOURCES[report_type](config, year, month))
+            spots.update(spots_by_type[report_type])
+        try:
+            pictures = extract_pictures(path, sources, spots)
+        except Exception as e:
+            logger.warning(f"Skipping unreadable deck {path}: {e}")
+            return {}, 0
+        if not pictures:
+            logger.warning(f"No configured pictures found in {path} (by shape name or template position)")
+        images = {sources[name]: data for name, data in pictures.items() if not is_placeholder(data)}
+        return images, len(pictures) - len(images)
+
+    stored = placeholders = 0
+    seen: set[str] = set()
+    with metrics.timer("stage_seconds", stage="seed_cache"):
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(decks)))) as pool:
+            # map() keeps the newest-first order, so the newest copy of a URL wins
+            for images, skipped in pool.map(_extract, decks):
+                placeholders += skipped
+                for url, data in images.items():
+                    if url in seen or url in archive:
+                        continue
+                    seen.add(url)
+                    archive.put(url, data)
+                    stored += 1
+
+    logger.info(f"Seeded {stored} images from {len(decks)} decks; skipped {placeholders} placeholders.")
+    return len(decks), stored, placeholders
+
+
+def run_batch(
+    queue: JobQueue,
+    config_path: str = "config.yaml",
+    max_workers: int = 8,
+    output_dir: str | Path = "output",
+) -> dict[str, int]:
+    """
+    Processes every pending job of `queue` (oldest month first):
+
+      fetching   - images not checkpointed yet are downloaded (or taken from the
+                   archive), stored in the ImageArchive and checkpointed one by one
+      assembling - the deck is built from the checkpointed bytes and saved to
+                   the output path recorded on the job (same file after a resume)
+      done       - never touched again
+
+    A crash leaves the job in fetching/assembling; JobQueue.recover() re-queues it
+    and only the missing steps are repeated. Returns the queue's state counts.
+    """
+    config = DataLoader(config_path).get_config()
+    archive = ImageArchive.from_config(config)
+    out_mgr = OutputManager(base_output_dir=output_dir, in_use=queue.output_paths_in_use)
+    # No per-report deadline: a long backfill is expected to take a while
+    img_handler = ImageHandler.from_config(config, pool_maxsize=max_workers, deadline=None)
+
+    while (job := queue.claim_next()) is not None:
+        spec = job.spec
+        label = f"job {job.id} ({spec.report_type} {spec.year}-{spec.month:02d}, {spec.mode})"
+        try:
+            load_binding(config, f"{spec.report_type}_report")
+            img_handler.rearm(keep_prefetched=False)
+            urls = IMAGE_PLANNERS[spec.report_type](config, spec.year, spec.month)
+            images = _fetch_checkpointed(queue, job, urls, archive, img_handler, max_workers)
+
+            output_path = Path(job.output_path) if job.output_path else out_mgr.build_output_path(spec)
+            queue.set_state(job.id, "assembling", output_path=str(output_path))
+            logger.info(f"Assembling {label} -> {output_path}")
+
+            img_handler.seed(images)
+            REPORT_GENERATORS[spec.report_type](
+                year=spec.year,
+                month=spec.month,
+                output_path=output_path,
+                config_path=config_path,
+                img_handler=img_handler,
+                draft=spec.mode == "dev",
+            )
+            queue.set_state(job.id, "done")
+        except Exception as e:
+            logger.error(f"Batch {label} failed: {e}", exc_info=True)
+            queue.set_state(job.id, "failed", error=f"{type(e).__name__}: {e}")
+
+    return queue.counts()
+
+
+def run_batch_processes(
+    queue_path: Path | str,
+    processes: int,
+    config_path: str = "config.yaml",
+    max_workers: int = 8,
+    output_dir: str | Path = "output",
+) -> dict[str, int]:
+    """
+    run_batch() in `processes` worker processes draining the same queue:
+    claim_next() is atomic across processes and every output path is reserved
+    atomically, so workers never share a job or a file. The parent publishes
+    the templates once and each worker maps them (no per-worker template read);
+    worker logs go through the parent's log listener, and each worker's
+    metrics are merged into this process's registry when it finishes.
+    Returns the queue's state counts.
+    """
+    config = DataLoader(config_path).get_config()
+    snapshots = shared_template.publish(
+        config[f"{report_type}_report"]["template_path"]
+        for report_type in REPORT_GENERATORS
+        if f"{report_type}_report" in config
+    )
+    # spawn everywhere (as on Windows): never fork a process that runs threads
+    context = multiprocessing.get_context("spawn")
+    log_queue = process_log_queue(context)
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=context,
+        initializer=_init_batch_worker,
+        initargs=(log_queue, logging.getLogger().level, snapshots),
+    ) as pool:
+        futures = [
+            pool.submit(_batch_worker, str(queue_path), config_path, max_workers, str(output_dir))
+            for _ in range(processes)
+        ]
+        for future in futures:
+            metrics.merge(future.result())
+
+    with JobQueue(queue_path) as queue:
+        return queue.counts()
+
+
+def _init_batch_worker(log_queue, log_level: int, snapshots: list[shared_template.TemplateSnapshot]) -> None:
+    init_worker_logging(log_queue, log_level)
+    shared_template.attach(snapshots)
+
+
+def _batch_worker(queue_path: str, config_path: str, max_workers: int, output_dir: str) -> dict[str, Any]:
+    """Drains the queue; returns this call's metrics for the parent to merge."""
+    metrics.reset()  # a pool process may run more than one call
+    with JobQueue(queue_path) as queue:
+        run_batch(queue, config_path=config_path, max_workers=max_workers, output_dir=output_dir)
+    return metrics.snapshot(raw_samples=True)
+
+
+def _fetch_checkpointed(
+    queue: JobQueue,
+    job: QueuedJob,
+    urls: list[str],
+    archive: ImageArchive,
+    img_handler: ImageHandler,
+    max_workers: int,
+) -> dict[str, bytes | None]:
+    """url -> bytes (None = unavailable upstream) for one job, resuming from its checkpoints."""
+    images: dict[str, bytes | None] = {}
+    for url, digest in queue.checkpoints(job.id).items():
+        try:
+            images[url] = archive.object_path(digest).read_bytes()
+        except OSError:
+            pass  # archive object gone: fetch again
+
+    # Already archived (e.g. by --prefetch): checkpoint without downloading
+    for url in urls:
+        if url not in images and url in archive:
+            data = archive.get(url)
+            if data is not None:
+                queue.add_checkpoint(job.id, url, archive.digest_for(url))
+                images[url] = data
+
+    todo = [url for url in dict.fromkeys(urls) if url not in images]
+    if images:
+        logger.info(f"Job {job.id}: {len(images)} images from checkpoints/archive, fetching {len(todo)}.")
+
+    def _fetch(url: str) -> bytes | None:
+        stream = img_handler.download_image(url)
+        if stream is None:
+            return None
+        data = stream.getvalue()
+        queue.add_checkpoint(job.id, url, archive.put(url, data))
+        return data
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(todo) or 1))) as pool:
+        for url, data in zip(todo, pool.map(_fetch, todo)):
+            images[url] = data
+    return images
+
+
+class SpeculativePrefetch:
+    """
+    Downloads one month's images for `report_types` in a daemon thread.
+
+    claim(year, month) returns the warm handler when the user picked the
+    guessed month (downloads still in flight are joined via single-flight),
+    or None on a wrong guess, in which case the run simply fetches as usual.
+    The handler stays claimable for later runs of the same month; stop()
+    abandons the downloads not yet started (month changed, menu closed).
+    """
+
+    def __init__(
+        self,
+        year: int,
+        month: int,
+        report_types: list[str] | None = None,
+        config_path: str = "config.yaml",
+        max_workers: int = 8,
+    ):
+        self.year = year
+        self.month = month
+        self.report_types = list(report_types or REPORT_GENERATORS)
+        self.config_path = config_path
+        self.max_workers = max_workers
+        self.img_handler: ImageHandler | None = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="speculative-prefetch", daemon=True)
+
+    def start(self) -> "SpeculativePrefetch":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        """Skips the remaining downloads and waits (up to `timeout`) for those in flight."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            config = DataLoader(self.config_path).get_config()
+            urls: list[str] = []
+            for report_type in self.report_types:
+                urls.extend(IMAGE_PLANNERS[report_type](config, self.year, self.month))
+            self.img_handler = ImageHandler.from_config(config, pool_maxsize=self.max_workers)
+            self._ready.set()
+            self.img_handler.prefetch(urls, max_workers=self.max_workers, cancel=self._stop)
+        except Exception as e:
+            # Best effort only: the real run fetches whatever is missing
+            logger.debug(f"Speculative prefetch for {self.year}-{self.month:02d} failed: {e}")
+        finally:
+            self._ready.set()
+
+    def claim(self, year: int, month: int, timeout: float = 5.0) -> ImageHandler | None:
+        """Returns the warm handler if (year, month) matches the guess, else None."""
+        if (year, month) != (self.year, self.month) or self._stop.is_set():
+            metrics.inc("speculative_prefetch_total", result="miss")
+            return None
+
+        self._ready.wait(timeout)
+        if self.img_handler is None:
+            metrics.inc("speculative_prefetch_total", result="miss")
+            return None
+
+        metrics.inc("speculative_prefetch_total", result="hit")
+        self.img_handler.rearm()
+        return self.img_handler
@@ -0,0 +1,92 @@
+# src/ui.py
+"""
+Console UI shared by the full app (src.main) and the thin service client
+(src.client): the interactive menu and opening the output folder.
+Kept free of report/pptx imports so the client starts instantly.
+"""
+
+import os
+import logging
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+try:
+    from rich.console import Console
+    from rich.prompt import Prompt, IntPrompt
+    from rich.panel import Panel
+    from rich.text import Text
+    RICH_AVAILABLE = True
+except ImportError:
+    RICH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def interactive_mode() -> tuple[str, int, int]:
+    """
+    Launches an interactive CLI session using 'Rich'.
+    Returns the user's selected report type, year, and month.
+    """
+    
+    # ล้างปุ่มที่ User อาจเผลอกดค้างไว้ตอนรอรายงานเสร็จ
+    if os.name == 'nt': 
+        import msvcrt
+        while msvcrt.kbhit():
+            msvcrt.getch()   
+    
+    console = Console()
+    
+    # 1. Display Header
+    console.print(Panel(
+        Text("HII Report Generator", justify="center", style="bold white"),
+        style="bold blue",
+        subtitle="v2.0"
+    ))
+
+# Display menu options
+    console.print("\nSelect an option:")
+    console.print(" [bold cyan]1[/]: Drought Report")
+    console.print(" [bold cyan]2[/]: Flood Report")
+    console.print(" [bold cyan]3[/]: Flood + Drought (same month)")
+    console.print(" [bold red]0[/]: Exit Program")
+    
+    # Prompt for user choice (Removed default value for UX clarity)
+    choice = Prompt.ask(
+        "Enter choice", 
+        choices=["1", "2", "3", "0"], 
+        show_choices=False
+    )
+
+    if choice == "0":
+        return None, None, None 
+
+    report_type = {"1": "drought", "2": "flood", "3": "all"}[choice]
+
+    # 3. Ask Year
+    # Provide visual hint for current year
+    current_year = datetime.now().year
+    year = IntPrompt.ask(
+        f"Enter year (e.g. [bold cyan]{current_year}[/]) [dim](default: current)[/]", 
+        default=current_year, 
+        show_default=False
+    )
+
+    # 4. Ask Month
+    current_month = datetime.now().month
+    month = IntPrompt.ask(
+        f"Enter month ([bold cyan]1-12[/]) [dim](default: current)[/]", 
+        default=current_month, 
+        show_default=False
+    )
+    
+    return report_type, year, month
+
+
+def open_output_folder(output_path: Path) -> None:
+    """Opens the folder of a finished report (selects the file on Windows)."""
+    logger.info("Opening output folder...")
+    if os.name == 'nt':
+        subprocess.Popen(f'explorer /select,"{output_path}"')
+    else:
+        subprocess.Popen(['open' if os.name == 'posix' else 'xdg-open', str(output_path.parent)])
@@ -0,0 +1,222 @@
+"""Shared fixtures: small decks built with python-pptx (no real templates needed)."""
+
+from __future__ import annotations
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.util import Emu
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def png_bytes(color: tuple[int, int, int], size: tuple[int, int] = (40, 30)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+LOGO_PNG = png_bytes((250, 120, 0), (20, 20))
+
+
+def build_deck(
+    path: Path,
+    slides: dict[str, list[str]],
+    shared_image: bool = True,
+    logo: bool = False,
+) -> Path:
+    """
+    Writes a deck with one slide per key of `slides` (anchored by a
+    SLIDE_KEY_<key> text box) holding the named pictures. With shared_image
+    every picture shows the same PNG, i.e. one image relationship per slide.
+    logo=True adds a picture "Img_Logo" (never replaced) after them.
+    """
+    prs = Presentation()
+    layout = prs.slide_layouts[6]  # blank
+    for n, (slide_key, picture_names) in enumerate(slides.items()):
+        slide = prs.slides.add_slide(layout)
+        anchor = slide.shapes.add_textbox(Emu(0), Emu(0), Emu(100000), Emu(100000))
+        anchor.name = f"SLIDE_KEY_{slide_key}"
+        title = slide.shapes.add_textbox(Emu(0), Emu(200000), Emu(3000000), Emu(400000))
+        title.name = "Txt_Title"
+        title.text_frame.text = "title"
+        for i, name in enumerate(picture_names):
+            color = (200, 200, 200) if shared_image else (10 * n, 20 * i, 90)
+            pic = slide.shapes.add_picture(
+                io.BytesIO(png_bytes(color)), Emu(1000000 * i), Emu(800000), Emu(900000), Emu(700000)
+            )
+            pic.name = name
+        if logo:
+            pic = slide.shapes.add_picture(io.BytesIO(LOGO_PNG), Emu(0), Emu(2000000), Emu(300000), Emu(300000))
+            pic.name = "Img_Logo"
+    prs.save(path)
+    return path
+
+
+@pytest.fixture
+def deck_path(tmp_path: Path) -> Path:
+    return build_deck(tmp_path / "template.pptx", {
+        "maps": ["Img_A", "Img_B", "Img_C"],
+        "risk": ["Img_D", "Img_E"],
+    })
+
+
+# ----------------------------------------------------------------------
+# A complete flood report setup: config, template and a local image server
+# ----------------------------------------------------------------------
+def flood_report_config(base_url: str, template_path: str) -> dict:
+    def _leads(prefix: str, leads) -> dict:
+        return {f"lead{n}": f"{prefix}{n}" for n in leads}
+
+    return {
+        "template_path": template_path,
+        "pages": {
+            "cover": {
+                "slide_key": "flood_cover",
+                "report_period_shape": "Txt_Report_Period",
+                "issue_date_shape": "Txt_Issue_Date",
+            },
+            "rain_forecast_part1": {
+                "slide_key": "flood_rain_fcst_lead0_lead2",
+                "title_shape": "Txt_Title",
+                "labels": _leads("Lbl_Month_Lead", range(3)),
+                "images": _leads("Img_FloodRainFcst_Lead", range(3)),
+            },
+            "rain_forecast_part2": {
+                "slide_key": "flood_rain_fcst_lead3_lead5",
+                "title_shape": "Txt_Title",
+                "labels": _leads("Lbl_Month_Lead", range(3, 6)),
+                "images": _leads("Img_FloodRainFcst_Lead", range(3, 6)),
+            },
+            "risk_forecast": {
+                "slide_key": "flood_risk_fcst_lead0_lead5",
+                "title_shape": "Txt_Title",
+                "images": _leads("Img_FloodRiskFcst_Lead", range(6)),
+            },
+        },
+        "data_sources": {
+            "base_url": base_url,
+            "rain_pattern": "{base_url}/{yyyymm}/{yyyymm}_step1_m{m}.png",
+            "risk_pattern": "{base_url}/{yyyymm}/{yyyymm}_step5_m{m}.png",
+        },
+    }
+
+
+def build_report_template(path: Path, report_cfg: dict) -> Path:
+    """A template satisfying validate_report_config for `report_cfg`."""
+    prs = Presentation()
+    layout = prs.slide_layouts[6]
+    for master in prs.slide_masters:
+        for each in master.slide_layouts:
+            for shape in each.placeholders:
+                if shape.placeholder_format.type == PP_PLACEHOLDER.FOOTER:
+                    shape.name = "Txt_Footer"
+
+    for page_cfg in report_cfg["pages"].values():
+        slide = prs.slides.add_slide(layout)
+        anchor = slide.shapes.add_textbox(Emu(0), Emu(0), Emu(100000), Emu(100000))
+        anchor.name = f"SLIDE_KEY_{page_cfg['slide_key']}"
+        text_shapes = [
+            page_cfg[field] for field in ("title_shape", "report_period_shape", "issue_date_shape")
+            if field in page_cfg
+        ] + list(page_cfg.get("labels", {}).values())
+        for i, name in enumerate(text_shapes):
+            box = slide.shapes.add_textbox(Emu(0), Emu(200000 + 300000 * i), Emu(3000000), Emu(250000))
+            box.name = name
+            box.text_frame.text = name
+        for i, name in enumerate(page_cfg.get("images", {}).values()):
+            pic = slide.shapes.add_picture(
+                io.BytesIO(png_bytes((200, 200, 200))), Emu(1000000 * i), Emu(2500000), Emu(900000), Emu(1200000)
+            )
+            pic.name = name
+    prs.save(path)
+    return path
+
+
+class ImageServer:
+    """
+    Serves a distinct PNG for every path; counts GETs. `statuses` forces an
+    HTTP status per path; clearing `gate` holds every response until it is set.
+    """
+
+    def __init__(self):
+        import http.server
+        import threading
+
+        server = self
+        self.hits: list[str] = []
+        self.missing: set[str] = set()
+        self.statuses: dict[str, int] = {}
+        self.gate = threading.Event()
+        self.gate.set()
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.hits.append(self.path)
+                server.gate.wait(30)
+                status = 404 if self.path in server.missing else server.statuses.get(self.path)
+                if status is not None:
+                    self.send_response(status)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = server.image_for(self.path)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def image_for(path: str) -> bytes:
+        seed = sum(path.encode())
+        return png_bytes((seed % 256, (seed * 7) % 256, (seed * 13) % 256))
+
+    def close(self) -> None:
+        self.gate.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def image_server():
+    server = ImageServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def flood_env(tmp_path: Path, monkeypatch, image_server):
+    """Working directory with config.yaml + flood template; returns the config path."""
+    import yaml
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "templates").mkdir()
+    report_cfg = flood_report_config(image_server.base_url, "templates/flood.pptx")
+    build_report_template(tmp_path / "templates" / "flood.pptx", report_cfg)
+    config = {
+        "global": {
+            "archive_dir": str(tmp_path / "cache" / "images"),
+            "fetch": {"breaker_failures": 1000, "report_deadline": 30},
+            "metrics": {"history_db": str(tmp_path / "cache" / "run_history.sqlite3")},
+        },
+        "flood_report": report_cfg,
+    }
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding="utf-8")
+    return config_path
@@ -0,0 +1,100 @@
+import sys
+
+import pytest
+
+from src import client
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    record = {"in_process": [], "requests": []}
+
+    def fake_request(message, timeout=None):
+        record["requests"].append(message)
+        if message["op"] == "ping":
+            return {"ok": True}
+        reply = record.get("reply", {"ok": True, "output_path": "out.pptx"})
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    monkeypatch.setattr(client.service_link, "request", fake_request)
+    monkeypatch.setattr(client, "run_in_process", lambda: record["in_process"].append(list(sys.argv)) or "IN_PROCESS")
+    monkeypatch.setattr(client, "open_output_folder", lambda path: None)
+    return record
+
+
+@pytest.mark.parametrize("extra", [
+    ["--batch", "--from", "2026-01", "--to", "2026-02"],
+    ["--stats"],
+    ["--seed-cache", "output"],
+    ["--report", "flood", "--year", "2026", "--month", "1", "--pages", "risk_forecast"],
+    ["--report", "flood", "--year", "2026", "--month", "1", "--offline"],
+    ["--report", "flood", "--year", "2026", "--month", "1", "--config", "other.yaml"],
+    ["--report", "flood", "--year", "2026", "--month", "1", "--variants", "briefing"],
+])
+def test_options_the_service_cannot_carry_run_in_process(monkeypatch, calls, extra):
+    monkeypatch.setattr(sys, "argv", ["client", *extra])
+    assert client.main() == "IN_PROCESS"
+    assert calls["in_process"] == [["client", *extra]]
+    assert not any(m["op"] == "generate" for m in calls["requests"])
+
+
+def test_plain_job_goes_to_the_service(monkeypatch, calls):
+    monkeypatch.setattr(sys, "argv", ["client", "--report", "flood", "--year", "2026", "--month", "1", "--dev"])
+    assert client.main() == "NORMAL"
+    assert calls["requests"][-1] == {"op": "generate", "report": "flood", "year": 2026, "month": 1, "dev": True}
+    assert calls["in_process"] == []
+
+
+def test_disconnect_fallback_keeps_flags(monkeypatch, calls):
+    calls["reply"] = None
+    monkeypatch.setattr(
+        sys, "argv", ["client", "--report", "drought", "--year", "2026", "--month", "2", "--dev", "--quiet"]
+    )
+    client.main()
+    assert calls["in_process"] == [
+        ["client", "--report", "drought", "--year", "2026", "--month", "2", "--dev", "--quiet"]
+    ]
+
+
+def test_timeout_does_not_start_a_second_run(monkeypatch, calls, capsys):
+    calls["reply"] = client.service_link.ServiceTimeout("no reply")
+    monkeypatch.setattr(sys, "argv", ["client", "--report", "flood", "--year", "2026", "--month", "3"])
+    with pytest.raises(SystemExit) as exited:
+        client.main()
+    assert exited.value.code == 1
+    assert calls["in_process"] == []
+    assert "still working on flood 2026-03" in capsys.readouterr().err
+
+
+def test_slow_ping_counts_as_no_service(monkeypatch, calls):
+    def slow(message, timeout=None):
+        raise client.service_link.ServiceTimeout("no reply")
+
+    monkeypatch.setattr(client.service_link, "request", slow)
+    monkeypatch.setattr(sys, "argv", ["client", "--report", "flood", "--year", "2026", "--month", "3"])
+    assert client.main() == "IN_PROCESS"
+
+
+def test_request_tells_timeout_from_no_service(tmp_path):
+    import threading
+    from multiprocessing.connection import Listener
+
+    from src.core import service_link
+
+    info_path = tmp_path / "service.json"
+    assert service_link.request({"op": "ping"}, timeout=0.1, path=info_path) is None
+
+    authkey = service_link.new_authkey()
+    address = str(tmp_path / "svc.sock")
+    with Listener(address, authkey=authkey) as listener:
+        service_link.publish(address, authkey, path=info_path)
+        accepted = []
+        thread = threading.Thread(target=lambda: accepted.append(listener.accept()), daemon=True)
+        thread.start()
+        with pytest.raises(service_link.ServiceTimeout):
+            service_link.request({"op": "generate"}, timeout=0.2, path=info_path)
+        thread.join(5)
+        assert accepted[0].recv() == {"op": "generate"}  # delivered, just not answered
+        accepted[0].close()
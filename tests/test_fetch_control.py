@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from src.core import fetch_control
+from src.core.fetch_control import CircuitBreaker
+from src.core.image_handler import ImageHandler
+
+
+@pytest.fixture
+def single_slot(monkeypatch):
+    """Fresh per-host limiters allowing one request at a time."""
+    monkeypatch.setattr(fetch_control.host_limiters, "_limiters", {})
+    monkeypatch.setattr(fetch_control.host_limiters, "settings", {"initial": 1, "minimum": 1, "maximum": 1})
+
+
+def test_undecided_probe_reopens_half_open_state():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.record_failure("maps")
+    assert breaker.allow("maps")      # the probe
+    assert not breaker.allow("maps")  # only one at a time
+    breaker.end_probe("maps")         # e.g. the probe raised an unexpected error
+    assert breaker.allow("maps")
+
+
+def test_end_probe_ignores_other_threads():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.record_failure("maps")
+    assert breaker.allow("maps")
+    other = threading.Thread(target=breaker.end_probe, args=("maps",))
+    other.start()
+    other.join()
+    assert not breaker.allow("maps")
+
+
+def test_unexpected_error_does_not_block_host(monkeypatch, image_server, single_slot):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.0)
+    breaker.record_failure("127.0.0.1")
+    handler = ImageHandler(breaker=breaker, retries=0)
+
+    def broken(url):
+        raise ValueError("unexpected")
+
+    monkeypatch.setattr(handler, "_get_content", broken)
+    assert handler.download_image(f"{image_server.base_url}/a.png") is None
+    assert breaker.allow("127.0.0.1")
+
+
+def test_retries_stop_at_the_deadline(image_server, single_slot):
+    image_server.statuses["/down.png"] = 503
+    handler = ImageHandler(breaker=CircuitBreaker(1000), retries=10, backoff_factor=0.1, deadline=0.5)
+
+    start = time.monotonic()
+    assert handler.download_image(f"{image_server.base_url}/down.png") is None
+    assert time.monotonic() - start < 0.5
+    assert 1 < len(image_server.hits) < 11
+
+
+def test_backoff_releases_the_limiter_slot(image_server, single_slot):
+    image_server.statuses["/busy.png"] = 503
+    handler = ImageHandler(breaker=CircuitBreaker(1000), retries=2, backoff_factor=0.5, deadline=30)
+    slow = threading.Thread(target=handler.download_image, args=(f"{image_server.base_url}/busy.png",))
+    slow.start()
+    while not image_server.hits:
+        time.sleep(0.01)
+
+    # The only slot for this host is free while /busy.png backs off
+    start = time.monotonic()
+    assert handler.download_image(f"{image_server.base_url}/ok.png") is not None
+    assert time.monotonic() - start < 0.5
+    slow.join()
+    assert image_server.hits.count("/busy.png") == 3
+
+
+def test_single_flight_shares_one_call():
+    flight = fetch_control.SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("u", slow))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    while not calls:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len({id(result) for result, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+
+
+def test_adaptive_limiter_halves_once_per_interval_and_grows_back():
+    limiter = fetch_control.AdaptiveLimiter("maps", initial=8, maximum=8, decrease_interval=60)
+    limiter.on_overload()
+    limiter.on_overload()  # same burst
+    assert int(limiter.limit) == 4
+    for _ in range(40):  # about +1 per `limit` successes
+        limiter.on_success(0.1)
+    assert int(limiter.limit) == 8
@@ -0,0 +1,142 @@
+import threading
+import time
+import zipfile
+from io import BytesIO
+
+import pytest
+import requests
+
+from src.core.data_loader import DataLoader
+from src.core.run_history import RunHistory
+from src.http_api import JobManager, make_server, parse_job_request
+from src.reports.flood.tasks import build_image_sources
+
+
+def _wait(manager, jobs, timeout=60):
+    end = time.monotonic() + timeout
+    while any(manager.get(job.id).status not in ("done", "failed") for job in jobs):
+        assert time.monotonic() < end, "jobs did not finish"
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def api(flood_env):
+    manager = JobManager(config_path=str(flood_env), max_workers=2, output_dir="output")
+    server = make_server(manager, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    manager.shutdown()
+
+
+def _wait_http(api, job_id, timeout=60):
+    end = time.monotonic() + timeout
+    while (status := requests.get(f"{api}/reports/{job_id}").json())["status"] not in ("done", "failed"):
+        assert time.monotonic() < end, "job did not finish"
+        time.sleep(0.05)
+    return status
+
+
+def test_http_job_lifecycle(api, image_server):
+    image_server.gate.clear()  # keep the first job fetching
+    created = requests.post(f"{api}/reports", json={"type": "flood", "year": 2026, "month": 1})
+    assert created.status_code == 202
+    job = created.json()
+    assert job["deduplicated"] is False and created.headers["Location"] == f"/reports/{job['job_id']}"
+
+    again = requests.post(f"{api}/reports", json={"type": "flood", "year": 2026, "month": 1})
+    assert again.status_code == 200
+    assert again.json()["deduplicated"] is True and again.json()["job_id"] == job["job_id"]
+    assert requests.get(f"{api}{job['status_url']}/download").status_code == 409
+
+    image_server.gate.set()
+    status = _wait_http(api, job["job_id"])
+    assert status["status"] == "done" and status["download_url"] == f"/reports/{job['job_id']}/download"
+    assert [j["job_id"] for j in requests.get(f"{api}/reports").json()["jobs"]] == [job["job_id"]]
+
+    download = requests.get(f"{api}{status['download_url']}")
+    assert download.status_code == 200
+    assert download.headers["Content-Disposition"].startswith('attachment; filename="flood_202601.pptx"')
+    assert "ppt/presentation.xml" in zipfile.ZipFile(BytesIO(download.content)).namelist()
+
+
+def test_http_errors(api):
+    assert requests.get(f"{api}/reports/nosuchjob").status_code == 404
+    assert requests.get(f"{api}/reports/nosuchjob/download").status_code == 404
+    assert requests.get(f"{api}/nowhere").status_code == 404
+    assert requests.post(f"{api}/nowhere", json={}).status_code == 404
+
+    for body in (b"{not json", b"[1, 2]", b'{"type": ["flood"], "year": 2026, "month": 1}',
+                 b'{"type": "flood", "year": 2026, "month": 0}'):
+        response = requests.post(f"{api}/reports", data=body)
+        assert response.status_code == 400
+        assert response.json()["error"]
+    assert requests.get(f"{api}/reports").json() == {"jobs": []}
+    assert requests.get(f"{api}/health").json() == {"ok": True}
+
+
+def test_concurrent_jobs_record_their_own_metrics(flood_env, image_server):
+    manager = JobManager(config_path=str(flood_env), max_workers=2, output_dir="output")
+    try:
+        jobs = [manager.submit("flood", 2026, month)[0] for month in (1, 2)]
+        _wait(manager, jobs)
+        handler = manager.image_handler()
+        third, _ = manager.submit("flood", 2026, 3)
+        _wait(manager, [third])
+        assert manager.image_handler() is handler
+    finally:
+        manager.shutdown()
+
+    assert [manager.get(job.id).status for job in (*jobs, third)] == ["done"] * 3
+    config = DataLoader(str(flood_env)).get_config()
+    with RunHistory.from_config(config) as history:
+        rows = {row["month"]: row for row in history.runs(report="flood")}
+
+    assert sorted(rows) == [1, 2, 3]
+    for month, row in rows.items():
+        served = [image_server.image_for(url[len(image_server.base_url):])
+                  for url in build_image_sources(config, 2026, month).values()]
+        assert row["images"] == 12
+        assert row["image_bytes"] == sum(len(data) for data in served)
+        assert row["status"] == "success"
+
+
+def test_jobs_keep_their_own_deadline_and_prefetched_images(flood_env):
+    manager = JobManager(config_path=str(flood_env), max_workers=1, output_dir="output")
+    try:
+        shared = manager.image_handler()
+        first = shared.for_run()
+        first.seed({"http://images.test/a.png": b"a"})
+        first_deadline = first.deadline
+        second = shared.for_run()  # a job starting while `first` is fetching
+    finally:
+        manager.shutdown()
+
+    assert first.session is second.session is shared.session
+    assert first.deadline is first_deadline and second.deadline is not first_deadline
+    assert first.download_image("http://images.test/a.png").read() == b"a"
+    assert second._prefetched == {} and shared._prefetched == {}
+
+
+def test_parse_job_request():
+    assert parse_job_request({"type": "flood", "year": 2026, "month": 1}) == ("flood", 2026, 1, "prod")
+    assert parse_job_request({"type": "all", "year": 2026, "month": 12, "dev": True}) == ("all", 2026, 12, "dev")
+
+
+@pytest.mark.parametrize("body, message", [
+    ([], "Expected JSON"),
+    ({"type": "flood", "year": 2026}, "Expected JSON"),
+    ({"type": ["flood"], "year": 2026, "month": 1}, "Unknown report type"),
+    ({"type": "storm", "year": 2026, "month": 1}, "Unknown report type"),
+    ({"type": "flood", "year": "2026", "month": 1}, "year must be"),
+    ({"type": "flood", "year": 26, "month": 1}, "year must be"),
+    ({"type": "flood", "year": 2026, "month": 13}, "month must be"),
+    ({"type": "flood", "year": 2026, "month": True}, "month must be"),
+    ({"type": "flood", "year": 2026, "month": 1.5}, "month must be"),
+    ({"type": "flood", "year": 2026, "month": 1, "dev": "no"}, "dev must be"),
+])
+def test_parse_job_request_rejects_malformed_bodies(body, message):
+    with pytest.raises(ValueError, match=message):
+        parse_job_request(body)
@@ -0,0 +1,45 @@
+import logging
+import threading
+
+import pytest
+
+from src.core.logging_config import mute_logging
+
+
+class _Collect(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        super().__init__(level)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def root_handler():
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    for h in saved_handlers:
+        root.removeHandler(h)
+    handler = _Collect(logging.INFO)
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG)
+    yield handler
+    root.removeHandler(handler)
+    for h in saved_handlers:
+        root.addHandler(h)
+    root.setLevel(saved_level)
+
+
+def test_mute_logging_replays_background_records(root_handler):
+    log = logging.getLogger("tests.background")
+    with mute_logging():
+        thread = threading.Thread(target=lambda: log.warning("prefetch failed"))
+        thread.start()
+        thread.join()
+        log.debug("below the handler level")
+        log.error("also held back")
+        assert root_handler.messages == []
+
+    assert root_handler.messages == ["prefetch failed", "also held back"]
+    assert root_handler in logging.getLogger().handlers
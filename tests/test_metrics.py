@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.metrics import MetricsRegistry, carry_scope
+
+
+def test_scopes_are_isolated_across_threads():
+    registry = MetricsRegistry()
+    registry.inc("outside_total")
+    both_inside = threading.Barrier(2)
+    snapshots = {}
+
+    def job(name, count):
+        with registry.scoped(), registry.labels(job=name):
+            for _ in range(count):
+                registry.inc("images_total")
+                registry.observe("image_seconds", 0.1)
+            both_inside.wait()
+            snapshots[name] = registry.snapshot()
+
+    threads = [threading.Thread(target=job, args=(name, n)) for name, n in (("a", 3), ("b", 5))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for name, count in (("a", 3), ("b", 5)):
+        counters = snapshots[name]["counters"]
+        assert counters == {"images_total": [{"labels": {"job": name}, "value": count}]}
+        assert snapshots[name]["histograms"]["image_seconds"][0]["value"]["count"] == count
+    assert registry.snapshot()["counters"] == {"outside_total": [{"labels": {}, "value": 1}]}
+
+
+def test_carry_scope_follows_work_onto_pool_threads():
+    registry = MetricsRegistry()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        with registry.scoped():
+            record = carry_scope(lambda: registry.inc("fetches_total"))
+            for future in [pool.submit(record) for _ in range(8)]:
+                future.result()
+            pool.submit(lambda: registry.inc("unscoped_total")).result()
+            scoped = registry.snapshot()["counters"]
+
+    assert scoped == {"fetches_total": [{"labels": {}, "value": 8}]}
+    assert registry.snapshot()["counters"] == {"unscoped_total": [{"labels": {}, "value": 1}]}
+
+
+def test_reset_inside_scope_leaves_the_registry_alone():
+    registry = MetricsRegistry()
+    registry.inc("runs_total")
+    with registry.scoped():
+        registry.inc("runs_total")
+        registry.reset()
+        assert registry.snapshot()["counters"] == {}
+    assert registry.snapshot()["counters"] == {"runs_total": [{"labels": {}, "value": 1}]}
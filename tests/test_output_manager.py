@@ -0,0 +1,64 @@
+import os
+import threading
+import time
+
+from src.core.job_queue import JobQueue
+from src.core.output_manager import STALE_TEMP_SECONDS, OutputManager, OutputSpec
+
+
+def test_concurrent_reservations_get_distinct_names(tmp_path):
+    manager = OutputManager(tmp_path)
+    spec = OutputSpec("flood", 2026, 1)
+    paths = []
+    start = threading.Barrier(8)
+
+    def reserve():
+        start.wait()
+        paths.append(manager.build_output_path(spec))
+
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(paths)) == 8
+    assert all(p.exists() and p.stat().st_size == 0 for p in paths)
+    assert sorted(p.name for p in paths)[0].startswith("202601_")
+
+
+def test_variant_suffix_and_latest_ignores_reservations(tmp_path):
+    manager = OutputManager(tmp_path)
+    main = manager.build_output_path(OutputSpec("drought", 2026, 11))
+    briefing = manager.build_output_path(OutputSpec("drought", 2026, 11, variant="briefing"))
+    assert briefing.name == main.name.replace(".pptx", "_briefing.pptx")
+    assert main.name == "202611_ผลการวิเคราะห์พื้นที่เสี่ยงแล้งเดือนพ.ย.-เม.ย.69.pptx"
+
+    assert manager.find_latest(OutputSpec("drought", 2026, 11)) is None
+    main.write_bytes(b"deck")
+    assert manager.find_latest(OutputSpec("drought", 2026, 11)) == main
+
+    OutputManager.release(briefing)
+    OutputManager.release(main)  # written: kept
+    assert not briefing.exists() and main.exists()
+
+
+def test_stale_cleanup_keeps_reservations_of_queued_jobs(tmp_path):
+    with JobQueue(tmp_path / "jobs.sqlite3") as queue:
+        manager = OutputManager(tmp_path / "output", in_use=queue.output_paths_in_use)
+        queue.enqueue([OutputSpec("flood", 2026, 1)])
+        job = queue.claim_next()
+        held = manager.build_output_path(job.spec)
+        queue.set_state(job.id, "assembling", output_path=str(held))
+        queue.set_state(job.id, "failed", error="interrupted")  # re-queued by the next --batch
+        abandoned = manager.build_output_path(OutputSpec("flood", 2026, 2))
+        long_ago = time.time() - STALE_TEMP_SECONDS - 60
+        for path in (held, abandoned):
+            os.utime(path, (long_ago, long_ago))
+
+        manager.build_output_path(OutputSpec("flood", 2026, 3))
+        assert held.exists() and not abandoned.exists()
+
+        queue.set_state(job.id, "done")
+        manager.build_output_path(OutputSpec("flood", 2026, 3))
+        assert not held.exists()
@@ -0,0 +1,104 @@
+import hashlib
+import io
+import random
+import zipfile
+
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from src.core.ppt_engine import FIXED_ZIP_DATE_TIME, PptEngine, ZipPolicy
+
+from conftest import LOGO_PNG, build_deck, png_bytes
+
+PICTURES = {"maps": ["Img_A", "Img_B", "Img_C"], "risk": ["Img_D", "Img_E"]}
+
+
+def _images(seed_offset: int = 0) -> dict[str, bytes]:
+    names = [name for names in PICTURES.values() for name in names]
+    return {name: png_bytes((30 * i + seed_offset, 60, 120)) for i, name in enumerate(names)}
+
+
+def _render(template, out, order_seed: int, policy: ZipPolicy | None = ZipPolicy()):
+    engine = PptEngine(template)
+    images = _images()
+    jobs = [
+        (engine.find_slide_by_key(key), name)
+        for key, names in PICTURES.items()
+        for name in names
+    ]
+    random.Random(order_seed).shuffle(jobs)
+    for slide, name in jobs:
+        engine.replace_image(slide, name, io.BytesIO(images[name]))
+    engine.save(out, policy=policy)
+    return out
+
+
+def _picture_blobs(path) -> dict[str, bytes]:
+    prs = Presentation(path)
+    return {
+        shape.name: shape.image.blob  # raises KeyError on a dangling r:embed
+        for slide in prs.slides
+        for shape in slide.shapes
+        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE
+    }
+
+
+def test_deterministic_save_reloads_with_every_picture(deck_path, tmp_path):
+    out = _render(deck_path, tmp_path / "out.pptx", order_seed=1)
+    assert _picture_blobs(out) == _images()
+
+
+def test_deterministic_save_is_byte_identical_across_placement_orders(deck_path, tmp_path):
+    digests = set()
+    for seed in range(5):
+        out = _render(deck_path, tmp_path / f"out{seed}.pptx", order_seed=seed)
+        assert _picture_blobs(out) == _images()
+        digests.add(hashlib.sha256(out.read_bytes()).hexdigest())
+    assert len(digests) == 1
+
+
+def test_deterministic_save_with_distinct_template_images(tmp_path):
+    template = build_deck(tmp_path / "distinct.pptx", PICTURES, shared_image=False)
+    digests = set()
+    for seed in range(3):
+        out = _render(template, tmp_path / f"d{seed}.pptx", order_seed=seed)
+        assert _picture_blobs(out) == _images()
+        digests.add(hashlib.sha256(out.read_bytes()).hexdigest())
+    assert len(digests) == 1
+
+
+def test_deterministic_save_renames_kept_template_relationships(tmp_path):
+    # Img_Logo's relationship comes from the template and must move to a new rId
+    template = build_deck(tmp_path / "logo.pptx", PICTURES, logo=True)
+    expected = {**_images(), "Img_Logo": LOGO_PNG}
+    digests = set()
+    for seed in range(3):
+        out = _render(template, tmp_path / f"l{seed}.pptx", order_seed=seed)
+        assert _picture_blobs(out) == expected
+        digests.add(hashlib.sha256(out.read_bytes()).hexdigest())
+    assert len(digests) == 1
+
+
+def test_deterministic_zip_members(deck_path, tmp_path):
+    out = _render(deck_path, tmp_path / "out.pptx", order_seed=0)
+    with zipfile.ZipFile(out) as zf:
+        infos = zf.infolist()
+    assert infos[0].filename == "[Content_Types].xml"
+    assert {info.date_time for info in infos} == {FIXED_ZIP_DATE_TIME}
+    # replaced originals are dropped, not kept as orphans
+    assert sum(info.filename.startswith("ppt/media/") for info in infos) == len(_images())
+
+
+def test_non_deterministic_save_still_reloads(deck_path, tmp_path):
+    out = _render(deck_path, tmp_path / "plain.pptx", order_seed=2, policy=ZipPolicy(deterministic=False))
+    assert _picture_blobs(out) == _images()
+
+
+def test_replace_image_keeps_name_and_id(deck_path, tmp_path):
+    engine = PptEngine(deck_path)
+    slide = engine.find_slide_by_key("maps")
+    before = engine.get_shape(slide, "Img_B").shape_id
+    engine.replace_image(slide, "Img_B", io.BytesIO(png_bytes((1, 2, 3))))
+    after = engine.get_shape(slide, "Img_B")
+    assert after.shape_id == before
+    assert after.shape_type == MSO_SHAPE_TYPE.PICTURE
@@ -0,0 +1,35 @@
+import pstats
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core.profiling import profile_run
+
+
+def _work(_=None):
+    return sum(i * i for i in range(20000))
+
+
+def test_cpu_profile_covers_worker_threads(tmp_path):
+    stop = threading.Event()
+
+    def _outliving():
+        while not stop.is_set():
+            _work()
+            time.sleep(0.005)
+
+    thread = threading.Thread(target=_outliving)
+    try:
+        with profile_run("cpu", tmp_path / "run"):
+            thread.start()
+            with ThreadPoolExecutor(max_workers=3) as pool:
+                list(pool.map(_work, range(6)))
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        thread.join()
+
+    stats = pstats.Stats(str(tmp_path / "run.prof")).stats
+    calls = sum(value[0] for key, value in stats.items() if key[2] == "_work")
+    assert calls > 6  # the pool's six plus some from the thread still running
+    assert "=== ImageHandler" in (tmp_path / "run_profile.txt").read_text(encoding="utf-8")
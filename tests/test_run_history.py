@@ -0,0 +1,58 @@
+from src.core.job_queue import JobQueue
+from src.core.metrics import MetricsRegistry, metrics
+from src.core.output_manager import OutputSpec
+from src.core.run_history import RunHistory
+from src.reports.runner import run_batch_processes
+
+
+def _row(started_at, year, month, duration, status="success"):
+    return {"started_at": started_at, "report": "flood", "year": year, "month": month, "status": status,
+            "duration": duration, "image_seconds": [], "placeholders": 0, "output_bytes": 0}
+
+
+def test_summarize_groups_by_issue_month_not_run_date():
+    rows = [
+        _row("2026-03-01T08:00:00", 2026, 1, 10.0),  # January issue rebuilt in March
+        _row("2026-01-05T08:00:00", 2026, 1, 12.0),
+        _row("2026-03-02T08:00:00", 2026, 3, 20.0),
+        _row("2026-03-03T08:00:00", None, None, 99.0),  # e.g. a --batch run
+    ]
+    stats = {st.key: st for st in RunHistory.summarize(rows, by=("report", "issue_month"))}
+    assert sorted(stats) == [("flood", "-"), ("flood", "2026-01"), ("flood", "2026-03")]
+    assert stats[("flood", "2026-01")].runs == 2
+    assert stats[("flood", "2026-03")].max == 20.0
+
+
+def test_merge_adds_another_processes_snapshot():
+    worker = MetricsRegistry()
+    with worker.labels(report="flood"):
+        worker.inc("image_download_bytes_total", 100)
+        worker.observe("image_download_seconds", 0.2, outcome="ok")
+    worker.set_gauge("output_bytes", 5000)
+
+    parent = MetricsRegistry()
+    parent.inc("image_download_bytes_total", 50, report="flood")
+    parent.observe("image_download_seconds", 0.4, outcome="ok", report="flood")
+    parent.merge(worker.snapshot(raw_samples=True))
+
+    snapshot = parent.snapshot()
+    assert snapshot["counters"]["image_download_bytes_total"][0]["value"] == 150
+    hist = snapshot["histograms"]["image_download_seconds"][0]["value"]
+    assert (hist["count"], hist["min"], hist["max"]) == (2, 0.2, 0.4)
+    assert sorted(parent.samples("image_download_seconds", outcome="ok")) == [0.2, 0.4]
+    assert snapshot["gauges"]["output_bytes"][0]["value"] == 5000
+
+
+def test_process_batch_reports_worker_downloads(flood_env, image_server):
+    with JobQueue("cache/jobs.sqlite3") as queue:
+        queue.enqueue([OutputSpec("flood", 2026, month) for month in (1, 2)])
+
+    with metrics.scoped():
+        counts = run_batch_processes("cache/jobs.sqlite3", 2, config_path=str(flood_env))
+        downloaded = sum(s["value"] for s in metrics.snapshot()["counters"]["image_download_bytes_total"])
+        latencies = metrics.samples("image_download_seconds", outcome="ok")
+
+    assert counts["done"] == 2
+    served = sum(len(image_server.image_for(path)) for path in set(image_server.hits))
+    assert downloaded == served > 0
+    assert len(latencies) == 24
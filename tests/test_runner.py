@@ -0,0 +1,95 @@
+import yaml
+from pptx import Presentation
+
+from src.core.data_loader import DataLoader
+from src.core.image_handler import ImageHandler
+from src.core.job_queue import JobQueue
+from src.core.output_manager import OutputManager, OutputSpec
+from src.core.template_index import extract_pictures
+from src.reports.flood.tasks import build_image_sources
+from src.reports.runner import generate_reports, generate_variants, run_batch
+
+
+def _add_variants(config_path, variants):
+    config = yaml.safe_load(config_path.read_text(encoding="utf-8"))
+    config["flood_report"]["variants"] = variants
+    config_path.write_text(yaml.safe_dump(config, allow_unicode=True), encoding="utf-8")
+
+
+def _texts(path):
+    return {shape.name: shape.text_frame.text
+            for slide in Presentation(path).slides for shape in slide.shapes if shape.has_text_frame}
+
+
+def test_with_variant_overlays_pages():
+    config = {"flood_report": {
+        "template_path": "main.pptx",
+        "pages": {"cover": {"slide_key": "c", "issue_date_shape": "A"}, "risk": {"slide_key": "r"}},
+        "variants": {"briefing": {"template_path": "brief.pptx",
+                                  "pages": {"cover": {"issue_date_shape": "B"}, "risk": None}}},
+    }}
+    merged = DataLoader.with_variant(config, "flood_report", "briefing")["flood_report"]
+    assert merged["template_path"] == "brief.pptx"
+    assert merged["pages"] == {"cover": {"slide_key": "c", "issue_date_shape": "B"}}
+    assert "variants" not in merged
+    assert DataLoader.with_variant(config, "flood_report", None) is config
+
+
+def test_variants_share_one_fetch(flood_env, image_server):
+    _add_variants(flood_env, {"briefing": {"pages": {"risk_forecast": None}}, "archive": {}})
+    out = OutputManager("output")
+    paths = {v: out.build_output_path(OutputSpec("flood", 2026, 1, variant=v)) for v in (None, "briefing", "archive")}
+
+    generate_variants("flood", paths, 2026, 1, config_path=str(flood_env))
+
+    assert len(image_server.hits) == len(set(image_server.hits)) == 12
+    sources = build_image_sources(DataLoader(str(flood_env)).get_config(), 2026, 1)
+    full = extract_pictures(paths[None], sources)
+    assert extract_pictures(paths["archive"], sources) == full
+    briefing = extract_pictures(paths["briefing"], sources)
+    assert len(full) == len(briefing) == 12
+    for name, data in briefing.items():
+        # The briefing leaves its risk page as the template has it
+        assert (data == full[name]) == (not name.startswith("Img_FloodRiskFcst"))
+
+
+def test_pages_update_an_earlier_deck_without_fetching(flood_env, image_server):
+    out = OutputManager("output")
+    first = out.build_output_path(OutputSpec("flood", 2026, 1))
+    generate_reports({"flood": first}, 2026, 1, config_path=str(flood_env))
+    image_server.hits.clear()
+
+    second = out.build_output_path(OutputSpec("flood", 2026, 2))
+    generate_reports({"flood": second}, 2026, 2, config_path=str(flood_env),
+                     pages=["cover"], base_paths={"flood": first})
+
+    assert image_server.hits == []
+    before, after = _texts(first), _texts(second)
+    assert after["Txt_Issue_Date"] != before["Txt_Issue_Date"]
+    assert after["Txt_Title"] == before["Txt_Title"]
+
+
+def test_batch_resumes_from_checkpoints(flood_env, image_server):
+    with JobQueue("cache/jobs.sqlite3") as queue:
+        assert queue.enqueue([OutputSpec("flood", 2026, 1)]) == 1
+        assert run_batch(queue, config_path=str(flood_env))["done"] == 1
+        job = queue.get(1)
+        assert len(queue.checkpoints(job.id)) == 12
+        assert queue.enqueue([OutputSpec("flood", 2026, 1)]) == 0
+
+        # A crash while assembling: the job is re-queued, its images are not fetched again
+        queue.set_state(job.id, "assembling")
+        image_server.hits.clear()
+        assert queue.recover() == 1
+        assert run_batch(queue, config_path=str(flood_env))["done"] == 1
+        assert queue.get(job.id).output_path == job.output_path
+
+    assert image_server.hits == []
+
+
+def test_offline_handler_never_touches_the_network(flood_env, image_server):
+    config = DataLoader(str(flood_env)).get_config()
+    handler = ImageHandler.from_config(config, offline=True)
+    url = next(iter(build_image_sources(config, 2026, 5).values()))
+    assert handler.download_image(url) is None
+    assert image_server.hits == []
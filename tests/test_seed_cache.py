@@ -0,0 +1,116 @@
+import logging
+import zipfile
+from io import BytesIO
+from pathlib import Path
+
+from pptx import Presentation
+
+from src.core.data_loader import DataLoader
+from src.core.image_archive import ImageArchive
+from src.core.image_handler import ImageHandler, is_placeholder
+from src.core.output_manager import OutputManager, OutputSpec
+from src.core.template_index import extract_pictures
+from src.reports.flood.manager import generate_flood_report
+from src.reports.flood.tasks import build_image_sources
+from src.reports.runner import seed_archive_from_decks
+
+
+def _generate(config_path, year, month, img_handler=None):
+    path = OutputManager("output").build_output_path(OutputSpec("flood", year, month))
+    generate_flood_report(year, month, path, config_path=str(config_path), img_handler=img_handler)
+    return path
+
+
+def _served(server, url):
+    return server.image_for(url[len(server.base_url):])
+
+
+def _save_baseline_deck(config, server, year, month, path):
+    """A deck written by the old replace_image: each picture removed and re-added as "Picture N"."""
+    sources = build_image_sources(config, year, month)
+    prs = Presentation(config["flood_report"]["template_path"])
+    for slide in prs.slides:
+        for shape in list(slide.shapes):
+            if shape.name not in sources:
+                continue
+            sp_tree = slide.shapes._spTree
+            z_order = sp_tree.index(shape._element)
+            sp_tree.remove(shape._element)
+            pic = slide.shapes.add_picture(
+                BytesIO(_served(server, sources[shape.name])),
+                left=shape.left, top=shape.top, width=shape.width, height=shape.height,
+            )
+            sp_tree.remove(pic._element)
+            sp_tree.insert(z_order, pic._element)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    prs.save(path)
+    return sources
+
+
+def test_seed_cache_round_trip(flood_env, image_server):
+    deck = _generate(flood_env, 2026, 1)
+    assert len(image_server.hits) == 12
+
+    decks, stored, placeholders = seed_archive_from_decks("output", ["flood"], config_path=str(flood_env))
+    assert (decks, stored, placeholders) == (1, 12, 0)
+
+    config = DataLoader(str(flood_env)).get_config()
+    archive = ImageArchive.from_config(config)
+    sources = build_image_sources(config, 2026, 1)
+    for url in sources.values():
+        assert archive.get(url) == _served(image_server, url)
+
+    # --offline rebuild: no network, no placeholders, same deck
+    image_server.hits.clear()
+    rebuilt = _generate(flood_env, 2026, 1, img_handler=ImageHandler.from_config(config, offline=True))
+    assert image_server.hits == []
+    pictures = extract_pictures(rebuilt, sources)
+    assert len(pictures) == 12 and not any(is_placeholder(data) for data in pictures.values())
+    assert rebuilt.read_bytes() == deck.read_bytes()
+
+
+def test_seed_cache_skips_placeholders(flood_env, image_server):
+    config = DataLoader(str(flood_env)).get_config()
+    missing_url = build_image_sources(config, 2026, 2)["Img_FloodRiskFcst_Lead3"]
+    image_server.missing.add(missing_url[len(image_server.base_url):])
+    _generate(flood_env, 2026, 2)
+
+    decks, stored, placeholders = seed_archive_from_decks("output", ["flood"], config_path=str(flood_env))
+    assert (decks, stored, placeholders) == (1, 11, 1)
+    assert missing_url not in ImageArchive.from_config(config)
+
+
+def test_extract_pictures_warns_on_dangling_embed(flood_env, tmp_path, caplog):
+    deck = _generate(flood_env, 2026, 3)
+    broken = tmp_path / "broken.pptx"
+    with zipfile.ZipFile(deck) as src, zipfile.ZipFile(broken, "w") as dst:
+        for info in src.infolist():
+            data = src.read(info)
+            if info.filename.startswith("ppt/slides/slide") and info.filename.endswith(".xml"):
+                data = data.replace(b'r:embed="rId', b'r:embed="rId9')
+            dst.writestr(info, data)
+
+    with caplog.at_level(logging.WARNING, logger="src.core.template_index"):
+        pictures = extract_pictures(broken)
+    assert pictures == {}
+    assert "resolves to no image part" in caplog.text
+    assert Presentation(deck)  # the original is intact
+
+
+def test_seed_cache_matches_unnamed_pictures_by_position(flood_env, image_server, caplog):
+    config = DataLoader(str(flood_env)).get_config()
+    deck = Path("output/flood/202604_baseline.pptx")
+    sources = _save_baseline_deck(config, image_server, 2026, 4, deck)
+    assert not set(sources) & {
+        shape.name for slide in Presentation(deck).slides for shape in slide.shapes
+    }
+    Presentation().save("output/flood/202605_unrelated.pptx")
+
+    with caplog.at_level(logging.WARNING, logger="src.reports.runner"):
+        decks, stored, placeholders = seed_archive_from_decks("output", ["flood"], config_path=str(flood_env))
+    assert (decks, stored, placeholders) == (2, 12, 0)
+    assert "No configured pictures found in output/flood/202605_unrelated.pptx" in caplog.text
+
+    archive = ImageArchive.from_config(config)
+    for url in sources.values():
+        assert archive.get(url) == _served(image_server, url)
@@ -0,0 +1,42 @@
+import hashlib
+
+import pytest
+
+from src.core import shared_template
+from src.core.ppt_engine import PptEngine
+
+
+@pytest.fixture
+def attached(deck_path, tmp_path):
+    snapshots = shared_template.publish([deck_path], snapshot_dir=tmp_path / "snapshots")
+    shared_template.attach(snapshots)
+    yield snapshots[0]
+    shared_template.detach()
+
+
+def test_stream_reads_the_snapshot(attached, deck_path):
+    data = deck_path.read_bytes()
+    assert attached.sha256 == hashlib.sha256(data).hexdigest()
+    with shared_template.open_template(deck_path) as stream:
+        buffer = bytearray(len(data) + 10)
+        assert stream.readinto(buffer) == len(data)
+        assert bytes(buffer[:len(data)]) == data
+        stream.seek(-4, 2)
+        assert stream.read() == data[-4:]
+
+
+def test_engine_loads_from_the_mapping_and_detach_unmaps(attached, deck_path):
+    engine = PptEngine(deck_path)
+    assert len(engine.prs.slides) == 2
+
+    mapping = shared_template._mapped[attached.template_path][1]
+    shared_template.detach()
+    assert mapping.closed  # the engine's stream was closed after parsing
+    assert shared_template.open_template(deck_path) is None
+
+
+def test_detach_tolerates_an_open_stream(attached, deck_path):
+    stream = shared_template.open_template(deck_path)
+    shared_template.detach()
+    assert shared_template.template_sha256(deck_path) is None
+    stream.close()
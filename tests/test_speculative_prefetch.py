@@ -0,0 +1,31 @@
+import threading
+
+from src.core.data_loader import DataLoader
+from src.core.image_handler import ImageHandler
+from src.reports.flood.tasks import build_image_sources
+from src.reports.runner import SpeculativePrefetch
+
+
+def test_cancelled_prefetch_leaves_urls_unfetched(flood_env, image_server):
+    config = DataLoader(str(flood_env)).get_config()
+    urls = list(build_image_sources(config, 2026, 1).values())
+    cancel = threading.Event()
+    cancel.set()
+
+    handler = ImageHandler.from_config(config)
+    assert handler.prefetch(urls, cancel=cancel) == 0
+    assert image_server.hits == []
+    # Nothing was marked as failed: a real run still downloads everything
+    assert handler.prefetch(urls) == len(urls)
+
+
+def test_speculative_prefetch_is_claimable_until_stopped(flood_env, image_server):
+    speculative = SpeculativePrefetch(2026, 1, report_types=["flood"], config_path=str(flood_env)).start()
+    handler = speculative.claim(2026, 1)
+    assert handler is not None
+    assert speculative.claim(2026, 1) is handler
+    assert speculative.claim(2026, 2) is None
+
+    speculative.stop()
+    assert not speculative._thread.is_alive()
+    assert speculative.claim(2026, 1) is None
@@ -0,0 +1,61 @@
+import pytest
+from pptx import Presentation
+from pptx.util import Emu
+
+from conftest import build_report_template, flood_report_config
+from src.core.ppt_engine import PptEngine, SlideNotFoundError
+from src.core.template_binding import load_binding
+
+
+@pytest.fixture
+def bound_template(tmp_path):
+    report_cfg = flood_report_config("http://images.invalid", str(tmp_path / "flood.pptx"))
+    build_report_template(tmp_path / "flood.pptx", report_cfg)
+    config = {"flood_report": report_cfg}
+    return report_cfg, load_binding(config, "flood_report", cache_dir=tmp_path / "bindings")
+
+
+def _anchor(slide):
+    return next(s.name for s in slide.shapes if s.name.startswith("SLIDE_KEY_"))
+
+
+def test_binding_maps_shape_names_to_ids(bound_template):
+    report_cfg, binding = bound_template
+    engine = PptEngine(report_cfg["template_path"], binding=binding)
+    slide = engine.find_slide_by_key("flood_risk_fcst_lead0_lead5")
+    for name in report_cfg["pages"]["risk_forecast"]["images"].values():
+        shape = engine.get_shape(slide, name)
+        assert shape.shape_id == binding.shape_id("flood_risk_fcst_lead0_lead5", name)
+
+
+def test_bound_id_wins_over_a_duplicate_name(bound_template, tmp_path):
+    report_cfg, binding = bound_template
+    prs = Presentation(report_cfg["template_path"])
+    slide = prs.slides[binding.slide_index("flood_cover")]
+    # A same-named shape in front of the bound one (e.g. pasted in by hand)
+    decoy = slide.shapes.add_textbox(Emu(0), Emu(0), Emu(10), Emu(10))
+    decoy.name = "Txt_Issue_Date"
+    slide.shapes._spTree.remove(decoy._element)
+    slide.shapes._spTree.insert(2, decoy._element)
+    prs.save(tmp_path / "edited.pptx")
+
+    engine = PptEngine(tmp_path / "edited.pptx", binding=binding)
+    shape = engine.get_shape(engine.find_slide_by_key("flood_cover"), "Txt_Issue_Date")
+    assert shape.shape_id == binding.shape_id("flood_cover", "Txt_Issue_Date") != decoy.shape_id
+
+
+def test_moved_slides_are_found_by_anchor(bound_template, tmp_path):
+    report_cfg, binding = bound_template
+    prs = Presentation(report_cfg["template_path"])
+    id_list = prs.slides._sldIdLst
+    first = id_list[0]
+    id_list.remove(first)
+    id_list.append(first)
+    prs.save(tmp_path / "base.pptx")
+
+    engine = PptEngine(tmp_path / "base.pptx", binding=binding)
+    for page_cfg in report_cfg["pages"].values():
+        slide = engine.find_slide_by_key(page_cfg["slide_key"])
+        assert _anchor(slide) == f"SLIDE_KEY_{page_cfg['slide_key']}"
+    with pytest.raises(SlideNotFoundError):
+        engine.find_slide_by_key("drought_cover")
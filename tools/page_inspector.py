@@ -436,6 +436,8 @@ def print_help():
     print("   --masters             Dumps all details for every shape on all slide masters.")
     print("   --footers             Finds and performs a detailed analysis on only footer shapes.")
     print("   --help                Displays this help message.")
+    print("\nFor a fast machine-readable index (JSON, parallel, config validation) use:")
+    print("   python tools/template_index.py [files/dirs] [--validate config.yaml]")
 
 if __name__ == "__main__":
     args = sys.argv[1:]
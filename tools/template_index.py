@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Fast Template Index (JSON)
+Reads slide XML directly (lxml iterparse) instead of the python-pptx object model.
+Writes a compact, diffable JSON index per file: slides, SLIDE_KEY_* anchors,
+shape names, types and geometry. Many files are processed in parallel.
+
+Optionally validates config.yaml shape names against every template it references.
+
+Examples:
+    python tools/template_index.py                       # all templates/*.pptx
+    python tools/template_index.py output/ --workers 8   # every deck under output/
+    python tools/template_index.py --validate config.yaml
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Allow running as "python tools/template_index.py" from the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import yaml
+
+from src.core.template_index import index_pptx, validate_report_config
+
+OUTPUT_DIR = Path("inspection_pages")
+
+
+def collect_files(targets):
+    """Expands files/directories into a sorted list of .pptx paths (skips Office lock files)."""
+    files = []
+    for target in targets:
+        path = Path(target)
+        candidates = path.rglob("*.pptx") if path.is_dir() else [path]
+        files.extend(p for p in candidates if not p.name.startswith("~$"))
+    return sorted(set(files))
+
+
+def build_index(path):
+    """Worker: returns (path, index or None, error or None)."""
+    try:
+        return str(path), index_pptx(path), None
+    except Exception as e:
+        return str(path), None, f"{type(e).__name__}: {e}"
+
+
+def index_files(files, workers):
+    """Indexes all files, in parallel when there is more than one."""
+    if len(files) <= 1 or workers <= 1:
+        return [build_index(f) for f in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(build_index, files))
+
+
+def write_index(path, index):
+    out_path = OUTPUT_DIR / f"{Path(path).stem}_index.json"
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        # one key per line + sorted keys -> stable diffs
+        json.dump({"file": Path(path).as_posix(), **index}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+    return out_path
+
+
+def validate(config_path, indexes, workers):
+    """Validates every '<type>_report' section; indexes missing templates on demand."""
+    with open(config_path, "r", encoding="utf-8") as f:
+        config = yaml.safe_load(f)
+
+    sections = {k: v for k, v in config.items() if k.endswith("_report") and "template_path" in v}
+    by_path = {os.path.normcase(os.path.abspath(p)): idx for p, idx in indexes.items()}
+
+    missing = [
+        Path(sec["template_path"]) for sec in sections.values()
+        if os.path.normcase(os.path.abspath(sec["template_path"])) not in by_path
+    ]
+    for path, index, error in index_files([p for p in missing if p.exists()], workers):
+        if index is not None:
+            by_path[os.path.normcase(os.path.abspath(path))] = index
+
+    ok = True
+    for name, section in sections.items():
+        index = by_path.get(os.path.normcase(os.path.abspath(section["template_path"])))
+        if index is None:
+            print(f"FAIL {name}: template not readable: {section['template_path']}")
+            ok = False
+            continue
+        problems = validate_report_config(section, index)
+        if problems:
+            ok = False
+            print(f"FAIL {name} ({section['template_path']}):")
+            for problem in problems:
+                print(f"  - {problem}")
+        else:
+            print(f"OK   {name} ({section['template_path']})")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast XML-level .pptx index with JSON output.")
+    parser.add_argument("targets", nargs="*", help=".pptx files or directories (default: templates/).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel worker processes.")
+    parser.add_argument("--validate", metavar="CONFIG", help="Check config.yaml shape names against its templates.")
+    parser.add_argument("--stdout", action="store_true", help="Print JSON to stdout instead of inspection_pages/.")
+    args = parser.parse_args()
+
+    targets = args.targets or ([] if args.validate else ["templates"])
+    files = collect_files(targets)
+
+    indexes = {}
+    failed = False
+    for path, index, error in index_files(files, args.workers):
+        if error:
+            print(f"ERROR {path}: {error}", file=sys.stderr)
+            failed = True
+            continue
+        indexes[path] = index
+        if args.stdout:
+            print(json.dumps({"file": Path(path).as_posix(), **index}, ensure_ascii=False, sort_keys=True))
+        elif not args.validate or args.targets:
+            print(f"{path} -> {write_index(path, index)}")
+
+    if args.validate and not validate(args.validate, indexes, args.workers):
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()